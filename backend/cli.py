@@ -0,0 +1,480 @@
+"""
+Command-line batch runner.
+
+Reads targets (BV/AV ids, dynamic / article links, space links or UIDs) from
+a file or stdin, one per line; blank lines and lines starting with "#" are
+ignored. Targets are normalized and deduplicated through parse_input, then
+crawled concurrently: comment targets with CommentCrawler, user spaces with
+DynamicCrawler. All workers share one rate limiter and one HTTP session.
+Each target is written to its own file in the output directory.
+
+With --checkpoint-dir every finished target leaves a small JSON record, and
+a rerun skips targets that already have one, so an interrupted or partly
+failed batch can simply be started again.
+
+A throughput summary goes to stderr; --report writes a machine-readable JSON
+run report ("-" for stdout).
+
+Exit codes:
+    0    every target finished (or was skipped by its checkpoint)
+    1    some targets failed or could not be parsed
+    2    invalid arguments or configuration
+    130  interrupted
+
+    python backend/cli.py targets.txt -o out --format jsonl --concurrency 4 --checkpoint-dir out/.ckpt
+    cat ids.txt | python backend/cli.py - -o out --report run.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from config.config import GLOBAL_RATE_LIMIT
+from src.exporter.factory import open_stream_exporter
+from utils.helpers import ContentType, ParsedInput, parse_input
+
+logger = logging.getLogger("cli")
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+FORMATS = ("csv", "jsonl", "parquet", "arrow", "sqlite")
+_EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet", "arrow": ".arrow", "sqlite": ".db"}
+_COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+class Target:
+    """一个去重后的爬取目标"""
+
+    def __init__(self, line: str, parsed: ParsedInput) -> None:
+        self.line = line
+        self.parsed = parsed
+        self.kind = "dynamics" if parsed.uid else "comments"
+        self.key = target_key(parsed)
+        self.status = "pending"
+        self.rows = 0
+        self.requests = 0
+        self.throttled = 0
+        self.failed_requests = 0
+        self.elapsed = 0.0
+        self.output: str | None = None
+        self.error: str | None = None
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "target": self.line,
+            "key": self.key,
+            "kind": self.kind,
+            "status": self.status,
+            "rows": self.rows,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "failed_requests": self.failed_requests,
+            "elapsed": round(self.elapsed, 3),
+            "output": self.output,
+            "error": self.error,
+        }
+
+
+def target_key(parsed: ParsedInput) -> str:
+    """目标的规范名称：去重的依据，也是输出文件和检查点的文件名"""
+    if parsed.uid:
+        return f"uid{parsed.uid}"
+    if parsed.content_type == ContentType.ARTICLE:
+        return f"cv{parsed.oid}"
+    if parsed.content_type == ContentType.TEXT_DYNAMIC:
+        return f"dyn{parsed.oid}"
+    if parsed.bvid:
+        return "BV" + parsed.bvid[2:]
+    return f"av{parsed.oid}"
+
+
+def read_targets(lines: Iterable[str]) -> tuple[list[Target], list[str], int]:
+    """
+    解析并去重目标
+
+    Returns:
+        (有效目标（保持首次出现的顺序）, 无法解析的行, 重复的行数)
+    """
+    targets: dict[str, Target] = {}
+    invalid: list[str] = []
+    duplicates = 0
+    for raw in lines:
+        line = raw.strip().lstrip("\ufeff")
+        if not line or line.startswith("#"):
+            continue
+        parsed = parse_input(line)
+        if parsed is None:
+            invalid.append(line)
+            continue
+        target = Target(line, parsed)
+        if target.key in targets:
+            duplicates += 1
+            continue
+        targets[target.key] = target
+    return list(targets.values()), invalid, duplicates
+
+
+class BatchRunner:
+    """
+    并发执行一批目标
+
+    每个目标先写到 <key>.partial<ext>，成功后改名并写检查点；失败（含有请求重试后仍失败，
+    结果可能不全）或中断的目标不写检查点，下次运行会重新爬取。
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        from src.api.rate_limiter import RateLimiter
+        from src.api.session_pool import SessionManager
+
+        self.args = args
+        self.output_dir = Path(args.output)
+        self.checkpoint_dir = Path(args.checkpoint_dir) if args.checkpoint_dir else None
+        self.extension = _EXTENSIONS[args.format] + (
+            _COMPRESSION_SUFFIXES[args.compression] if args.format == "jsonl" else ""
+        )
+        self.rate_limiter = RateLimiter(args.rate)
+        self.sessions = SessionManager(self.rate_limiter, max_tasks=args.concurrency)
+        self._crawlers: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._done = 0
+        self.interrupted = False
+        # 关闭会话前取的连接统计（summarize 用）
+        self.session_stats: dict[str, Any] | None = None
+
+    def run(self, targets: list[Target]) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.checkpoint_dir is not None:
+            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        pending = []
+        for target in targets:
+            if self._restore(target):
+                self._report_line(target, len(targets))
+            else:
+                pending.append(target)
+        executor = ThreadPoolExecutor(max_workers=self.args.concurrency, thread_name_prefix="target")
+        futures = {executor.submit(self._run_target, target): target for target in pending}
+        try:
+            for future in as_completed(futures):
+                future.result()
+                self._report_line(futures[future], len(targets))
+        except KeyboardInterrupt:
+            print("\n正在停止，等待进行中的目标结束...", file=sys.stderr)
+            with self._lock:
+                self.interrupted = True
+                crawlers = list(self._crawlers.values())
+            for crawler in crawlers:
+                crawler.stop()
+            executor.shutdown(wait=True, cancel_futures=True)
+            for target in pending:
+                if target.status in ("pending", "running"):
+                    target.status = "interrupted"
+        finally:
+            executor.shutdown(wait=True)
+            self.session_stats = self.sessions.stats()
+            self.sessions.close()
+
+    def _final_path(self, target: Target) -> Path:
+        return self.output_dir / f"{target.key}{self.extension}"
+
+    def _restore(self, target: Target) -> bool:
+        """已有检查点且本次的输出文件还在时跳过该目标"""
+        if self.checkpoint_dir is None or self.args.force:
+            return False
+        path = self.checkpoint_dir / f"{target.key}.json"
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as exc:
+            logger.warning("忽略损坏的检查点 %s: %s", path, exc)
+            return False
+        output = str(self._final_path(target))
+        if record.get("output") != output or not os.path.exists(output):
+            # 换了输出格式 / 目录，或输出文件已删除
+            return False
+        target.status = "skipped"
+        target.rows = int(record.get("rows") or 0)
+        target.output = output
+        return True
+
+    def _run_target(self, target: Target) -> None:
+        if self.interrupted:
+            target.status = "interrupted"
+            return
+        target.status = "running"
+        final_path = self._final_path(target)
+        partial_path = self.output_dir / f"{target.key}.partial{self.extension}"
+        api = self.sessions.new_api()
+        started = time.monotonic()
+        exporter = None
+        try:
+            # JSONL 的压缩方式由扩展名决定
+            exporter = open_stream_exporter(target.kind, str(partial_path), self.args.format)
+            if target.kind == "comments":
+                resolved = self._crawl_comments(target, api, exporter)
+            else:
+                resolved = self._crawl_dynamics(target, api, exporter)
+            exporter.close()
+            target.rows = exporter.rows_written
+            if self.interrupted:
+                target.status = "interrupted"
+            elif not resolved:
+                target.status = "failed"
+                target.error = "无法解析目标"
+            elif api.failed_count:
+                # 请求失败时爬虫按"没有更多数据"结束，输出可能不全，不能当作完成
+                target.status = "failed"
+                target.error = f"{api.failed_count} 个请求失败: {api.last_error}"
+            else:
+                os.replace(partial_path, final_path)
+                target.output = str(final_path)
+                target.status = "ok" if target.rows else "empty"
+        except Exception as exc:
+            logger.exception("target %s failed", target.key)
+            target.status = "failed"
+            target.error = str(exc)
+            if exporter is not None:
+                try:
+                    exporter.close()
+                except Exception:
+                    pass
+        finally:
+            with self._lock:
+                self._crawlers.pop(target.key, None)
+            target.elapsed = time.monotonic() - started
+            target.requests = api.request_count
+            target.throttled = api.throttled_count
+            target.failed_requests = api.failed_count
+        if target.status in ("ok", "empty"):
+            self._checkpoint(target)
+
+    def _register(self, target: Target, crawler: Any) -> bool:
+        """
+        登记爬虫以便中断时停止；已在停止时返回 False，调用方不再开始爬取
+        （crawl_* 开始时会清除停止标记，之前调用 stop() 无效）
+        """
+        with self._lock:
+            if self.interrupted:
+                return False
+            self._crawlers[target.key] = crawler
+        return True
+
+    def _stop_hook(self, target: Target) -> Callable[[dict[str, Any]], None]:
+        """进度回调：中断恰好落在登记之后、crawl_* 清除停止标记之前时，在第一页结束后补上"""
+
+        def hook(_progress: dict[str, Any]) -> None:
+            if self.interrupted:
+                with self._lock:
+                    crawler = self._crawlers.get(target.key)
+                if crawler is not None:
+                    crawler.stop()
+
+        return hook
+
+    def _crawl_comments(self, target: Target, api: Any, exporter: Any) -> bool:
+        from src.crawler.comment_crawler import CommentCrawler
+        from src.processor.pipeline import ProcessingPipeline
+
+        args = self.args
+        pipeline = ProcessingPipeline.for_comments(detailed=False, keep_rows=False)
+        pipeline.add_listener(exporter.write_batch)
+        crawler = CommentCrawler(batch_callback=pipeline.feed, progress_hook=self._stop_hook(target), api=api)
+        if not self._register(target, crawler):
+            return False
+        crawler.crawl_comments(
+            target.line,
+            include_replies=not args.no_replies,
+            max_pages=args.max_pages,
+            mode=2 if args.sort == "hot" else 3,
+        )
+        return crawler.target is not None and crawler.target.oid is not None
+
+    def _crawl_dynamics(self, target: Target, api: Any, exporter: Any) -> bool:
+        from src.crawler.dynamic_crawler import DynamicCrawler
+
+        args = self.args
+        crawler = DynamicCrawler(batch_callback=exporter.write_batch, progress_hook=self._stop_hook(target), api=api)
+        if not self._register(target, crawler):
+            return False
+        crawler.crawl_dynamics(
+            int(target.parsed.uid),
+            keyword=args.keyword,
+            max_pages=args.max_pages,
+        )
+        return True
+
+    def _checkpoint(self, target: Target) -> None:
+        if self.checkpoint_dir is None:
+            return
+        record = {**target.report(), "finished_at": time.time()}
+        path = self.checkpoint_dir / f"{target.key}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _report_line(self, target: Target, total: int) -> None:
+        with self._lock:
+            self._done += 1
+            done = self._done
+        detail = target.error or f"{target.rows:,} 条"
+        print(
+            f"[{done}/{total}] {target.key:<16} {target.status:<8} {detail}  {target.elapsed:.1f}s",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+# ============================================================
+#  汇总
+# ============================================================
+def summarize(
+    targets: list[Target], invalid: list[str], duplicates: int, elapsed: float, runner: BatchRunner | None
+) -> dict[str, Any]:
+    statuses: dict[str, int] = {}
+    for target in targets:
+        statuses[target.status] = statuses.get(target.status, 0) + 1
+    crawled = [target for target in targets if target.status != "skipped"]
+    rows = sum(target.rows for target in crawled)
+    requests = sum(target.requests for target in crawled)
+    return {
+        "targets": len(targets) + duplicates + len(invalid),
+        "valid": len(targets),
+        "invalid": len(invalid),
+        "duplicates": duplicates,
+        "statuses": statuses,
+        "rows": rows,
+        "requests": requests,
+        "throttled": sum(target.throttled for target in crawled),
+        "failed_requests": sum(target.failed_requests for target in crawled),
+        "elapsed": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        "requests_per_sec": round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+        "session": runner.session_stats if runner is not None else None,
+    }
+
+
+def print_summary(summary: dict[str, Any]) -> None:
+    statuses = summary["statuses"]
+    session = summary["session"] or {}
+    print(
+        f"\n目标 {summary['targets']}（有效 {summary['valid']}，重复 {summary['duplicates']}，"
+        f"无效 {summary['invalid']}）\n"
+        f"完成 {statuses.get('ok', 0)}  无数据 {statuses.get('empty', 0)}  失败 {statuses.get('failed', 0)}  "
+        f"跳过 {statuses.get('skipped', 0)}  中断 {statuses.get('interrupted', 0)}\n"
+        f"行数 {summary['rows']:,}  请求 {summary['requests']:,}（风控 {summary['throttled']}，"
+        f"失败 {summary['failed_requests']}）  "
+        f"连接复用 {session.get('reuse_ratio', 0.0):.0%}\n"
+        f"耗时 {summary['elapsed']:.1f}s  {summary['rows_per_sec']:,.1f} 行/s  "
+        f"{summary['requests_per_sec']:.2f} 请求/s",
+        file=sys.stderr,
+    )
+
+
+def exit_code(targets: list[Target], invalid: list[str], interrupted: bool) -> int:
+    if interrupted:
+        return EXIT_INTERRUPTED
+    if invalid or any(target.status == "failed" for target in targets):
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def write_report(path: str, report: dict[str, Any]) -> None:
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if path == "-":
+        print(text)
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="?", default="-", help="目标文件，每行一个；- 或省略表示从标准输入读取")
+    parser.add_argument("-o", "--output", default="output", help="输出目录")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="csv", help="输出格式")
+    parser.add_argument("--compression", choices=tuple(_COMPRESSION_SUFFIXES), default="none",
+                        help="JSONL 压缩方式")
+    parser.add_argument("-j", "--concurrency", type=int, default=2, help="同时爬取的目标数")
+    parser.add_argument("--rate", type=float, default=GLOBAL_RATE_LIMIT, help="所有目标共用的请求速率上限（次/秒）")
+    parser.add_argument("--checkpoint-dir", help="检查点目录；已完成的目标在重跑时跳过")
+    parser.add_argument("--force", action="store_true", help="忽略已有检查点，全部重新爬取")
+    parser.add_argument("--max-pages", type=int, default=100, help="每个目标的最大页数")
+    parser.add_argument("--no-replies", action="store_true", help="只爬主评论")
+    parser.add_argument("--sort", choices=("time", "hot"), default="time", help="评论排序")
+    parser.add_argument("--keyword", default="", help="动态关键词过滤表达式（仅用户空间目标）")
+    parser.add_argument("--report", help="JSON 运行报告的路径，- 表示输出到标准输出")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出爬虫的详细日志")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        stream=sys.stderr,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    if args.concurrency < 1 or args.rate <= 0 or args.max_pages < 1:
+        parser.error("--concurrency、--max-pages 必须至少为 1，--rate 必须大于 0")
+    if args.format in ("parquet", "arrow"):
+        from src.exporter.parquet_exporter import ParquetExporter
+
+        if not ParquetExporter.available():
+            print("导出 Parquet / Arrow 需要安装 pyarrow", file=sys.stderr)
+            return EXIT_USAGE
+
+    try:
+        if args.targets == "-":
+            targets, invalid, duplicates = read_targets(sys.stdin)
+        else:
+            with open(args.targets, encoding="utf-8-sig") as f:
+                targets, invalid, duplicates = read_targets(f)
+    except OSError as exc:
+        print(f"无法读取目标文件: {exc}", file=sys.stderr)
+        return EXIT_USAGE
+    for line in invalid:
+        print(f"无法识别的目标: {line}", file=sys.stderr)
+
+    started_at = time.time()
+    started = time.monotonic()
+    runner = None
+    if targets:
+        runner = BatchRunner(args)
+        runner.run(targets)
+    interrupted = runner is not None and runner.interrupted
+    summary = summarize(targets, invalid, duplicates, time.monotonic() - started, runner)
+    print_summary(summary)
+    code = exit_code(targets, invalid, interrupted)
+    if args.report:
+        write_report(args.report, {
+            "started_at": started_at,
+            "finished_at": time.time(),
+            "exit_code": code,
+            "options": {key: value for key, value in vars(args).items() if key not in ("report", "verbose")},
+            "summary": summary,
+            "targets": [target.report() for target in targets],
+            "invalid": invalid,
+        })
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,548 @@
+"""
+Headless JSON-RPC server around the sidecar handlers.
+
+For machines without the desktop shell. Every sidecar method (comments.start,
+dynamics.start, task.stop, jobs.*, results.*, export.file / export.csv, ...)
+is served as JSON-RPC 2.0 over local HTTP or a Unix socket, to any number of
+clients at once:
+
+    POST /rpc             {"jsonrpc":"2.0","id":1,"method":"comments.start","params":{...}}
+                          a JSON array is a batch; requests without "id" are notifications
+    GET  /events          ?since=N&job_id=J&timeout=S  long-poll for events after sequence N
+    GET  /events/stream   ?since=N&job_id=J  NDJSON, ends once job J reaches a final state
+    GET  /results/stream  ?job_id=J&offset=N  NDJSON row batches of job J from row N, follows
+                          the crawl and ends once the job is over and every row has been sent
+                          (410 once the job's results have been released, see below)
+    GET  /metrics         Prometheus text format
+    GET  /health
+
+Jobs share one scheduler, rate limiter and HTTP session exactly as in the
+desktop sidecar. Every job keeps its own results: search.query, threads.*,
+results.* and export.* take a job_id (default: the most recently finished job
+of the kind), and /results/stream follows one job's rows while it crawls.
+Only the last RESULT_JOBS_KEPT finished jobs keep their rows in memory; older
+ones remain in jobs.list with results_released set. To
+have each job write its own file instead, pass stream_path (and stream_format /
+stream_partition) to comments.start / dynamics.start.
+
+    python backend/server.py --port 8765
+    python backend/server.py --unix /run/bilibili-crawler.sock
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import itertools
+import json
+import logging
+import os
+import signal
+import socketserver
+import stat
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.sidecar import JOB_FINAL_STATES, Sidecar
+from config.config import (
+    SERVER_EVENT_HISTORY,
+    SERVER_HOST,
+    SERVER_MAX_BODY,
+    SERVER_PORT,
+    SERVER_SHUTDOWN_TIMEOUT,
+)
+
+logger = logging.getLogger("server")
+
+# JSON-RPC 2.0 错误码
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+APPLICATION_ERROR = -32000
+
+_JOB_START_METHODS = ("comments.start", "dynamics.start")
+
+# 长轮询最长等待 / 流式订阅的心跳间隔（秒）
+MAX_POLL_TIMEOUT = 60.0
+STREAM_HEARTBEAT = 15.0
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class EventHub:
+    """
+    事件缓冲与订阅
+
+    每条事件分配递增序号，最近 capacity 条保留在环形缓冲中。客户端带上已收到的最大序号拉取
+    之后的事件，没有新事件时阻塞等待；落后太多（所需事件已被挤出缓冲）时标记 missed。
+    """
+
+    def __init__(self, capacity: int = SERVER_EVENT_HISTORY) -> None:
+        self._events: collections.deque[tuple[int, dict[str, Any]]] = collections.deque(maxlen=capacity)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, payload: dict[str, Any]) -> None:
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, payload))
+            self._cond.notify_all()
+
+    def since(
+        self, seq: int, job_id: str | None = None, timeout: float = 0.0
+    ) -> tuple[list[dict[str, Any]], int, bool]:
+        """
+        Args:
+            seq: 客户端已收到的最大序号（从头开始时为 0；大于最新序号说明服务重启过，从头返回）
+            job_id: 只返回该任务的事件
+            timeout: 没有新事件时最多等待的秒数
+
+        Returns:
+            (事件列表（每条带 seq 字段）, 下次拉取用的序号, 是否有事件已被挤出缓冲)
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            events = self._events
+            if seq > self._seq:
+                seq = 0
+            missed = bool(events) and events[0][0] > seq + 1
+            while True:
+                start = max(seq - events[0][0] + 1, 0) if events else 0
+                found = [
+                    {"seq": event_seq, **payload}
+                    for event_seq, payload in itertools.islice(events, start, None)
+                    if job_id is None or payload.get("job_id") == job_id
+                ]
+                # 已扫描到最新，等待期间只需检查之后的事件
+                seq = max(seq, self._seq)
+                remaining = deadline - time.monotonic()
+                if found or remaining <= 0:
+                    return found, seq, missed
+                self._cond.wait(remaining)
+
+
+class RpcSidecar(Sidecar):
+    """
+    服务模式的 Sidecar
+
+    响应交还给发起调用的 RPC 请求，事件送入 EventHub 供订阅；请求处理沿用 Sidecar.handle，
+    方法和参数与桌面端完全一致。
+    """
+
+    def __init__(self, hub: EventHub | None = None) -> None:
+        super().__init__(event_window=0)
+        self.hub = hub or EventHub()
+        self.started = time.time()
+        self._calls: dict[str, list[dict[str, Any]]] = {}
+        self._call_ids = itertools.count(1)
+        self._counters: collections.Counter[str] = collections.Counter()
+        self._counter_lock = threading.Lock()
+
+    def _send(self, payload: dict[str, Any], urgent: bool = False) -> None:
+        if payload.get("kind") == "response":
+            responses = self._calls.get(payload.get("id"))
+            if responses is not None:
+                responses.append(payload)
+                return
+        if payload.get("event") == "finished":
+            self._count("jobs_finished")
+            self._count("rows", int(payload.get("count") or 0))
+        self.hub.publish(payload)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._counter_lock:
+            self._counters[name] += amount
+
+    def call(self, method: Any, params: Any = None) -> dict[str, Any]:
+        """
+        执行一次 Sidecar 请求
+
+        Returns:
+            响应中除 kind / id / ok 之外的字段
+
+        Raises:
+            RpcError: 请求无效，或处理失败（APPLICATION_ERROR，消息与桌面端的 error 相同）
+        """
+        if not isinstance(method, str) or not method:
+            raise RpcError(INVALID_REQUEST, "缺少 method")
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            raise RpcError(INVALID_REQUEST, "params 必须是对象")
+        call_id = f"rpc-{next(self._call_ids)}"
+        responses = self._calls[call_id] = []
+        try:
+            self.handle({"id": call_id, "method": method, "params": params})
+        finally:
+            del self._calls[call_id]
+        self._count("rpc_calls")
+        response = responses[0] if responses else {}
+        if not response.get("ok", True):
+            self._count("rpc_errors")
+            raise RpcError(APPLICATION_ERROR, str(response.get("error") or "请求失败"))
+        if method in _JOB_START_METHODS:
+            self._count("jobs_submitted")
+        return {key: value for key, value in response.items() if key not in ("kind", "id", "ok")}
+
+    def job_done(self, job_id: str) -> bool | None:
+        """任务是否已结束；任务不存在时为 None"""
+        job = self._scheduler.get(job_id)
+        return None if job is None else job.status in JOB_FINAL_STATES
+
+    def job_rows(self, job_id: str, offset: int) -> dict[str, Any] | None:
+        """
+        任务从 offset 起的一批结果行（去掉内部字段，最多 MAX_PAGE_SIZE 条）
+
+        Returns:
+            ResultView.page 的结果；任务不存在或尚未开始爬取时为 None
+
+        Raises:
+            ValueError: 任务的结果已释放
+        """
+        from src.processor.result_view import MAX_PAGE_SIZE
+
+        job = self._scheduler.get(job_id)
+        if job is None or (job.search_index is None and not job.results_released):
+            return None
+        return self._get_result_view({"job_id": job_id}).page(offset=offset, limit=MAX_PAGE_SIZE)
+
+    def stream_opened(self, delta: int) -> None:
+        self._count("event_streams", delta)
+
+    def metrics(self) -> str:
+        """Prometheus 文本格式的运行指标"""
+        with self._counter_lock:
+            counters = dict(self._counters)
+        statuses = collections.Counter(job["status"] for job in self._scheduler.list())
+        limiter = self._rate_limiter.stats()
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: dict[str, Any]) -> None:
+            lines.append(f"# HELP crawler_{name} {help_text}")
+            lines.append(f"# TYPE crawler_{name} {kind}")
+            for labels, value in samples.items():
+                lines.append(f"crawler_{name}{labels} {value}")
+
+        metric("uptime_seconds", "gauge", "Seconds since the server started.", {"": round(time.time() - self.started, 3)})
+        metric("rpc_calls_total", "counter", "JSON-RPC calls handled.", {"": counters.get("rpc_calls", 0)})
+        metric("rpc_errors_total", "counter", "JSON-RPC calls that failed.", {"": counters.get("rpc_errors", 0)})
+        metric("events_total", "counter", "Events published to subscribers.", {"": self.hub.last_seq})
+        metric("event_streams", "gauge", "Open /events/stream connections.", {"": counters.get("event_streams", 0)})
+        metric("jobs_submitted_total", "counter", "Crawl jobs submitted.", {"": counters.get("jobs_submitted", 0)})
+        metric("jobs_finished_total", "counter", "Crawl jobs that finished.", {"": counters.get("jobs_finished", 0)})
+        metric("rows_total", "counter", "Rows collected by finished jobs.", {"": counters.get("rows", 0)})
+        metric(
+            "jobs", "gauge", "Retained jobs by status.",
+            {f'{{status="{status}"}}': statuses.get(status, 0) for status in ("queued", "running", *JOB_FINAL_STATES)},
+        )
+        metric("jobs_max_concurrent", "gauge", "Concurrent job limit.", {"": self._scheduler.max_concurrent})
+        metric("rate_limit_rate", "gauge", "Current shared request rate (req/s).", {"": limiter["rate"]})
+        metric("rate_limit_max_rate", "gauge", "Configured request rate ceiling (req/s).", {"": limiter["max_rate"]})
+        metric("api_requests_total", "counter", "API requests admitted by the rate limiter.", {"": limiter["requests"]})
+        metric("api_throttled_total", "counter", "API requests rejected with -412.", {"": limiter["throttled"]})
+        metric("rate_limit_wait_seconds_total", "counter", "Time spent waiting for the rate limiter.", {"": limiter["waited"]})
+        session = self._session_stats()
+        if session is not None:
+            metric("http_requests_total", "counter", "HTTP requests sent on the shared session.", {"": session["requests"]})
+            metric("http_connections_total", "counter", "HTTP connections opened.", {"": session["connections"]})
+            metric("http_connection_reuse_ratio", "gauge", "Share of requests on a reused connection.", {"": session["reuse_ratio"]})
+            metric("http_pool_size", "gauge", "Connection pool size per host.", {"": session["pool_size"]})
+        return "\n".join(lines) + "\n"
+
+
+def _rpc_error(request_id: Any, code: int, message: str) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _query_value(query: dict[str, list[str]], name: str, default: str = "") -> str:
+    values = query.get(name)
+    return values[0] if values else default
+
+
+class RpcHandler(BaseHTTPRequestHandler):
+    server_version = "BilibiliCrawler"
+
+    @property
+    def sidecar(self) -> RpcSidecar:
+        return self.server.sidecar  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002  (基类的参数名)
+        # Unix socket 的 client_address 为空字符串，不用基类的 address_string()
+        logger.debug(format, *args)
+
+    # ============================================================
+    #  HTTP
+    # ============================================================
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path != "/rpc":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > SERVER_MAX_BODY:
+            self._send_json(413, _rpc_error(None, INVALID_REQUEST, f"请求体无效或超过 {SERVER_MAX_BODY} 字节"))
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as exc:
+            self._send_json(200, _rpc_error(None, PARSE_ERROR, f"请求 JSON 无效: {exc}"))
+            return
+        if isinstance(request, list):
+            if not request:
+                self._send_json(200, _rpc_error(None, INVALID_REQUEST, "批量请求为空"))
+                return
+            replies = [reply for reply in map(self._dispatch, request) if reply is not None]
+        else:
+            replies = self._dispatch(request)
+        if replies:
+            self._send_json(200, replies)
+        else:
+            # 全部是通知
+            self.send_response(204)
+            self.end_headers()
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/health":
+            self._send_json(200, {"ok": True, "jobs": self.sidecar._scheduler.active()})
+        elif url.path == "/metrics":
+            self._send_body(200, self.sidecar.metrics().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        elif url.path == "/events":
+            self._poll_events(query)
+        elif url.path == "/events/stream":
+            self._stream_events(query)
+        elif url.path == "/results/stream":
+            self._stream_results(query)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _dispatch(self, request: Any) -> dict[str, Any] | None:
+        if not isinstance(request, dict):
+            return _rpc_error(None, INVALID_REQUEST, "请求必须是对象")
+        request_id = request.get("id")
+        try:
+            result = self.sidecar.call(request.get("method"), request.get("params"))
+            reply = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except RpcError as exc:
+            reply = _rpc_error(request_id, exc.code, str(exc))
+        return reply if "id" in request else None
+
+    def _poll_events(self, query: dict[str, list[str]]) -> None:
+        try:
+            since = int(_query_value(query, "since", "0"))
+            timeout = min(max(float(_query_value(query, "timeout", "0")), 0.0), MAX_POLL_TIMEOUT)
+        except ValueError:
+            self._send_json(400, {"error": "since / timeout 必须是数字"})
+            return
+        job_id = _query_value(query, "job_id") or None
+        events, next_seq, missed = self.sidecar.hub.since(since, job_id, timeout)
+        self._send_json(200, {"events": events, "next": next_seq, "missed": missed})
+
+    def _stream_events(self, query: dict[str, list[str]]) -> None:
+        """NDJSON 事件流；指定 job_id 时在该任务结束、事件发完后关闭，否则直到客户端断开"""
+        try:
+            seq = int(_query_value(query, "since", "0"))
+        except ValueError:
+            self._send_json(400, {"error": "since 必须是数字"})
+            return
+        job_id = _query_value(query, "job_id") or None
+        if job_id is not None and self.sidecar.job_done(job_id) is None:
+            self._send_json(404, {"error": "任务不存在"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        hub = self.sidecar.hub
+        self.sidecar.stream_opened(1)
+        try:
+            while True:
+                # 任务的最后一批事件在状态变为结束之前发布，先取状态再拉取不会漏掉
+                done = job_id is not None and self.sidecar.job_done(job_id)
+                events, next_seq, missed = hub.since(seq, job_id, 0.0 if done else STREAM_HEARTBEAT)
+                lines = [{"kind": "missed", "since": seq}] if missed else []
+                lines.extend(events)
+                seq = next_seq
+                if done and not lines:
+                    return
+                # 空行作心跳，同时能及时发现客户端已断开
+                chunk = "".join(json.dumps(line, ensure_ascii=False, default=str) + "\n" for line in lines) or "\n"
+                self.wfile.write(chunk.encode("utf-8"))
+                self.wfile.flush()
+                if done:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.sidecar.stream_opened(-1)
+
+    def _stream_results(self, query: dict[str, list[str]]) -> None:
+        """
+        NDJSON 结果流：每行一批 {"kind": "rows", "offset", "items"}，爬取中随新行到达继续推送，
+        任务结束且全部行发完后以 {"kind": "done", "status", "total"} 收尾
+        """
+        job_id = _query_value(query, "job_id")
+        try:
+            offset = max(int(_query_value(query, "offset", "0")), 0)
+        except ValueError:
+            self._send_json(400, {"error": "offset 必须是数字"})
+            return
+        if not job_id:
+            self._send_json(400, {"error": "缺少 job_id"})
+            return
+        if self.sidecar.job_done(job_id) is None:
+            self._send_json(404, {"error": "任务不存在"})
+            return
+        try:
+            self.sidecar.job_rows(job_id, offset)
+        except ValueError as exc:
+            self._send_json(410, {"error": str(exc)})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        hub = self.sidecar.hub
+        self.sidecar.stream_opened(1)
+        try:
+            while True:
+                # 先取事件序号和任务状态再读行：看到已结束时行已全部到达，
+                # 读完之后才到达的行总伴随新事件（进度 / 统计 / 结束），等待会被唤醒
+                seq = hub.last_seq
+                done = self.sidecar.job_done(job_id)
+                lines = []
+                released = False
+                while True:
+                    try:
+                        page = self.sidecar.job_rows(job_id, offset)
+                    except ValueError as exc:
+                        # 读完之前结果被释放（期间又结束了多个任务）
+                        lines.append({"kind": "error", "message": str(exc)})
+                        released = done = True
+                        break
+                    if not page or not page["items"]:
+                        break
+                    lines.append({"kind": "rows", "offset": offset, "items": page["items"]})
+                    offset += len(page["items"])
+                if done is not False and not released:
+                    job = self.sidecar._scheduler.get(job_id)
+                    lines.append({"kind": "done", "status": job.status if job else None, "total": offset})
+                if lines:
+                    for line in lines:
+                        self.wfile.write((json.dumps(line, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                    if done is not False:
+                        return
+                    continue
+                events, _, _ = hub.since(seq, job_id, STREAM_HEARTBEAT)
+                # 等待超时写空行作心跳，同时能及时发现客户端已断开
+                if not events:
+                    self.wfile.write(b"\n")
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.sidecar.stream_opened(-1)
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self._send_body(status, body, "application/json; charset=utf-8")
+
+    def _send_body(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class RpcHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], sidecar: RpcSidecar) -> None:
+        super().__init__(address, RpcHandler)
+        self.sidecar = sidecar
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class RpcUnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, path: str, sidecar: RpcSidecar) -> None:
+            super().__init__(path, RpcHandler)
+            self.sidecar = sidecar
+            os.chmod(path, 0o600)  # 只允许当前用户连接
+
+else:  # Windows 的 socketserver 没有 Unix socket
+    RpcUnixServer = None
+
+
+def make_server(
+    sidecar: RpcSidecar, host: str = SERVER_HOST, port: int = SERVER_PORT, unix_path: str | None = None
+) -> socketserver.BaseServer:
+    if not unix_path:
+        return RpcHTTPServer((host, port), sidecar)
+    if RpcUnixServer is None:
+        raise RuntimeError("当前平台不支持 Unix socket，请改用 --host / --port")
+    if os.path.exists(unix_path) and stat.S_ISSOCK(os.stat(unix_path).st_mode):
+        os.unlink(unix_path)  # 上次异常退出留下的 socket 文件
+    return RpcUnixServer(unix_path, sidecar)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVER_HOST, help="HTTP 监听地址")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="HTTP 监听端口")
+    parser.add_argument("--unix", metavar="PATH", help="改为监听 Unix socket")
+    parser.add_argument("--max-concurrent", type=int, help="同时运行的任务数（默认取配置）")
+    parser.add_argument("--rate", type=float, help="所有任务共用的请求速率上限（次/秒）")
+    args = parser.parse_args()
+
+    sidecar = RpcSidecar()
+    if args.max_concurrent is not None or args.rate is not None:
+        sidecar.call("jobs.configure", {"max_concurrent": args.max_concurrent, "rate": args.rate})
+    try:
+        server = make_server(sidecar, args.host, args.port, args.unix)
+    except (OSError, RuntimeError) as exc:
+        logger.error("无法启动服务: %s", exc)
+        sys.exit(1)
+    # SIGTERM 与 Ctrl+C 一样：停止接收请求、停止全部任务后退出
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    logger.info("listening on %s", args.unix or f"http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sidecar.call("task.stop")
+        # 等任务线程收尾（关闭流式输出文件、写入用户索引）后再退出，daemon 线程不会等
+        if not sidecar._scheduler.join(SERVER_SHUTDOWN_TIMEOUT):
+            logger.warning("仍有任务在 %.0f 秒内未结束，强制退出", SERVER_SHUTDOWN_TIMEOUT)
+        sidecar.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+if __name__ == "__main__":
+    main()
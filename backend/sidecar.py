@@ -6,33 +6,52 @@ Requests arrive on stdin:
 
 Events and responses are written to stdout as one JSON object per line.
 Logging goes to stderr so it never corrupts the protocol stream.
+
+Only the standard library, config and the small index / scheduling modules
+load before "ready". requests, qrcode / Pillow, the crawlers, exporters and
+the NumPy-backed processors are imported where they are first used.
 """
 from __future__ import annotations
 
-import base64
-import io
+import collections
+import heapq
+import itertools
 import json
 import logging
 import queue
-import re
 import sys
 import threading
 import time
 from pathlib import Path
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-import qrcode
+from config.config import (
+    EVENT_BATCH_WINDOW,
+    EVENT_QUEUE_LIMIT,
+    GLOBAL_RATE_LIMIT,
+    LIVE_STATS_INTERVAL,
+    MAX_CONCURRENT_JOBS,
+    RESULT_JOBS_KEPT,
+)
+from src.api.rate_limiter import RateLimiter
+from src.crawler.progress import ProgressEstimator
+from src.exporter.factory import open_stream_exporter
+from src.index.search_index import SearchIndex
+from src.index.thread_index import ThreadIndex
 
-from src.api.bilibili_api import BilibiliAPI
-from src.crawler.comment_crawler import CommentCrawler
-from src.crawler.dynamic_crawler import DynamicCrawler
-from src.exporter.csv_exporter import CSVExporter
-from src.processor.data_processor import DataProcessor
-from utils.helpers import extract_uid, parse_input
+if TYPE_CHECKING:
+    from src.api.bilibili_api import BilibiliAPI
+    from src.api.session_pool import SessionManager
+    from src.crawler.comment_crawler import CommentCrawler
+    from src.crawler.dynamic_crawler import DynamicCrawler
+    from src.exporter.factory import StreamExporter
+    from src.index.user_index import UserActivityIndex
+    from src.processor.pipeline import ProcessingPipeline
+    from src.processor.result_view import ResultView
 
 logging.basicConfig(
     level=logging.INFO,
@@ -41,30 +60,408 @@ logging.basicConfig(
 )
 logger = logging.getLogger("sidecar")
 
+_FORMAT_EXTENSIONS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def _format_from_path(path: str, fmt: str | None = None) -> str:
+    """
+    导出格式：fmt 为空时按扩展名推断，默认 CSV
+
+    .gz / .zst 等压缩后缀只有 JSONL 支持；其他格式带这类后缀时报错，而不是往 .gz 路径写未压缩的文件。
+    """
+    from src.exporter.jsonl_exporter import compression_from_path
+
+    target = Path(path)
+    compression = compression_from_path(path)
+    if compression:
+        target = target.with_suffix("")
+    fmt = fmt or _FORMAT_EXTENSIONS.get(target.suffix.lower(), "csv")
+    if compression and fmt != "jsonl":
+        raise ValueError(f"{fmt} 不支持 {compression} 压缩: {path}")
+    return fmt
+
+
+def _jsonl_options(params: dict[str, Any], prefix: str = "") -> dict[str, Any]:
+    """JSONL 导出参数：payload（record / raw / both）与 compression（默认按扩展名）"""
+    return {
+        "payload": params.get(f"{prefix}payload") or "record",
+        "compression": params.get(f"{prefix}compression") or "auto",
+    }
+
+
+def _wants_raw(params: dict[str, Any]) -> bool:
+    """keep_raw 显式开启，或边爬边写的 JSONL 需要原始接口对象时，让爬虫保留原始数据"""
+    return bool(params.get("keep_raw")) or params.get("stream_payload") in ("raw", "both")
+
+
+def _json_frame(payload: dict[str, Any]) -> bytes:
+    return (json.dumps(payload, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def read_request(stream: Any) -> dict[str, Any] | None:
+    """
+    从二进制输入流读取一行请求
+
+    Returns:
+        请求字典；空行返回 None
+
+    Raises:
+        EOFError: 输入结束
+        ValueError: 请求无法解码，该条请求被跳过
+    """
+    raw_line = stream.readline()
+    if not raw_line:
+        raise EOFError
+    line = raw_line.decode("utf-8-sig", errors="replace")
+    line = line.replace("\x00", "").strip()
+    if not line:
+        return None
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"请求 JSON 无效: {exc}") from None
+    if not isinstance(request, dict):
+        raise ValueError("请求必须是对象")
+    return request
+
+
+class EventWriter:
+    """
+    后台写出 sidecar 消息
+
+    调用方只把消息追加到内存队列，编码和 stdout 写入都在写线程完成，爬取线程不会阻塞在输出上。
+    写线程每隔 window 秒取走积攒的消息：同一任务被后续进度覆盖的 progress / 实时 stats
+    只保留最新一条，其余合并成一帧 {"kind": "batch", "events": [...]} 一次写出并 flush。
+    响应消息会立即唤醒写线程，不等待合并窗口。
+    """
+
+    def __init__(
+        self,
+        stream: Any,
+        window: float = EVENT_BATCH_WINDOW,
+        limit: int = EVENT_QUEUE_LIMIT,
+    ) -> None:
+        self._stream = stream
+        self.window = window
+        self.limit = limit
+        # deque 的 append / popleft 本身线程安全，调用方不加锁
+        self._pending: collections.deque[dict[str, Any]] = collections.deque()
+        self._wakeup = threading.Event()
+        self._urgent = threading.Event()
+        self._closed = False
+        self.dropped = 0
+        self.frames = 0
+        self.messages = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="event-writer")
+        self._thread.start()
+
+    def put(self, payload: dict[str, Any], urgent: bool = False) -> None:
+        if len(self._pending) >= self.limit and payload.get("event") == "log":
+            # stdout 跟不上时丢日志，进度、结果和响应照常送达
+            self.dropped += 1
+            return
+        self._pending.append(payload)
+        if urgent:
+            self._urgent.set()
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._urgent.set()
+        self._wakeup.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        pending = self._pending
+        while True:
+            self._wakeup.wait()
+            if not self._closed:
+                # 合并窗口：响应或关闭会提前结束等待
+                self._urgent.wait(self.window)
+            self._wakeup.clear()
+            self._urgent.clear()
+            batch = [pending.popleft() for _ in range(len(pending))]
+            dropped, self.dropped = self.dropped, 0
+            if dropped:
+                batch.append({"kind": "event", "event": "log", "message": f"输出过快，已丢弃 {dropped} 条日志"})
+            if batch:
+                self._write(_coalesce(batch))
+            if self._closed and not pending:
+                return
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        frame = batch[0] if len(batch) == 1 else {"kind": "batch", "events": batch}
+        try:
+            self._stream.write(_json_frame(frame))
+            self._stream.flush()
+        except (OSError, ValueError):
+            # 宿主进程已关闭管道，后续消息无人接收
+            logger.exception("failed to write sidecar output")
+        self.frames += 1
+        self.messages += len(batch)
+
+
+def _coalesce(batch: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """去掉被同一任务后续消息覆盖的 progress 和实时 stats，其余保持原顺序"""
+    seen: set[tuple[Any, ...]] = set()
+    kept = []
+    for payload in reversed(batch):
+        event = payload.get("event")
+        if event == "progress" or (event == "stats" and payload.get("live")):
+            key = (event, payload.get("job_id"), payload.get("mode"), payload.get("status"))
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(payload)
+    kept.reverse()
+    return kept
+
+
+JOB_FINAL_STATES = ("finished", "failed", "cancelled")
+_KIND_LABELS = {"comments": "评论", "dynamics": "动态"}
+
+
+class Job:
+    """一个爬取任务：queued -> running -> finished / failed / cancelled"""
+
+    def __init__(self, job_id: str, mode: str, params: dict[str, Any], priority: int) -> None:
+        self.id = job_id
+        self.mode = mode
+        self.params = params
+        self.priority = priority
+        self.status = "queued"
+        self.crawler: CommentCrawler | DynamicCrawler | None = None
+        self.stop_requested = False
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.count = 0
+        self.progress: dict[str, Any] = {}
+        self.error: str | None = None
+        # 本任务的结果（爬取开始时创建，爬取中即可查询已到达的部分）
+        self.rows: list[dict[str, Any]] = []
+        self.search_index: SearchIndex | None = None
+        self.thread_index: ThreadIndex | None = None
+        self.result_view: ResultView | None = None
+        self.results_released = False
+
+    def stop(self) -> None:
+        self.stop_requested = True
+        crawler = self.crawler
+        if crawler is not None:
+            crawler.stop()
+
+    def release_results(self) -> None:
+        """丢弃结果行和索引，只保留状态信息"""
+        self.rows = []
+        self.search_index = None
+        self.thread_index = None
+        self.result_view = None
+        self.results_released = True
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "mode": self.mode,
+            "status": self.status,
+            "priority": self.priority,
+            "input": self.params.get("input") or self.params.get("uid"),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "count": self.count,
+            "progress": self.progress,
+            "error": self.error,
+            "results_released": self.results_released,
+        }
+
+
+class JobScheduler:
+    """
+    任务调度器
+
+    任务按优先级（大者先，同级先到先得）进入堆，运行中的任务数不超过并发上限；
+    任务结束时自动拉起下一个。取消排队中的任务只做标记，出堆时跳过。
+    on_finished(job, idle) 在任务移出运行集合后调用，idle 表示此时已没有排队或运行中的任务。
+    判断 idle 和回调在同一把结束锁内依次完成，同时结束的多个任务中只有最后一个得到 True，
+    且它的回调也最后执行（界面不会在 idle 之后又收到 running）。
+    """
+
+    # 保留的已结束任务数（更早的从 jobs.list 中移除）
+    HISTORY = 100
+
+    def __init__(
+        self,
+        runner: Callable[[Job], None],
+        max_concurrent: int = MAX_CONCURRENT_JOBS,
+        on_finished: Callable[[Job, bool], None] | None = None,
+    ) -> None:
+        self._runner = runner
+        self._on_finished = on_finished
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self._lock = threading.Lock()
+        # 串行化任务结束的 idle 判断与 on_finished 回调
+        self._finish_lock = threading.Lock()
+        self._heap: list[tuple[int, int, Job]] = []
+        self._seq = itertools.count()
+        self._jobs: dict[str, Job] = {}
+        self._running: dict[str, threading.Thread] = {}
+
+    def submit(self, mode: str, params: dict[str, Any], priority: int = 0) -> Job:
+        with self._lock:
+            seq = next(self._seq)
+            job = Job(f"{mode}-{seq + 1}", mode, params, priority)
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (-priority, seq, job))
+            self._prune_locked()
+        self._pump()
+        return job
+
+    def _pump(self) -> None:
+        """在并发上限内启动排队中的任务"""
+        with self._lock:
+            while self._heap and len(self._running) < self.max_concurrent:
+                _, _, job = heapq.heappop(self._heap)
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+                thread = threading.Thread(target=self._run, args=(job,), daemon=True, name=job.id)
+                self._running[job.id] = thread
+                thread.start()
+
+    def _run(self, job: Job) -> None:
+        try:
+            self._runner(job)
+            if job.status == "running":
+                job.status = "cancelled" if job.stop_requested else "finished"
+        except Exception as exc:
+            job.status = "failed"
+            job.error = str(exc)
+        finally:
+            job.finished_at = time.time()
+            job.crawler = None
+            with self._finish_lock:
+                with self._lock:
+                    self._running.pop(job.id, None)
+                    idle = not self._running and not any(queued.status == "queued" for _, _, queued in self._heap)
+                self._pump()
+                if self._on_finished is not None:
+                    try:
+                        self._on_finished(job, idle)
+                    except Exception:
+                        logger.exception("job finished callback failed")
+
+    def _prune_locked(self) -> None:
+        done = [job for job in self._jobs.values() if job.status in JOB_FINAL_STATES]
+        for job in done[:max(len(done) - self.HISTORY, 0)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """取消排队中的任务或停止运行中的任务；任务不存在或已结束时返回 False"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in JOB_FINAL_STATES:
+                return False
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                return True
+        job.stop()
+        return True
+
+    def cancel_all(self) -> int:
+        """停止全部运行中的任务并取消全部排队任务，返回受影响的任务数"""
+        with self._lock:
+            active = [job.id for job in self._jobs.values() if job.status in ("queued", "running")]
+        return sum(self.cancel(job_id) for job_id in active)
+
+    def set_limit(self, max_concurrent: int) -> None:
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self._pump()
+
+    def active(self) -> int:
+        """排队中和运行中的任务数"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def list(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [job.snapshot() for job in self._jobs.values()]
+
+    def join(self, timeout: float) -> bool:
+        """等待运行中的任务线程结束，最多 timeout 秒；全部结束时返回 True"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            threads = list(self._running.values())
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0.0))
+        return not any(thread.is_alive() for thread in threads)
+
 
 class Sidecar:
-    def __init__(self) -> None:
+    def __init__(self, stream: Any = None, event_window: float = EVENT_BATCH_WINDOW) -> None:
+        """
+        Args:
+            stream: 消息输出的二进制流，默认 sys.stdout.buffer
+            event_window: 事件合并窗口（秒），0 时每条消息在调用线程直接写出
+        """
+        self._stream = stream or sys.stdout.buffer
         self._write_lock = threading.Lock()
+        self._writer = EventWriter(self._stream, event_window) if event_window > 0 else None
         self._task_lock = threading.Lock()
         self._qr_cancel = threading.Event()
-        self._active_crawler: CommentCrawler | DynamicCrawler | None = None
-        self._active_thread: threading.Thread | None = None
         self._qr_thread: threading.Thread | None = None
-        self._api = BilibiliAPI()
+        self._rate_limiter = RateLimiter(GLOBAL_RATE_LIMIT)
+        self._scheduler = JobScheduler(self._run_job, on_finished=self._job_finished)
+        self._sessions: SessionManager | None = None
+        self._api: BilibiliAPI | None = None
         self._logged_in = False
-        self._last_comments: list[dict[str, Any]] = []
-        self._last_dynamics: list[dict[str, Any]] = []
+        # 各类型最近结束的任务：结果类请求未指定 job_id 时使用
+        self._latest_jobs: dict[str, Job] = {}
+        # 结果仍在内存中的已结束任务（先结束的在前）
+        self._finished_jobs: list[Job] = []
+        self._user_index: UserActivityIndex | None = None
         self._responses: "queue.Queue[dict[str, Any]]" = queue.Queue()
 
     def emit(self, event: str, **payload: Any) -> None:
         self._send({"kind": "event", "event": event, **payload})
 
     def respond(self, request_id: Any, ok: bool = True, **payload: Any) -> None:
-        self._send({"kind": "response", "id": request_id, "ok": ok, **payload})
+        self._send({"kind": "response", "id": request_id, "ok": ok, **payload}, urgent=True)
 
-    def _send(self, payload: dict[str, Any]) -> None:
+    def _send(self, payload: dict[str, Any], urgent: bool = False) -> None:
+        if self._writer is not None:
+            self._writer.put(payload, urgent=urgent)
+            return
         with self._write_lock:
-            print(json.dumps(payload, ensure_ascii=False, default=str), flush=True)
+            self._write_direct(payload)
+
+    def _write_direct(self, payload: dict[str, Any]) -> None:
+        try:
+            self._stream.write(_json_frame(payload))
+            self._stream.flush()
+        except (OSError, ValueError):
+            logger.exception("failed to write sidecar output")
+
+    def close(self) -> None:
+        """写出队列中剩余的消息"""
+        if self._writer is not None:
+            self._writer.close()
 
     def handle(self, request: dict[str, Any]) -> None:
         request_id = request.get("id")
@@ -76,24 +473,93 @@ class Sidecar:
                     request_id,
                     logged_in=self._logged_in,
                     task_running=self._is_task_running(),
+                    jobs=self._scheduler.active(),
                 )
             elif method == "comments.start":
-                self._start_task(request_id, "comments", params, self._run_comments)
+                self._start_task(request_id, "comments", params)
             elif method == "dynamics.start":
                 if params.get("uid") is None and not self._logged_in:
                     raise RuntimeError("爬取关注页动态流需要先扫码登录")
-                self._start_task(request_id, "dynamics", params, self._run_dynamics)
+                self._start_task(request_id, "dynamics", params)
             elif method == "task.stop":
-                self._stop_task()
+                self._stop_task(params.get("job_id"))
                 self.respond(request_id)
                 self.emit("log", message="正在停止爬取任务...")
+            elif method == "jobs.status":
+                job = self._scheduler.get(str(params.get("job_id")))
+                if job is None:
+                    raise ValueError("任务不存在")
+                self.respond(request_id, job=job.snapshot())
+            elif method == "jobs.list":
+                self.respond(
+                    request_id,
+                    jobs=self._scheduler.list(),
+                    max_concurrent=self._scheduler.max_concurrent,
+                    rate_limiter=self._rate_limiter.stats(),
+                    session=self._session_stats(),
+                )
+            elif method == "jobs.cancel":
+                self.respond(request_id, cancelled=self._scheduler.cancel(str(params.get("job_id"))))
+            elif method == "jobs.configure":
+                if params.get("max_concurrent") is not None:
+                    self._scheduler.set_limit(int(params["max_concurrent"]))
+                    if self._sessions is not None:
+                        self._sessions.resize(self._scheduler.max_concurrent)
+                if params.get("rate") is not None:
+                    self._rate_limiter.set_rate(float(params["rate"]))
+                self.respond(
+                    request_id,
+                    max_concurrent=self._scheduler.max_concurrent,
+                    rate_limiter=self._rate_limiter.stats(),
+                )
             elif method == "qr.login.start":
                 self._start_qr_login(request_id)
             elif method == "qr.login.cancel":
                 self._qr_cancel.set()
                 self.respond(request_id)
-            elif method == "export.csv":
-                self._export_csv(request_id, params)
+            elif method in ("export.file", "export.csv"):
+                self._export_file(request_id, params)
+            elif method == "store.query":
+                self._store_query(request_id, params)
+            elif method == "search.query":
+                self._search_query(request_id, params)
+            elif method == "results.page":
+                result = self._get_result_view(params).page(
+                    params.get("cursor"),
+                    offset=int(params.get("offset", 0)),
+                    limit=int(params.get("limit", 50)),
+                    fields=params.get("fields"),
+                )
+                self.respond(request_id, **result)
+            elif method == "results.query":
+                result = self._get_result_view(params).query(
+                    params.get("filters"),
+                    sort=params.get("sort"),
+                    descending=params.get("order", "desc") != "asc",
+                    limit=int(params.get("limit", 50)),
+                    fields=params.get("fields"),
+                )
+                self.respond(request_id, **result)
+            elif method == "threads.get":
+                self._get_thread(request_id, params)
+            elif method == "users.lookup":
+                users = self._get_user_index().lookup(
+                    user_id=params.get("user_id"),
+                    username=params.get("username"),
+                    limit=int(params.get("limit", 100)),
+                    offset=int(params.get("offset", 0)),
+                )
+                self.respond(request_id, users=users)
+            elif method == "users.top":
+                users = self._get_user_index().top_users(
+                    int(params.get("k", 10)), by=params.get("by", "comments")
+                )
+                self.respond(request_id, users=users)
+            elif method == "threads.top":
+                threads = self._get_thread_index(params).top_threads(
+                    int(params.get("k", 10)), by=params.get("by", "size")
+                )
+                self.respond(request_id, threads=threads)
             else:
                 raise ValueError(f"未知请求方法: {method}")
         except Exception as exc:
@@ -102,98 +568,296 @@ class Sidecar:
             self.emit("error", message=str(exc))
 
     def _is_task_running(self) -> bool:
-        return bool(self._active_thread and self._active_thread.is_alive())
+        return self._scheduler.active() > 0
 
-    def _start_task(
-        self,
-        request_id: Any,
-        name: str,
-        params: dict[str, Any],
-        runner: Callable[[dict[str, Any]], None],
-    ) -> None:
-        with self._task_lock:
-            if self._is_task_running():
-                raise RuntimeError("已有任务正在运行")
-            thread = threading.Thread(target=runner, args=(params,), daemon=True, name=name)
-            self._active_thread = thread
-            thread.start()
-        self.respond(request_id)
-        self.emit("progress", status="running", mode=name, percent=0)
+    def _start_task(self, request_id: Any, name: str, params: dict[str, Any]) -> None:
+        job = self._scheduler.submit(name, params, priority=int(params.get("priority", 0)))
+        self.respond(request_id, job_id=job.id, status=job.status)
         task_label = "评论" if name == "comments" else "动态"
-        self.emit("log", message=f"{task_label}任务已启动")
+        if job.status == "queued":
+            self.emit("log", message=f"{task_label}任务已排队（{job.id}）", job_id=job.id)
 
-    def _stop_task(self) -> None:
-        crawler = self._active_crawler
-        if crawler:
-            crawler.stop()
+    def _run_job(self, job: Job) -> None:
+        """调度器线程入口：按任务类型分发，并发出开始的进度事件"""
+        task_label = "评论" if job.mode == "comments" else "动态"
+        self.emit("progress", status="running", mode=job.mode, percent=0, job_id=job.id)
+        self.emit("log", message=f"{task_label}任务已启动（{job.id}）", job_id=job.id)
+        try:
+            if job.mode == "comments":
+                self._run_comments(job)
+            else:
+                self._run_dynamics(job)
+        finally:
+            self._release_old_results(job)
+
+    def _release_old_results(self, job: Job) -> None:
+        """只保留最近 RESULT_JOBS_KEPT 个已结束任务的结果；各类型最近的任务（默认的查询对象）始终保留"""
+        with self._task_lock:
+            self._finished_jobs.append(job)
+            latest = list(self._latest_jobs.values())
+            excess = len(self._finished_jobs) - RESULT_JOBS_KEPT
+            kept = []
+            for old in self._finished_jobs:
+                if excess > 0 and old not in latest:
+                    old.release_results()
+                    excess -= 1
+                else:
+                    kept.append(old)
+            self._finished_jobs = kept
+
+    def _job_finished(self, job: Job, idle: bool) -> None:
+        """任务结束的进度事件；最后一个任务结束时界面才回到空闲状态"""
+        self.emit("progress", status="idle" if idle else "running", mode=job.mode, percent=100, job_id=job.id)
+
+    def _stop_task(self, job_id: str | None = None) -> None:
+        if job_id:
+            if not self._scheduler.cancel(str(job_id)):
+                raise ValueError("任务不存在或已结束")
+        else:
+            self._scheduler.cancel_all()
+
+    def _make_log_callback(self, job: Job) -> Callable[[str], None]:
+        job_id = job.id
 
-    def _make_progress_callback(self, mode: str, max_pages: int) -> Callable[[str], None]:
         def callback(message: str) -> None:
-            self.emit("log", message=message)
-            match = re.search(r"第\s*(\d+)\s*页", message)
-            if not match or max_pages <= 0:
-                return
-            current_page = max(1, int(match.group(1)))
-            percent = min(99, max(1, int(current_page / max_pages * 100)))
-            self.emit("progress", status="running", mode=mode, percent=percent)
+            self.emit("log", message=message, job_id=job_id)
 
         return callback
 
-    def _run_comments(self, params: dict[str, Any]) -> None:
+    def _make_progress_hook(self, job: Job) -> Callable[[dict[str, Any]], None]:
+        """爬虫的结构化进度 -> progress 事件（完成比例、剩余时间、吞吐量）"""
+        estimator = ProgressEstimator()
+
+        def hook(progress: dict[str, Any]) -> None:
+            crawler = job.crawler
+            if job.stop_requested and crawler is not None:
+                # 停止请求恰好落在 crawl_* 清除标记之前时，在第一页结束后补上
+                crawler.stop()
+            job.progress = estimator.update(progress)
+            self.emit("progress", status="running", mode=job.mode, job_id=job.id, **job.progress)
+
+        return hook
+
+    def _get_user_index(self) -> UserActivityIndex:
+        from src.index.user_index import UserActivityIndex
+
+        with self._task_lock:
+            if self._user_index is None:
+                self._user_index = UserActivityIndex()
+            return self._user_index
+
+    def _get_sessions(self) -> SessionManager:
+        """所有任务共用的 HTTP 会话（首次使用时创建，避免启动时加载 requests）"""
+        from src.api.session_pool import SessionManager
+
+        with self._task_lock:
+            if self._sessions is None:
+                self._sessions = SessionManager(self._rate_limiter, self._scheduler.max_concurrent)
+            return self._sessions
+
+    def _get_api(self) -> BilibiliAPI:
+        """扫码登录用的 API 实例；登录 Cookie 写入共用会话，之后的任务都带上"""
+        sessions = self._get_sessions()
+        with self._task_lock:
+            if self._api is None:
+                self._api = sessions.new_api()
+            return self._api
+
+    def _session_stats(self) -> dict[str, Any] | None:
+        """连接复用统计；还没有发出过请求时为 None"""
+        return self._sessions.stats() if self._sessions is not None else None
+
+    def _make_live_stats_listener(
+        self, job: Job, pipeline: ProcessingPipeline
+    ) -> Callable[[list[dict[str, Any]]], None]:
+        from src.processor.aggregates import LiveCommentStats
+
+        live = pipeline.find_aggregator(LiveCommentStats)
+        last_emit = 0.0
+
+        def listener(_batch: list[dict[str, Any]]) -> None:
+            nonlocal last_emit
+            now = time.monotonic()
+            if live is None or now - last_emit < LIVE_STATS_INTERVAL:
+                return
+            last_emit = now
+            self.emit("stats", mode=job.mode, live=True, stats=live.snapshot(), job_id=job.id)
+
+        return listener
+
+    def _start_user_index_run(self, target: str) -> tuple[UserActivityIndex | None, int]:
+        """用户索引是附加功能，数据目录不可写等情况下只记录日志，不影响爬取"""
+        try:
+            user_index = self._get_user_index()
+            return user_index, user_index.start_run(target, "comments")
+        except Exception as exc:
+            logger.warning("user index unavailable: %s", exc)
+            return None, 0
+
+    def _open_stream(self, mode: str, params: dict[str, Any]) -> StreamExporter | None:
+        """stream_path 非空时在爬取开始前打开边爬边写的文件（格式由 stream_format 或扩展名决定）"""
+        path = params.get("stream_path")
+        if not path:
+            return None
+        fmt = _format_from_path(path, params.get("stream_format"))
+        partition = params.get("stream_partition")
+        if partition:
+            from src.exporter.partitioned import DEFAULT_CHUNK_ROWS, PartitionedExporter
+
+            options = _jsonl_options(params, "stream_") if fmt == "jsonl" else {}
+            exporter = PartitionedExporter(
+                path,
+                kind=mode,
+                fmt=fmt,
+                by=partition,
+                chunk_rows=int(params.get("stream_chunk_rows") or DEFAULT_CHUNK_ROWS),
+                **options,
+            )
+            self.emit("log", message=f"边爬边分区导出到: {path}（按 {partition}）")
+            return exporter
+        options = _jsonl_options(params, "stream_") if fmt == "jsonl" else {}
+        exporter = open_stream_exporter(mode, path, fmt, **options)
+        self.emit("log", message=f"边爬边导出到: {path}")
+        return exporter
+
+    def _close_stream(self, exporter: StreamExporter | None) -> None:
+        if exporter is None:
+            return
+        try:
+            exporter.close()
+            self.emit("log", message=f"已写入 {exporter.rows_written} 条: {exporter.filepath}")
+        except Exception as exc:
+            logger.warning("closing stream export failed: %s", exc)
+
+    def _run_comments(self, job: Job) -> None:
+        from src.crawler.comment_crawler import CommentCrawler
+        from src.processor.pipeline import ProcessingPipeline
+
+        params = job.params
+        stream = None
+        user_index = None
+        run_id = 0
         try:
             max_pages = int(params.get("max_pages", 100))
-            crawler = CommentCrawler(progress_callback=self._make_progress_callback("comments", max_pages))
-            self._active_crawler = crawler
-            comments = crawler.crawl_comments(
+            pipeline = ProcessingPipeline.for_comments(filters=params.get("filters"), live=True)
+            pipeline.add_listener(self._make_live_stats_listener(job, pipeline))
+            job.rows = pipeline.rows
+            job.search_index = SearchIndex()
+            pipeline.add_listener(job.search_index.add_rows)
+            job.thread_index = ThreadIndex()
+            pipeline.add_listener(job.thread_index.add_rows)
+            user_index, run_id = self._start_user_index_run(params.get("input", ""))
+            if user_index is not None:
+                pipeline.add_listener(lambda batch: user_index.add_rows(batch, run_id))
+            stream = self._open_stream("comments", params)
+            if stream is not None:
+                pipeline.add_listener(stream.write_batch)
+            crawler = CommentCrawler(
+                progress_callback=self._make_log_callback(job),
+                batch_callback=pipeline.feed,
+                progress_hook=self._make_progress_hook(job),
+                keep_raw=_wants_raw(params),
+                api=self._get_sessions().new_api(),
+            )
+            job.crawler = crawler
+            if job.stop_requested:
+                # crawl_* 开始时会清除停止标记，在爬取前取消的任务直接结束
+                return
+            crawler.crawl_comments(
                 params.get("input", ""),
                 include_replies=bool(params.get("include_replies", True)),
                 max_pages=max_pages,
                 mode=int(params.get("sort_mode", 3)),
             )
-            cleaned = DataProcessor.clean_comments(comments)
-            stats = DataProcessor.get_statistics(cleaned)
-            self._last_comments = cleaned
-            self.emit("stats", mode="comments", stats=stats)
-            self.emit("finished", mode="comments", count=len(cleaned), stats=stats)
+            cleaned = pipeline.rows
+            stats = pipeline.statistics()
+            self._latest_jobs["comments"] = job
+            job.count = len(cleaned)
+            self.emit("stats", mode="comments", stats=stats, job_id=job.id)
+            self.emit("finished", mode="comments", count=len(cleaned), stats=stats, job_id=job.id)
         except Exception as exc:
             logger.exception("comments task failed")
-            self.emit("error", mode="comments", message=str(exc))
+            job.status = "failed"
+            job.error = str(exc)
+            self.emit("error", mode="comments", message=str(exc), job_id=job.id)
         finally:
-            self._active_crawler = None
-            self.emit("progress", status="idle", mode="comments", percent=100)
+            if user_index is not None:
+                # 失败或取消时也写入已缓冲的用户行并结束本次运行
+                try:
+                    user_index.finish_run(run_id)
+                except Exception as exc:
+                    logger.warning("finishing user index run failed: %s", exc)
+            self._close_stream(stream)
+
+    def _run_dynamics(self, job: Job) -> None:
+        from src.crawler.dynamic_crawler import DynamicCrawler
 
-    def _run_dynamics(self, params: dict[str, Any]) -> None:
+        params = job.params
+        stream = None
         try:
             max_pages = int(params.get("max_pages", 20))
-            crawler = DynamicCrawler(progress_callback=self._make_progress_callback("dynamics", max_pages))
-            crawler.api = self._api
-            self._active_crawler = crawler
+            dedup = params.get("dedup")
+            detector = None
+            if dedup:
+                from src.processor.dedup import DEFAULT_THRESHOLD, NearDuplicateDetector
+
+                detector = NearDuplicateDetector(
+                    threshold=DEFAULT_THRESHOLD if dedup is True else float(dedup),
+                    drop=bool(params.get("dedup_drop")),
+                )
+            stream = self._open_stream("dynamics", params)
+            dynamics = job.rows
+            index = job.search_index = SearchIndex(time_field="timestamp")
+
+            def on_batch(batch: list[dict[str, Any]]) -> None:
+                if detector is not None:
+                    batch = detector.process(batch)
+                dynamics.extend(batch)
+                # 与评论一样边爬边建索引，爬取中即可 search.query
+                index.add_rows(batch)
+                if stream is not None:
+                    stream.write_batch(batch)
+
+            crawler = DynamicCrawler(
+                progress_callback=self._make_log_callback(job),
+                batch_callback=on_batch,
+                progress_hook=self._make_progress_hook(job),
+                keep_raw=_wants_raw(params),
+                api=self._get_sessions().new_api(),
+            )
+            job.crawler = crawler
+            if job.stop_requested:
+                return
             uid = params.get("uid")
             if uid is None:
-                dynamics = crawler.crawl_following_feed(
+                crawler.crawl_following_feed(
                     keyword=params.get("keyword", ""),
                     max_pages=max_pages,
                     start_time=int(params.get("start_ts", 0)),
                     end_time=int(params.get("end_ts", 0)),
                 )
             else:
-                dynamics = crawler.crawl_dynamics(
+                crawler.crawl_dynamics(
                     int(uid),
                     keyword=params.get("keyword", ""),
                     max_pages=max_pages,
                     start_time=int(params.get("start_ts", 0)),
                     end_time=int(params.get("end_ts", 0)),
                 )
-            self._last_dynamics = dynamics
+            if detector is not None and detector.duplicates:
+                self.emit("log", message=f"近似去重: 发现 {detector.duplicates} 条重复动态", job_id=job.id)
+            self._latest_jobs["dynamics"] = job
+            job.count = len(dynamics)
             stats = {"total": len(dynamics)}
-            self.emit("stats", mode="dynamics", stats=stats)
-            self.emit("finished", mode="dynamics", count=len(dynamics), stats=stats)
+            self.emit("stats", mode="dynamics", stats=stats, job_id=job.id)
+            self.emit("finished", mode="dynamics", count=len(dynamics), stats=stats, job_id=job.id)
         except Exception as exc:
             logger.exception("dynamics task failed")
-            self.emit("error", mode="dynamics", message=str(exc))
+            job.status = "failed"
+            job.error = str(exc)
+            self.emit("error", mode="dynamics", message=str(exc), job_id=job.id)
         finally:
-            self._active_crawler = None
-            self.emit("progress", status="idle", mode="dynamics", percent=100)
+            self._close_stream(stream)
 
     def _start_qr_login(self, request_id: Any) -> None:
         if self._qr_thread and self._qr_thread.is_alive():
@@ -204,8 +868,13 @@ class Sidecar:
         self.respond(request_id)
 
     def _run_qr_login(self) -> None:
+        import base64
+        import io
+
+        import qrcode
+
         try:
-            result = self._api.generate_qrcode()
+            result = self._get_api().generate_qrcode()
             if not result:
                 raise RuntimeError("获取二维码失败")
             qr_url, qrcode_key = result
@@ -221,7 +890,7 @@ class Sidecar:
 
             while not self._qr_cancel.is_set():
                 time.sleep(2)
-                code, cookies = self._api.poll_qrcode(qrcode_key)
+                code, cookies = self._get_api().poll_qrcode(qrcode_key)
                 if code == 0:
                     self._logged_in = True
                     self.emit("login.success", cookies=cookies or {})
@@ -238,37 +907,184 @@ class Sidecar:
             logger.exception("qr login failed")
             self.emit("error", message=str(exc))
 
-    def _export_csv(self, request_id: Any, params: dict[str, Any]) -> None:
+    def _export_file(self, request_id: Any, params: dict[str, Any]) -> None:
         kind = params.get("kind")
         path = params.get("path")
         if not path:
             raise ValueError("缺少导出路径")
-        if kind == "comments":
-            ok = CSVExporter.export(self._last_comments, path)
-        elif kind == "dynamics":
-            ok = CSVExporter.export_dynamics(self._last_dynamics, path)
-        else:
+        fmt = _format_from_path(path, params.get("format"))
+        if not params.get("job_id") and kind not in ("comments", "dynamics"):
             raise ValueError("未知导出类型")
+        job = self._result_job(params, kind)
+        kind = job.mode
+        # 运行中的任务导出当前已到达的行
+        rows = list(job.rows)
+        if fmt == "jsonl":
+            from src.exporter.jsonl_exporter import check_raw_payload
+
+            check_raw_payload(rows, _jsonl_options(params)["payload"])
+        partition = params.get("partition")
+        if partition:
+            from src.exporter.partitioned import DEFAULT_CHUNK_ROWS, PartitionedExporter
+
+            ok = PartitionedExporter.export(
+                rows,
+                path,
+                kind=kind,
+                fmt=fmt,
+                by=partition,
+                chunk_rows=int(params.get("chunk_rows") or DEFAULT_CHUNK_ROWS),
+                **(_jsonl_options(params) if fmt == "jsonl" else {}),
+            )
+        elif fmt == "csv":
+            from src.exporter.csv_exporter import CSVExporter
+
+            export = CSVExporter.export if kind == "comments" else CSVExporter.export_dynamics
+            ok = export(rows, path)
+        elif fmt in ("parquet", "arrow"):
+            from src.exporter.parquet_exporter import ParquetExporter
+
+            if not ParquetExporter.available():
+                raise RuntimeError("导出 Parquet / Arrow 需要安装 pyarrow")
+            export = ParquetExporter.export if kind == "comments" else ParquetExporter.export_dynamics
+            ok = export(rows, path, fmt=fmt)
+        elif fmt == "sqlite":
+            from src.exporter.sqlite_store import SQLiteStore
+
+            export = SQLiteStore.export if kind == "comments" else SQLiteStore.export_dynamics
+            ok = export(rows, path)
+        elif fmt == "jsonl":
+            from src.exporter.jsonl_exporter import JSONLExporter
+
+            ok = JSONLExporter.export(rows, path, **_jsonl_options(params))
+        else:
+            raise ValueError(f"不支持的导出格式: {fmt}")
         if not ok:
             raise RuntimeError("导出失败，没有可导出的数据或写入失败")
-        self.respond(request_id, path=path)
-        self.emit("log", message=f"CSV 已导出: {path}")
+        self.respond(request_id, path=path, format=fmt)
+        self.emit("log", message=f"{fmt.upper()} 已导出: {path}")
+
+    def _store_query(self, request_id: Any, params: dict[str, Any]) -> None:
+        from src.exporter.sqlite_store import SQLiteStore
+
+        path = params.get("path")
+        if not path or not Path(path).is_file():
+            raise ValueError("数据库文件不存在")
+        kind = params.get("kind", "comments")
+        common = {
+            "start_time": int(params.get("start_ts", 0)),
+            "end_time": int(params.get("end_ts", 0)),
+            "descending": params.get("order", "desc") != "asc",
+            "limit": int(params.get("limit", 100)),
+            "offset": int(params.get("offset", 0)),
+        }
+        with SQLiteStore.open_readonly(path, kind=kind) as store:
+            if kind == "comments":
+                rows = store.query_comments(
+                    oid=params.get("oid"),
+                    user_id=params.get("user_id"),
+                    root_id=params.get("root_id"),
+                    order_by=params.get("sort", "ctime"),
+                    **common,
+                )
+            else:
+                rows = store.query_dynamics(
+                    username=params.get("username"),
+                    order_by=params.get("sort", "timestamp"),
+                    **common,
+                )
+        self.respond(request_id, rows=rows)
+
+    def _result_job(self, params: dict[str, Any], kind: str | None = None) -> Job:
+        """
+        结果类请求针对的任务
+
+        指定 job_id 时取该任务（运行中的任务可查询已到达的部分），否则取 kind
+        （默认 comments）类型最近结束的任务。
+
+        Args:
+            params: 请求参数（job_id / kind）
+            kind: 要求的任务类型；为 None 时不限
+        """
+        job_id = params.get("job_id")
+        if job_id:
+            job = self._scheduler.get(str(job_id))
+            if job is None:
+                raise ValueError("任务不存在")
+            if kind is not None and job.mode != kind:
+                raise ValueError(f"任务 {job.id} 不是{_KIND_LABELS.get(kind, kind)}任务")
+            if job.results_released:
+                raise ValueError(f"任务 {job.id} 的结果已释放（只保留最近 {RESULT_JOBS_KEPT} 个任务的结果），请重新爬取")
+            if job.search_index is None:
+                raise ValueError(f"任务 {job.id} 尚未开始爬取")
+            return job
+        kind = kind or params.get("kind") or "comments"
+        if kind not in _KIND_LABELS:
+            raise ValueError("未知结果类型")
+        job = self._latest_jobs.get(kind)
+        if job is None:
+            raise ValueError(f"还没有已结束的{_KIND_LABELS[kind]}任务")
+        return job
+
+    def _get_result_view(self, params: dict[str, Any]) -> ResultView:
+        """任务结果的分页视图（每个任务一个，首次请求时创建）"""
+        from src.processor.result_view import ResultView
+
+        job = self._result_job(params)
+        with self._task_lock:
+            if job.search_index is None:
+                raise ValueError(f"任务 {job.id} 的结果已释放，请重新爬取")
+            if job.result_view is None:
+                factory = ResultView.for_comments if job.mode == "comments" else ResultView.for_dynamics
+                job.result_view = factory(job.search_index)
+            return job.result_view
+
+    def _get_thread_index(self, params: dict[str, Any]) -> ThreadIndex:
+        job = self._result_job(params, "comments")
+        if job.thread_index is None:
+            raise ValueError(f"任务 {job.id} 没有评论楼索引")
+        return job.thread_index
+
+    def _search_query(self, request_id: Any, params: dict[str, Any]) -> None:
+        index = self._result_job(params).search_index
+        result = index.search(
+            str(params.get("query", "")),
+            sort=params.get("sort", "like_count"),
+            descending=params.get("order", "desc") != "asc",
+            offset=int(params.get("offset", 0)),
+            limit=int(params.get("limit", 20)),
+        )
+        self.respond(request_id, **result)
+
+    def _get_thread(self, request_id: Any, params: dict[str, Any]) -> None:
+        root_id = params.get("root_id")
+        if root_id is None:
+            raise ValueError("缺少楼主评论 root_id")
+        thread = self._get_thread_index(params).get_thread(
+            int(root_id),
+            offset=int(params.get("offset", 0)),
+            limit=int(params.get("limit", 500)),
+        )
+        if thread is None:
+            raise ValueError(f"未找到评论楼: {root_id}")
+        self.respond(request_id, thread=thread)
 
 
 def main() -> None:
     sidecar = Sidecar()
     sidecar.emit("ready")
-    for raw_line in sys.stdin.buffer:
-        line = raw_line.decode("utf-8-sig", errors="replace")
-        line = line.replace("\x00", "").strip()
-        if not line:
-            continue
+    stdin = sys.stdin.buffer
+    while True:
         try:
-            request = json.loads(line)
-        except json.JSONDecodeError as exc:
-            sidecar.emit("error", message=f"请求 JSON 无效: {exc}")
+            request = read_request(stdin)
+        except EOFError:
+            break
+        except ValueError as exc:
+            sidecar.emit("error", message=str(exc))
             continue
-        sidecar.handle(request)
+        if request is not None:
+            sidecar.handle(request)
+    sidecar.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+"""
+CSV 导出基准测试：旧版逐行写入 vs 单次推断 + 批量 writerows
+
+旧版路径（CSVExporter._write_csv 原实现）:
+    columns=None 时逐行逐键在列表里查重（O(行数 × 列数²)），
+    指定列时每列扫描一遍全部行，之后逐行 writerow
+新版路径:
+    CSVExporter._write_csv，列推断至多一遍，按批 writerows，1MB 写缓冲
+
+用法:
+    python benchmarks/bench_csv_export.py --rows 1000000
+"""
+import argparse
+import csv
+import filecmp
+import os
+import tempfile
+
+from common import make_comments, timed
+
+from config.config import CSV_ENCODING
+from src.exporter.csv_exporter import CSVExporter
+
+
+# ============================================================
+#  旧版实现（保留原逻辑作为对照）
+# ============================================================
+def legacy_write_csv(rows, filepath, columns, mapping, index):
+    if columns is None:
+        available = []
+        for row in rows:
+            for col in row.keys():
+                if col not in available:
+                    available.append(col)
+    else:
+        available = [col for col in columns if any(col in row for row in rows)]
+    if not available:
+        available = list(rows[0].keys())
+    headers = (["index"] if index else []) + [mapping.get(col, col) for col in available]
+    with open(filepath, "w", newline="", encoding=CSV_ENCODING) as fh:
+        writer = csv.writer(fh)
+        writer.writerow(headers)
+        for idx, row in enumerate(rows):
+            values = [row.get(col, "") for col in available]
+            if index:
+                values = [idx] + values
+            writer.writerow(values)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='导出的行数')
+    parser.add_argument('--repeat', type=int, default=3, help='交替重复次数，取最快一次（减少磁盘回写的干扰）')
+    args = parser.parse_args()
+
+    print(f"生成 {args.rows} 条合成评论...")
+    rows = make_comments(args.rows)
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_csv_')
+    try:
+        for label, columns, index in (
+            ('默认列', CSVExporter.DEFAULT_COLUMNS, False),
+            ('全部列(推断)', None, False),
+            ('默认列+序号', CSVExporter.DEFAULT_COLUMNS, True),
+        ):
+            old_path = os.path.join(tmpdir, 'legacy.csv')
+            new_path = os.path.join(tmpdir, 'new.csv')
+            old_time = new_time = float('inf')
+            for _ in range(args.repeat):
+                _, elapsed = timed(legacy_write_csv, rows, old_path, columns, CSVExporter.COLUMN_MAPPING, index)
+                old_time = min(old_time, elapsed)
+                _, elapsed = timed(CSVExporter._write_csv, rows, new_path, columns, CSVExporter.COLUMN_MAPPING, index)
+                new_time = min(new_time, elapsed)
+            same = filecmp.cmp(old_path, new_path, shallow=False)
+            size_mb = os.path.getsize(new_path) / (1 << 20)
+            print(f"\n[{label}] {args.rows} 行, {size_mb:.1f} MB")
+            print(f"  旧版  {old_time:7.3f}s  {args.rows / old_time:>12,.0f} rows/s")
+            print(f"  新版  {new_time:7.3f}s  {args.rows / new_time:>12,.0f} rows/s  "
+                  f"x{old_time / new_time:.2f}  输出一致={same}")
+    finally:
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
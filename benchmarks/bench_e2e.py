@@ -0,0 +1,299 @@
+"""
+端到端吞吐基准测试：CommentCrawler / DynamicCrawler 对本地模拟服务完整爬取
+
+模拟服务（mock_server.py）在本进程的后台线程中运行。每个场景在一个新的子进程里跑爬虫，
+这样峰值内存只反映该场景。子进程通过 BILIBILI_API_BASE / BILIBILI_WWW_BASE 把接口指向
+模拟服务，和 sidecar 一样经 SessionManager 共用会话与限速器。
+
+场景:
+    comments   对 --targets 个视频评论区完整爬取（含楼中楼）
+    dynamics   对 --targets 个用户爬取空间动态（含 OPUS 页面补文字）
+    feed       爬取关注页动态流
+
+统计:
+    req/s      每秒完成的 HTTP 请求（含 -412 重试和 OPUS 页面，不含超时的请求）
+    rows/s     每秒产出的评论 / 动态行数
+    p50/p99    单个请求从发出到收到响应头的耗时（requests 的 Response.elapsed）
+    峰值内存   子进程的 ru_maxrss
+    -412/超时  客户端遇到的风控重试次数 / 服务端挂起的请求数
+    复用率     复用已有连接的请求比例
+
+每次运行的结果连同 git 提交、参数追加写入 --results（JSONL），并与同参数的上一次记录对比。
+
+用法:
+    python benchmarks/bench_e2e.py
+    python benchmarks/bench_e2e.py --scenario comments --comments 5000 --latency-ms 20 --jitter-ms 10
+    python benchmarks/bench_e2e.py --throttle-every 200 --throttle-burst 3 --timeout-rate 0.002
+    python benchmarks/bench_e2e.py --history 10
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from common import ROOT
+
+from mock_server import MockServer, add_arguments, config_from_args
+
+SCENARIOS = ('comments', 'dynamics', 'feed')
+RESULTS_FILE = ROOT / 'benchmarks' / 'results' / 'e2e.jsonl'
+
+# 对比时展示的指标: (键, 标题, 越大越好)
+METRICS = (
+    ('requests_per_sec', 'req/s', True),
+    ('rows_per_sec', 'rows/s', True),
+    ('p50_ms', 'p50 ms', False),
+    ('p99_ms', 'p99 ms', False),
+    ('peak_rss_mb', '峰值MB', False),
+)
+
+
+# ============================================================
+#  子进程：跑一个场景
+# ============================================================
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _percentile_ms(samples: List[float], pct: int) -> Optional[float]:
+    if not samples:
+        return None
+    if len(samples) == 1:
+        return round(samples[0] * 1000, 2)
+    return round(statistics.quantiles(samples, n=100, method='inclusive')[pct - 1] * 1000, 2)
+
+
+def run_scenario(scenario: str, params: Dict) -> Dict:
+    """在当前进程中跑一个场景（环境变量已指向模拟服务），返回统计"""
+    from config.config import MAX_PAGES
+    from src.api import bilibili_api
+    from src.api.rate_limiter import RateLimiter
+    from src.api.session_pool import SessionManager
+    from src.crawler.comment_crawler import CommentCrawler
+    from src.crawler.dynamic_crawler import DynamicCrawler
+
+    # 注入的挂起只需超过客户端超时即可，不必等满线上的 REQUEST_TIMEOUT
+    bilibili_api.REQUEST_TIMEOUT = params['client_timeout']
+
+    limiter = RateLimiter(rate=params['rate'])
+    sessions = SessionManager(rate_limiter=limiter, max_tasks=1)
+    latencies = []
+    sessions.session.hooks['response'].append(lambda r, *args, **kwargs: latencies.append(r.elapsed.total_seconds()))
+    api = sessions.new_api()
+
+    rows = 0
+    start = time.perf_counter()
+    if scenario == 'comments':
+        crawler = CommentCrawler(api=api)
+        for i in range(params['targets']):
+            rows += len(crawler.crawl_comments(f"av{100001 + i}", include_replies=not params['no_replies'],
+                                               max_pages=MAX_PAGES))
+    elif scenario == 'dynamics':
+        crawler = DynamicCrawler(api=api)
+        for i in range(params['targets']):
+            rows += len(crawler.crawl_dynamics(20001 + i, max_pages=MAX_PAGES))
+    else:
+        rows += len(DynamicCrawler(api=api).crawl_following_feed(max_pages=MAX_PAGES))
+    elapsed = time.perf_counter() - start
+
+    session = sessions.stats()
+    sessions.close()
+    return {
+        'elapsed': round(elapsed, 3),
+        'requests': len(latencies),
+        'api_attempts': api.request_count,
+        'throttled': api.throttled_count,
+        'rows': rows,
+        'requests_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': _percentile_ms(latencies, 50),
+        'p99_ms': _percentile_ms(latencies, 99),
+        'peak_rss_mb': _peak_rss_mb(),
+        'connections': session['connections'],
+        'reuse_ratio': session['reuse_ratio'],
+        'limiter_waited': limiter.stats()['waited'],
+    }
+
+
+def _worker(scenario: str, params: str, verbose: bool):
+    logging.basicConfig(level=logging.INFO if verbose else logging.ERROR, format='%(levelname)s %(name)s: %(message)s')
+    result = run_scenario(scenario, json.loads(params))
+    print(json.dumps(result), flush=True)
+
+
+# ============================================================
+#  主进程：起模拟服务、逐个场景起子进程、保存与对比
+# ============================================================
+def spawn_scenario(scenario: str, params: Dict, base_url: str, verbose: bool) -> Dict:
+    env = dict(os.environ, BILIBILI_API_BASE=base_url, BILIBILI_WWW_BASE=base_url)
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--worker', scenario, '--params', json.dumps(params)]
+    if verbose:
+        cmd.append('-v')
+    proc = subprocess.run(cmd, env=env, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"场景 {scenario} 失败（退出码 {proc.returncode}）")
+    return json.loads(lines[-1])
+
+
+def git_revision() -> Dict:
+    def git(*args) -> str:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+    try:
+        return {'commit': git('rev-parse', '--short', 'HEAD'),
+                'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def load_history(path: Path) -> List[Dict]:
+    if not path.exists():
+        return []
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def save_record(path: Path, record: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def _label(record: Dict) -> str:
+    commit = record.get('commit') or '-'
+    return f"{commit}{'+' if record.get('dirty') else ''} {record.get('timestamp', '')[:16]}"
+
+
+def print_results(results: Dict[str, Dict]):
+    print(f"{'场景':<10}{'耗时s':>8}{'请求':>8}{'行数':>9}{'req/s':>9}{'rows/s':>10}"
+          f"{'p50 ms':>8}{'p99 ms':>8}{'峰值MB':>8}{'-412':>6}{'超时':>6}{'复用率':>7}")
+    for scenario, r in results.items():
+        print(f"{scenario:<10}{r['elapsed']:>8.2f}{r['requests']:>8}{r['rows']:>9}{r['requests_per_sec']:>9.1f}"
+              f"{r['rows_per_sec']:>10.1f}{_fmt(r['p50_ms']):>8}{_fmt(r['p99_ms']):>8}"
+              f"{_fmt(r['peak_rss_mb']):>8}{r['throttled']:>6}{r.get('server', {}).get('hung', 0):>6}"
+              f"{r['reuse_ratio']:>7.2f}")
+
+
+def _fmt(value) -> str:
+    return '-' if value is None else f"{value:.1f}"
+
+
+def print_comparison(record: Dict, previous: Dict):
+    """与同参数的上一次记录逐项对比，正的百分比表示变好"""
+    print(f"\n对比上一次同参数运行（{_label(previous)}）:")
+    for scenario, r in record['results'].items():
+        old = previous['results'].get(scenario)
+        if not old:
+            continue
+        parts = []
+        for key, title, higher_better in METRICS:
+            new_value, old_value = r.get(key), old.get(key)
+            if not new_value or not old_value:
+                continue
+            change = (new_value - old_value) / old_value * 100
+            parts.append(f"{title} {old_value:g} -> {new_value:g} ({change if higher_better else -change:+.1f}%)")
+        print(f"  {scenario:<10}" + '  '.join(parts))
+
+
+def print_history(records: List[Dict], count: int):
+    for record in records[-count:]:
+        print(f"\n{_label(record)}  {json.dumps(record.get('params', {}), ensure_ascii=False)}")
+        print_results(record['results'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append',
+                        help='要跑的场景，可重复指定；默认全部')
+    parser.add_argument('--targets', type=int, default=3, help='comments / dynamics 场景的目标数')
+    parser.add_argument('--no-replies', action='store_true', help='comments 场景不爬楼中楼')
+    parser.add_argument('--rate', type=float, default=500.0,
+                        help='共享限速器速率（次/秒），默认足够高，测的是爬虫本身')
+    parser.add_argument('--client-timeout', type=float, default=1.0, help='客户端请求超时（秒）')
+    parser.add_argument('--results', type=Path, default=RESULTS_FILE, help='结果历史文件（JSONL）')
+    parser.add_argument('--no-save', action='store_true', help='不写入结果历史')
+    parser.add_argument('--history', type=int, metavar='N', help='只列出最近 N 次记录，不运行')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出爬虫日志')
+    parser.add_argument('--worker', choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--params', help=argparse.SUPPRESS)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker, args.params, args.verbose)
+        return
+
+    if args.history:
+        print_history(load_history(args.results), args.history)
+        return
+
+    cfg = config_from_args(args)
+    if cfg.timeout_rate and cfg.hang <= args.client_timeout:
+        parser.error(f"--hang ({cfg.hang}s) 必须大于 --client-timeout ({args.client_timeout}s)")
+    params = {
+        'targets': args.targets,
+        'no_replies': args.no_replies,
+        'rate': args.rate,
+        'client_timeout': args.client_timeout,
+        'mock': asdict(cfg),
+    }
+
+    server = MockServer(cfg)
+    server.start()
+    print(f"模拟服务: {server.url}")
+    results = {}
+    try:
+        for scenario in args.scenario or SCENARIOS:
+            before = server.state.stats()
+            results[scenario] = spawn_scenario(scenario, params, server.url, args.verbose)
+            after = server.state.stats()
+            results[scenario]['server'] = {k: after[k] - before.get(k, 0) for k in after if after[k] != before.get(k, 0)}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    record = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        **git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'results': results,
+    }
+    print()
+    print_results(results)
+
+    history = load_history(args.results)
+    previous = next((r for r in reversed(history) if r.get('params') == params), None)
+    if previous:
+        print_comparison(record, previous)
+    if not args.no_save:
+        save_record(args.results, record)
+        print(f"\n结果已追加到 {args.results}")
+
+
+if __name__ == '__main__':
+    main()
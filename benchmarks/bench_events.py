@@ -0,0 +1,102 @@
+"""
+sidecar 事件输出基准测试：逐条 print+flush vs 后台合并写出
+
+模拟多个回复线程一边处理数据一边发 log / progress 事件，sidecar 的输出
+接到一个子进程上（逐行 json 解析，拆开 batch 帧，相当于 Tauri 宿主）。
+
+统计:
+    爬取耗时   工作线程跑完全部循环的墙钟时间（含发事件的开销）
+    额外开销   相对不发事件的空跑多出的时间
+    送达耗时   到宿主收完最后一条消息为止的时间，events/s 按此计算
+    写出次数   宿主读到的行数（每行一次 write + flush）
+
+用法:
+    python benchmarks/bench_events.py --threads 8 --events 20000
+"""
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+from common import ROOT  # noqa: F401  (把仓库根目录加入 sys.path)
+
+from backend.sidecar import Sidecar
+
+# 宿主端：逐行解析并拆开 batch 帧，结束时输出 "消息数 行数 日志数 丢弃日志数"
+_HOST = r"""
+import json, re, sys
+messages = lines = logs = dropped = 0
+for line in sys.stdin.buffer:
+    lines += 1
+    frame = json.loads(line)
+    for msg in frame["events"] if frame.get("kind") == "batch" else [frame]:
+        messages += 1
+        if msg.get("job_id") is None and "已丢弃" in msg.get("message", ""):
+            dropped += int(re.search(r"(\d+)", msg["message"]).group(1))
+        elif msg.get("event") == "log":
+            logs += 1
+print(messages, lines, logs, dropped)
+"""
+
+
+def _work(units: int) -> int:
+    """模拟解析一条回复的 CPU 开销"""
+    return sum(range(units))
+
+
+def crawl(sidecar, threads: int, events: int, work: int) -> float:
+    """threads 个线程各自循环 events 次，每次处理一条数据并发一条 log 和一条 progress"""
+    def worker(worker_id: int):
+        job_id = f"comments-{worker_id}"
+        for i in range(events):
+            _work(work)
+            if sidecar is None:
+                continue
+            sidecar.emit("log", message=f"第 {i // 20 + 1} 页: 处理回复 {i}", job_id=job_id)
+            sidecar.emit("progress", status="running", mode="comments",
+                         percent=i * 100 // events, job_id=job_id)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def run(window: float, threads: int, events: int, work: int):
+    host = subprocess.Popen([sys.executable, "-c", _HOST], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    sidecar = Sidecar(stream=host.stdin, event_window=window)
+    start = time.perf_counter()
+    crawl_time = crawl(sidecar, threads, events, work)
+    sidecar.close()
+    host.stdin.close()
+    messages, lines, logs, dropped = map(int, host.stdout.read().decode().split())
+    host.wait()
+    return crawl_time, time.perf_counter() - start, messages, lines, logs, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8, help='并发的工作线程数')
+    parser.add_argument('--events', type=int, default=20000, help='每个线程的循环次数（每次 2 个事件）')
+    parser.add_argument('--work', type=int, default=300, help='每次循环的模拟计算量')
+    parser.add_argument('--window', type=float, default=0.05, help='合并窗口（秒）')
+    args = parser.parse_args()
+
+    emitted = args.threads * args.events * 2
+    baseline = crawl(None, args.threads, args.events, args.work)
+    print(f"{args.threads} 线程 x {args.events} 次循环，共发出 {emitted:,} 条事件")
+    print(f"不发事件的空跑: {baseline:.3f}s\n")
+    print(f"{'模式':<14}{'爬取耗时':>9}{'额外开销':>9}{'送达耗时':>9}{'events/s':>11}"
+          f"{'送达消息':>9}{'写出次数':>9}{'日志':>9}{'丢弃日志':>9}")
+    for label, window in (('逐条写出', 0.0), (f'合并 {args.window * 1000:.0f}ms', args.window)):
+        crawl_time, total, messages, lines, logs, dropped = run(window, args.threads, args.events, args.work)
+        print(f"{label:<14}{crawl_time:>8.3f}s{crawl_time - baseline:>8.3f}s{total:>8.3f}s{emitted / total:>11,.0f}"
+              f"{messages:>9,}{lines:>9,}{logs:>9,}{dropped:>9,}")
+
+
+if __name__ == '__main__':
+    main()
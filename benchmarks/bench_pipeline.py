@@ -0,0 +1,123 @@
+"""
+处理流水线基准测试：旧版逐步处理 vs 单次遍历的融合流水线
+
+旧版路径（Sidecar._run_comments 原实现，统计口径与新版一致取过滤后的行）:
+    clean_comments -> filter_comments -> get_statistics
+新版路径:
+    ProcessingPipeline.for_comments(filters)，按爬虫页大小分批喂入
+
+用法:
+    python benchmarks/bench_pipeline.py --rows 1000000 --keyword "原神 | 泪目"
+"""
+import argparse
+import copy
+
+from common import PassTracker, make_comments, timed
+
+from src.processor.pipeline import ProcessingPipeline
+
+BATCH_SIZE = 30 * 20  # 约等于一页主评论加上其回复
+
+
+# ============================================================
+#  旧版实现（保留原逻辑作为对照）
+# ============================================================
+def legacy_clean_comments(comments):
+    cleaned = []
+    for comment in comments:
+        if not comment.get('content', '').strip():
+            continue
+        content = comment.get('content', '')
+        content = ' '.join(content.split())
+        comment['content'] = content
+        for key, value in (('comment_id', 0), ('root_id', 0), ('parent_id', 0),
+                           ('is_reply', False), ('user_id', 0), ('username', ''),
+                           ('user_level', 0), ('like_count', 0), ('reply_count', 0),
+                           ('ctime', 0), ('ctime_text', ''), ('ip_location', '')):
+            comment.setdefault(key, value)
+        cleaned.append(comment)
+    return cleaned
+
+
+def legacy_get_statistics(comments):
+    main_comments = [c for c in comments if not c.get('is_reply', False)]
+    replies = [c for c in comments if c.get('is_reply', False)]
+    total_likes = sum(c.get('like_count', 0) for c in comments)
+    total_replies = sum(c.get('reply_count', 0) for c in main_comments)
+    return {
+        'total': len(comments),
+        'main_comments': len(main_comments),
+        'replies': len(replies),
+        'total_likes': total_likes,
+        'avg_likes': round(total_likes / len(comments), 2) if comments else 0,
+        'total_replies': total_replies,
+    }
+
+
+def legacy_filter_comments(comments, filters):
+    filtered = []
+    for comment in comments:
+        if 'keyword' in filters:
+            keyword = filters['keyword'].lower()
+            if keyword not in comment.get('content', '').lower():
+                continue
+        filtered.append(comment)
+    return filtered
+
+
+def run_legacy(rows, keyword):
+    cleaned = legacy_clean_comments(rows)
+    if keyword:
+        cleaned = legacy_filter_comments(cleaned, {'keyword': keyword})
+    return cleaned, legacy_get_statistics(cleaned)
+
+
+def run_pipeline(rows, keyword, detailed):
+    pipeline = ProcessingPipeline.for_comments(
+        filters={'keyword': keyword} if keyword else None,
+        detailed=detailed,
+    )
+    for start in range(0, len(rows), BATCH_SIZE):
+        pipeline.feed(rows[start:start + BATCH_SIZE])
+    return pipeline.rows, pipeline.statistics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='吞吐测试的行数')
+    parser.add_argument('--trace-rows', type=int, default=20_000, help='统计遍历次数时使用的行数')
+    parser.add_argument('--keyword', default='原神', help='过滤关键词，为空则不过滤（旧版按字面子串，新版按表达式）')
+    args = parser.parse_args()
+
+    print(f"生成 {args.rows} 条合成评论...")
+    base = make_comments(args.rows)
+
+    print("\n[遍历次数] 每行被访问的轮数")
+    for label, runner in (
+        ('旧版逐步处理', lambda rows: run_legacy(rows, args.keyword)),
+        ('融合流水线(六项统计)', lambda rows: run_pipeline(rows, args.keyword, detailed=False)),
+        ('融合流水线(完整统计)', lambda rows: run_pipeline(rows, args.keyword, detailed=True)),
+    ):
+        tracker = PassTracker()
+        runner(tracker.wrap(base[:args.trace_rows]))
+        print(f"  {label:<16} passes/row={tracker.visits / args.trace_rows:<5.2f} "
+              f"dict ops/row={tracker.touches / args.trace_rows:.1f}")
+
+    print(f"\n[吞吐] {args.rows} 行")
+    results = {}
+    for label, runner in (
+        ('旧版逐步处理', lambda rows: run_legacy(rows, args.keyword)),
+        ('融合流水线(六项统计)', lambda rows: run_pipeline(rows, args.keyword, detailed=False)),
+        ('融合流水线(完整统计)', lambda rows: run_pipeline(rows, args.keyword, detailed=True)),
+    ):
+        rows = copy.deepcopy(base) if args.rows <= 200_000 else [dict(r) for r in base]
+        (kept, stats), elapsed = timed(runner, rows)
+        results[label] = (len(kept), {k: stats[k] for k in ('total', 'total_likes', 'total_replies')})
+        print(f"  {label:<16} {elapsed:7.3f}s  {args.rows / elapsed:>12,.0f} rows/s  kept={len(kept)}")
+
+    if len({repr(v) for v in results.values()}) != 1:
+        print("\n警告: 各路径结果不一致（旧版只支持单个字面关键词）", results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+sidecar 冷启动基准测试：从启动进程到收到 ready 事件的时间
+
+做法:
+    多次启动 `python backend/sidecar.py`，计时到 stdout 出现第一行（ready 事件），
+    取中位数，减去空解释器（python -c pass）的启动时间得到 sidecar 自身的开销。
+    另用 -X importtime 启动一次，列出 ready 之前耗时最多的模块，并检查
+    requests / qrcode / PIL / numpy / pyarrow 等重模块没有在启动阶段被加载。
+
+超出预算或重模块被提前加载时以退出码 1 结束，可以放进发布前的检查里。
+
+用法:
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 100
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT
+
+SIDECAR = ROOT / "backend" / "sidecar.py"
+
+# 启动阶段不应加载的模块（首次使用时才导入）
+DEFERRED_MODULES = ("requests", "qrcode", "PIL", "numpy", "pyarrow", "orjson", "zstandard",
+                    "src.crawler.comment_crawler", "src.crawler.dynamic_crawler", "src.processor.pipeline")
+
+
+def time_to_ready(extra_args=()) -> tuple:
+    """启动 sidecar，返回 (到 ready 的秒数, ready 行, stderr 输出)"""
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, *extra_args, str(SIDECAR)], stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=stderr, cwd=ROOT)
+        line = proc.stdout.readline()
+        elapsed = time.perf_counter() - start
+        proc.stdin.close()  # stdin 结束后 sidecar 自行退出
+        proc.stdout.read()
+        proc.wait(timeout=30)
+        stderr.seek(0)
+        errors = stderr.read()
+    return elapsed, line.decode("utf-8", errors="replace"), errors.decode("utf-8", errors="replace")
+
+
+def bare_interpreter() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    解析 -X importtime 输出
+
+    Returns:
+        [(累计微秒, 模块名, 嵌套深度)]，深度 0 为 sidecar 直接触发的顶层导入
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((int(cumulative), name.strip(), depth))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='启动次数，取中位数')
+    parser.add_argument('--budget-ms', type=float, default=100.0, help='sidecar 自身启动开销的预算（毫秒）')
+    parser.add_argument('--top', type=int, default=10, help='列出耗时最多的模块数')
+    args = parser.parse_args()
+
+    bare = statistics.median(bare_interpreter() for _ in range(args.runs))
+    samples = []
+    for _ in range(args.runs):
+        elapsed, line, _ = time_to_ready()
+        if '"ready"' not in line:
+            print(f"sidecar 未输出 ready 事件: {line!r}")
+            sys.exit(1)
+        samples.append(elapsed)
+    ready = statistics.median(samples)
+    overhead_ms = (ready - bare) * 1000
+
+    print(f"空解释器启动     {bare * 1000:8.1f} ms")
+    print(f"sidecar 到 ready {ready * 1000:8.1f} ms  (最快 {min(samples) * 1000:.1f} ms, {args.runs} 次中位数)")
+    print(f"sidecar 自身开销 {overhead_ms:8.1f} ms  预算 {args.budget_ms:.0f} ms")
+
+    _, _, stderr = time_to_ready(("-X", "importtime"))
+    entries = parse_importtime(stderr)
+    top_level = [(us, name) for us, name, depth in entries if depth == 0]
+    print("\nready 之前耗时最多的顶层导入（累计）:")
+    for us, name in sorted(top_level, reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    loaded = {name for _, name, _ in entries}
+    early = [mod for mod in DEFERRED_MODULES if mod in loaded]
+
+    failed = False
+    if early:
+        print(f"\n失败: 以下模块应在首次使用时再导入，但在启动阶段被加载: {', '.join(early)}")
+        failed = True
+    if overhead_ms > args.budget_ms:
+        print(f"\n失败: 启动开销 {overhead_ms:.1f} ms 超出预算 {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\n通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+基准测试公共工具
+- 生成与 CommentCrawler._process_comment 输出结构一致的合成评论
+- 统计每行被遍历的次数（passes per row）
+"""
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_WORDS = ['原神', '启动', '哈哈哈', '前排', '好看', 'up主', '三连了', '泪目', '绷不住了', '第一',
+          '打卡', '支持', '来了', '催更', 'awsl', 'yyds', '笑死', '真不错', '学到了', '下次一定']
+_LOCATIONS = ['IP属地：北京', 'IP属地：上海', 'IP属地：广东', 'IP属地：浙江', 'IP属地：四川', '']
+
+
+def make_comments(n: int, seed: int = 0, reply_ratio: float = 0.6) -> List[Dict]:
+    """
+    生成 n 条合成评论
+
+    约 reply_ratio 的行为回复，内容中混有连续空白和换行以覆盖清洗逻辑
+    """
+    rng = random.Random(seed)
+    rows = []
+    root_id = 0
+    base_ts = 1_700_000_000
+    for i in range(n):
+        is_reply = i > 0 and rng.random() < reply_ratio
+        if not is_reply:
+            root_id = 10_000_000 + i
+        words = rng.choices(_WORDS, k=rng.randint(2, 12))
+        content = ' '.join(words)
+        if rng.random() < 0.1:
+            content = '  ' + content.replace(' ', '\n', 1) + ' '
+        elif rng.random() < 0.01:
+            content = '   '
+        ctime = base_ts + i * 7
+        rows.append({
+            'comment_id': 10_000_000 + i,
+            'root_id': root_id,
+            'parent_id': root_id if is_reply else 0,
+            'is_reply': is_reply,
+            'video_oid': 170001,
+            'user_id': rng.randint(1, n // 5 + 1),
+            'username': f'用户{rng.randint(1, n // 5 + 1)}',
+            'user_level': rng.randint(0, 6),
+            'content': content,
+            'like_count': int(rng.paretovariate(1.3)) - 1,
+            'reply_count': 0 if is_reply else rng.randint(0, 20),
+            'ctime': ctime,
+            'ctime_text': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ctime)),
+            'ip_location': rng.choice(_LOCATIONS),
+        })
+    return rows
+
+
+class PassTracker:
+    """
+    记录对一组行的遍历次数
+
+    连续访问同一行视为同一次经过；访问在不同行之间切换一次，
+    被访问的行就多经过一次。passes_per_row = 总经过次数 / 行数
+    """
+
+    def __init__(self):
+        self.visits = 0
+        self.touches = 0
+        self._last = -1
+
+    def touch(self, index: int):
+        self.touches += 1
+        if index != self._last:
+            self.visits += 1
+            self._last = index
+
+    def wrap(self, rows: List[Dict]) -> List[Dict]:
+        """把普通字典包装为访问时会上报的字典"""
+        return [_TracedRow(self, i, row) for i, row in enumerate(rows)]
+
+
+class _TracedRow(dict):
+    __slots__ = ('_tracker', '_index')
+
+    def __init__(self, tracker: PassTracker, index: int, row: Dict):
+        super().__init__(row)
+        self._tracker = tracker
+        self._index = index
+
+    def get(self, key, default=None):
+        self._tracker.touch(self._index)
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        self._tracker.touch(self._index)
+        return super().__getitem__(key)
+
+    def setdefault(self, key, default=None):
+        self._tracker.touch(self._index)
+        return super().setdefault(key, default)
+
+    def keys(self):
+        self._tracker.touch(self._index)
+        return super().keys()
+
+
+def timed(func, *args, **kwargs):
+    """返回 (结果, 耗时秒数)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
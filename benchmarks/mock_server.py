@@ -0,0 +1,419 @@
+"""
+离线 B站接口模拟服务：给端到端基准测试提供可控、可复现的数据和故障
+
+实现爬虫用到的接口（返回结构与线上一致，只包含爬虫读取的字段）:
+    /x/web-interface/view                    BV号 -> aid
+    /x/v2/reply/main                         主评论（游标翻页）
+    /x/v2/reply/reply                        楼中楼回复（pn 翻页）
+    /x/polymer/web-dynamic/v1/detail         动态详情（评论区 oid / type）
+    /x/polymer/web-dynamic/v1/feed/space     用户空间动态（offset 翻页）
+    /x/polymer/web-dynamic/v1/feed/all       关注页动态流
+    /x/article/viewinfo                      专栏信息
+    /opus/<id>                               图文动态页面（window.__INITIAL_STATE__）
+    /__stats                                 服务端计数（不计入故障注入）
+
+数据由 --seed 和目标 ID 决定，同一参数下每次生成的评论树 / 动态流完全一致。
+故障只注入到 /x/ 接口：固定延迟 + 抖动、每 N 次请求出现一段 code=-412 的风控，
+以及按概率挂起到客户端超时。OPUS 页面只有延迟（爬虫对页面请求不重试）。
+
+用法:
+    python benchmarks/mock_server.py --port 8900 --comments 2000 --latency-ms 20
+    BILIBILI_API_BASE=http://127.0.0.1:8900 BILIBILI_WWW_BASE=http://127.0.0.1:8900 python main.py
+"""
+import argparse
+import json
+import random
+import signal
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+_WORDS = ['原神', '启动', '哈哈哈', '前排', '好看', 'up主', '三连了', '泪目', '绷不住了', '第一',
+          '打卡', '支持', '来了', '催更', 'awsl', 'yyds', '笑死', '真不错', '学到了', '下次一定']
+_LOCATIONS = ['IP属地：北京', 'IP属地：上海', 'IP属地：广东', 'IP属地：浙江', 'IP属地：四川', '']
+
+BASE_TS = 1_700_000_000
+DYNAMIC_PAGE_SIZE = 12      # 线上动态流每页条数
+DYNAMIC_ID_BASE = 900_000_000_000_000_000
+DYNAMIC_COMMENT_TYPE = 17
+
+
+@dataclass(frozen=True)
+class MockConfig:
+    """模拟数据的规模形状和注入的故障（frozen 以便作为生成缓存的键）"""
+    seed: int = 0
+    comments: int = 1000          # 每个评论区的主评论数
+    reply_ratio: float = 0.3      # 有楼中楼的主评论比例
+    reply_alpha: float = 1.2      # 楼中楼条数的帕累托分布参数（越小长尾越重）
+    max_replies: int = 200        # 单条主评论的楼中楼上限
+    dynamics: int = 300           # 每个用户（以及关注页动态流）的动态数
+    opus_ratio: float = 0.2       # 只有图片、需要回退 OPUS 页面补文字的动态比例
+    latency_ms: float = 0.0       # 每个接口请求的固定延迟
+    jitter_ms: float = 0.0        # 在固定延迟上叠加的 [0, jitter) 随机延迟
+    throttle_every: int = 0       # 每 N 次接口请求出现一段风控（0 为关闭）
+    throttle_burst: int = 0       # 每段风控连续返回 -412 的请求数
+    timeout_rate: float = 0.0     # 接口请求挂起不响应的概率
+    hang: float = 2.0             # 挂起时长（秒），应大于客户端超时
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """把 MockConfig 的各项加入命令行参数（bench_e2e.py 复用）"""
+    defaults = MockConfig()
+    shape = parser.add_argument_group('数据形状')
+    shape.add_argument('--seed', type=int, default=defaults.seed, help='随机种子')
+    shape.add_argument('--comments', type=int, default=defaults.comments, help='每个评论区的主评论数')
+    shape.add_argument('--reply-ratio', type=float, default=defaults.reply_ratio, help='有楼中楼的主评论比例')
+    shape.add_argument('--reply-alpha', type=float, default=defaults.reply_alpha,
+                       help='楼中楼条数的帕累托分布参数，越小长尾越重')
+    shape.add_argument('--max-replies', type=int, default=defaults.max_replies, help='单条主评论的楼中楼上限')
+    shape.add_argument('--dynamics', type=int, default=defaults.dynamics, help='每个用户的动态数')
+    shape.add_argument('--opus-ratio', type=float, default=defaults.opus_ratio,
+                       help='需要回退 OPUS 页面补文字的动态比例')
+    faults = parser.add_argument_group('故障注入')
+    faults.add_argument('--latency-ms', type=float, default=defaults.latency_ms, help='每个请求的固定延迟（毫秒）')
+    faults.add_argument('--jitter-ms', type=float, default=defaults.jitter_ms, help='叠加的随机延迟上限（毫秒）')
+    faults.add_argument('--throttle-every', type=int, default=defaults.throttle_every,
+                        help='每 N 次接口请求出现一段 -412 风控，0 为关闭')
+    faults.add_argument('--throttle-burst', type=int, default=defaults.throttle_burst,
+                        help='每段风控连续返回 -412 的请求数')
+    faults.add_argument('--timeout-rate', type=float, default=defaults.timeout_rate, help='接口请求挂起不响应的概率')
+    faults.add_argument('--hang', type=float, default=defaults.hang, help='挂起时长（秒），应大于客户端超时')
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(**{name: getattr(args, name) for name in MockConfig.__dataclass_fields__})
+
+
+# ============================================================
+#  合成数据
+# ============================================================
+def _text(rng: random.Random, low: int = 2, high: int = 12) -> str:
+    return ' '.join(rng.choices(_WORDS, k=rng.randint(low, high)))
+
+
+def _member(rng: random.Random) -> Dict:
+    mid = rng.randint(1, 50_000)
+    return {'mid': str(mid), 'uname': f'用户{mid}', 'level_info': {'current_level': rng.randint(0, 6)}}
+
+
+def _reply(rng: random.Random, oid: int, rpid: int, root: int, ctime: int, rcount: int = 0) -> Dict:
+    return {
+        'rpid': rpid,
+        'oid': oid,
+        'type': 1,
+        'root': root,
+        'parent': root,
+        'rcount': rcount,
+        'like': int(rng.paretovariate(1.3)) - 1,
+        'ctime': ctime,
+        'member': _member(rng),
+        'content': {'message': _text(rng)},
+        'reply_control': {'location': rng.choice(_LOCATIONS)},
+    }
+
+
+@lru_cache(maxsize=64)
+def comment_tree(cfg: MockConfig, oid: int) -> Tuple[List[Dict], Dict[int, List[Dict]]]:
+    """
+    生成一个评论区
+
+    Returns:
+        (按时间倒序的主评论列表, {主评论 rpid: 楼中楼列表})
+    """
+    rng = random.Random(f'{cfg.seed}:comments:{oid}')
+    main, replies = [], {}
+    next_rpid = oid * 10_000_000
+    for i in range(cfg.comments):
+        next_rpid += 1
+        rpid = next_rpid
+        rcount = 0
+        if rng.random() < cfg.reply_ratio:
+            rcount = min(int(rng.paretovariate(cfg.reply_alpha)), cfg.max_replies)
+        ctime = BASE_TS + (cfg.comments - i) * 60
+        children = []
+        for j in range(rcount):
+            next_rpid += 1
+            children.append(_reply(rng, oid, next_rpid, rpid, ctime + j + 1))
+        if children:
+            replies[rpid] = children
+        main.append(_reply(rng, oid, rpid, 0, ctime, rcount))
+    return main, replies
+
+
+def _dynamic_id(uid: int, index: int) -> str:
+    return str(DYNAMIC_ID_BASE + uid * 1_000_000 + index)
+
+
+def _dynamic_item(cfg: MockConfig, uid: int, index: int) -> Dict:
+    dy_id = _dynamic_id(uid, index)
+    rng = random.Random(f'{cfg.seed}:dynamic:{dy_id}')
+    author_mid = uid or rng.randint(1, 50_000)
+    module_dynamic: Dict = {'desc': None, 'major': None}
+    if rng.random() < cfg.opus_ratio:
+        kind = 'DYNAMIC_TYPE_DRAW'
+        module_dynamic['major'] = {'type': 'MAJOR_TYPE_DRAW', 'draw': {'items': [
+            {'src': f'https://i0.hdslb.com/bfs/new_dyn/{dy_id}_{n}.jpg'} for n in range(rng.randint(1, 4))
+        ]}}
+    elif rng.random() < 0.3:
+        kind = 'DYNAMIC_TYPE_AV'
+        module_dynamic['major'] = {'type': 'MAJOR_TYPE_ARCHIVE', 'archive': {'title': _text(rng, 3, 8)}}
+    else:
+        kind = 'DYNAMIC_TYPE_WORD'
+        module_dynamic['desc'] = {'text': _text(rng, 4, 30)}
+    return {
+        'id_str': dy_id,
+        'type': kind,
+        'modules': {
+            'module_author': {'mid': author_mid, 'name': f'用户{author_mid}',
+                              'pub_ts': BASE_TS - index * 3600},
+            'module_dynamic': module_dynamic,
+            'module_stat': {
+                'like': {'count': int(rng.paretovariate(1.1))},
+                'comment': {'count': rng.randint(0, 500)},
+                'forward': {'count': rng.randint(0, 100)},
+            },
+        },
+    }
+
+
+def dynamics_page(cfg: MockConfig, uid: int, offset: str) -> Dict:
+    """一页动态流，offset 为下一页起始序号（对爬虫而言是不透明字符串）"""
+    start = int(offset) if offset.isdigit() else 0
+    end = min(start + DYNAMIC_PAGE_SIZE, cfg.dynamics)
+    return {
+        'items': [_dynamic_item(cfg, uid, i) for i in range(start, end)],
+        'has_more': end < cfg.dynamics,
+        'offset': str(end),
+    }
+
+
+def opus_page(cfg: MockConfig, dy_id: str) -> str:
+    rng = random.Random(f'{cfg.seed}:opus:{dy_id}')
+    paragraphs = [
+        {'text': {'nodes': [{'type': 'TEXT_NODE_TYPE_WORD', 'word': {'words': _text(rng, 5, 40)}}]}}
+        for _ in range(rng.randint(1, 3))
+    ]
+    state = {'detail': {'id_str': dy_id, 'modules': [{'module_content': {'paragraphs': paragraphs}}]}}
+    return ('<!DOCTYPE html><html><head><title>动态</title></head><body><div id="app"></div>'
+            f'<script>window.__INITIAL_STATE__={json.dumps(state, ensure_ascii=False)};'
+            '(function(){var s;})();</script></body></html>')
+
+
+def _int(query: Dict[str, List[str]], name: str, default: int = 0) -> int:
+    try:
+        return int(query.get(name, [default])[0])
+    except (TypeError, ValueError):
+        return default
+
+
+# ============================================================
+#  HTTP 服务
+# ============================================================
+class MockState:
+    """故障注入的全局状态与服务端计数（多个处理线程共用）"""
+
+    def __init__(self, cfg: MockConfig):
+        self.cfg = cfg
+        self.counts = Counter()
+        self._api_calls = 0
+        self._rng = random.Random(f'{cfg.seed}:faults')
+        self._lock = threading.Lock()
+
+    def fault(self) -> Optional[str]:
+        """决定本次接口请求的故障：'throttle' / 'hang' / None"""
+        cfg = self.cfg
+        with self._lock:
+            n = self._api_calls
+            self._api_calls += 1
+            hang = cfg.timeout_rate > 0 and self._rng.random() < cfg.timeout_rate
+        if cfg.throttle_every and n >= cfg.throttle_every and n % cfg.throttle_every < cfg.throttle_burst:
+            return 'throttle'
+        return 'hang' if hang else None
+
+    def count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counts)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # 保持连接，客户端的连接复用才有意义
+    disable_nagle_algorithm = True  # 响应头和正文分两次写出，避免与客户端延迟确认叠加出 40ms 停顿
+    server_version = 'MockBilibili/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True   # 客户端已超时断开
+
+    def _json(self, payload: Dict):
+        self._send(200, json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def _delay(self):
+        cfg = self.server.state.cfg
+        delay = cfg.latency_ms + (random.random() * cfg.jitter_ms if cfg.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        state = self.server.state
+        if url.path == '/__stats':
+            self._json({'code': 0, 'data': state.stats()})
+            return
+
+        if url.path.startswith('/opus/'):
+            state.count('opus')
+            self._delay()
+            self._send(200, opus_page(state.cfg, url.path[len('/opus/'):]).encode('utf-8'),
+                       'text/html; charset=utf-8')
+            return
+
+        route = _ROUTES.get(url.path)
+        if route is None:
+            state.count('not_found')
+            self._json({'code': -404, 'message': '啥都木有'})
+            return
+
+        state.count(route.__name__)
+        fault = state.fault()
+        self._delay()
+        if fault == 'throttle':
+            state.count('throttled')
+            self._json({'code': -412, 'message': '请求被拦截'})
+            return
+        if fault == 'hang':
+            state.count('hung')
+            time.sleep(state.cfg.hang)
+        self._json({'code': 0, 'message': '0', 'data': route(state.cfg, parse_qs(url.query))})
+
+
+def video_view(cfg: MockConfig, query: Dict) -> Dict:
+    bvid = query.get('bvid', [''])[0]
+    aid = _int(query, 'aid') or zlib.crc32(bvid.encode()) % 1_000_000 + 1
+    return {'aid': aid, 'bvid': bvid, 'title': f'视频 {aid}'}
+
+
+def reply_main(cfg: MockConfig, query: Dict) -> Dict:
+    main, replies = comment_tree(cfg, _int(query, 'oid'))
+    ps = _int(query, 'ps', 20) or 20
+    page = _int(query, 'next')
+    start = page * ps
+    end = min(start + ps, len(main))
+    is_end = end >= len(main)
+    return {
+        'replies': main[start:end],
+        'cursor': {
+            'is_begin': page == 0,
+            'is_end': is_end,
+            'next': 0 if is_end else page + 1,
+            'all_count': len(main) + sum(len(r) for r in replies.values()),
+        },
+    }
+
+
+def reply_reply(cfg: MockConfig, query: Dict) -> Dict:
+    _, replies = comment_tree(cfg, _int(query, 'oid'))
+    children = replies.get(_int(query, 'root'), [])
+    ps = _int(query, 'ps', 10) or 10
+    pn = max(_int(query, 'pn', 1), 1)
+    start = (pn - 1) * ps
+    return {
+        'replies': children[start:start + ps],
+        'page': {'num': pn, 'size': ps, 'count': len(children)},
+        'cursor': {'is_end': start + ps >= len(children)},
+    }
+
+
+def dynamic_detail(cfg: MockConfig, query: Dict) -> Dict:
+    dy_id = query.get('id', ['0'])[0]
+    return {'item': {'id_str': dy_id, 'basic': {'comment_id_str': dy_id, 'comment_type': DYNAMIC_COMMENT_TYPE}}}
+
+
+def feed_space(cfg: MockConfig, query: Dict) -> Dict:
+    return dynamics_page(cfg, _int(query, 'host_mid'), query.get('offset', [''])[0])
+
+
+def feed_all(cfg: MockConfig, query: Dict) -> Dict:
+    return dynamics_page(cfg, 0, query.get('offset', [''])[0])
+
+
+def article_info(cfg: MockConfig, query: Dict) -> Dict:
+    cvid = _int(query, 'id')
+    return {'title': f'专栏 {cvid}', 'mid': cvid % 50_000 + 1}
+
+
+_ROUTES = {
+    '/x/web-interface/view': video_view,
+    '/x/v2/reply/main': reply_main,
+    '/x/v2/reply/reply': reply_reply,
+    '/x/polymer/web-dynamic/v1/detail': dynamic_detail,
+    '/x/polymer/web-dynamic/v1/feed/space': feed_space,
+    '/x/polymer/web-dynamic/v1/feed/all': feed_all,
+    '/x/article/viewinfo': article_info,
+}
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, cfg: MockConfig, host: str = '127.0.0.1', port: int = 0, verbose: bool = False):
+        super().__init__((host, port), MockHandler)
+        self.state = MockState(cfg)
+        self.verbose = verbose
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> threading.Thread:
+        """在后台线程中运行（进程内使用）"""
+        thread = threading.Thread(target=self.serve_forever, name='mock-bilibili', daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8900, help='监听端口，0 为随机端口')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出每个请求的访问日志')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    cfg = config_from_args(args)
+    server = MockServer(cfg, args.host, args.port, verbose=args.verbose)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"模拟服务已启动: {server.url}", flush=True)
+    print(json.dumps(asdict(cfg), ensure_ascii=False), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,27 @@
 """
 B站评论爬虫配置文件
 """
+import os
+
+# 接口域名（可通过环境变量指向本地模拟服务，见 benchmarks/mock_server.py）
+API_BASE = os.environ.get("BILIBILI_API_BASE", "https://api.bilibili.com").rstrip("/")
+WWW_BASE = os.environ.get("BILIBILI_WWW_BASE", "https://www.bilibili.com").rstrip("/")
+
 # B站评论API端点
-COMMENT_API_URL = "https://api.bilibili.com/x/v2/reply/main"
-REPLY_API_URL = "https://api.bilibili.com/x/v2/reply/reply"
+COMMENT_API_URL = f"{API_BASE}/x/v2/reply/main"
+REPLY_API_URL = f"{API_BASE}/x/v2/reply/reply"
+
+# 视频信息API（BV号转AV号）
+VIDEO_INFO_API_URL = f"{API_BASE}/x/web-interface/view"
 
 # 动态详情API（新版）
-DYNAMIC_DETAIL_API_URL = "https://api.bilibili.com/x/polymer/web-dynamic/v1/detail"
+DYNAMIC_DETAIL_API_URL = f"{API_BASE}/x/polymer/web-dynamic/v1/detail"
 
 # 专栏文章信息API
-ARTICLE_INFO_API_URL = "https://api.bilibili.com/x/article/viewinfo"
+ARTICLE_INFO_API_URL = f"{API_BASE}/x/article/viewinfo"
+
+# 图文动态（OPUS）页面，动态接口缺少正文时从页面补全
+OPUS_PAGE_URL = f"{WWW_BASE}/opus"
 
 # 请求头配置
 DEFAULT_HEADERS = {
@@ -33,16 +45,43 @@ MAX_PAGES = 1000            # 最大爬取页数（防止无限爬取）
 
 # 并发配置
 MAX_REPLY_WORKERS = 4       # 子评论并发爬取线程数
+MAX_CONCURRENT_JOBS = 2     # sidecar 同时运行的爬取任务数
+RESULT_JOBS_KEPT = 4        # 保留结果（行、检索索引）的最近结束任务数，更早的只保留状态信息
+GLOBAL_RATE_LIMIT = 20.0    # 所有任务共用的请求速率上限（次/秒）
+
+# 实时统计配置
+LIVE_STATS_INTERVAL = 1.0   # 爬取过程中推送实时统计的最小间隔（秒）
+
+# 事件输出配置
+EVENT_BATCH_WINDOW = 0.05   # sidecar 合并日志 / 进度事件的时间窗口（秒），0 表示逐条写出
+EVENT_QUEUE_LIMIT = 10000   # 待写出事件上限，stdout 跟不上时丢弃新到的日志（进度和响应不丢）
+
+# 服务模式配置（backend/server.py）
+SERVER_HOST = "127.0.0.1"   # HTTP 监听地址（默认仅本机）
+SERVER_PORT = 8765          # HTTP 监听端口
+SERVER_EVENT_HISTORY = 10000  # 为事件订阅保留的最近事件数
+SERVER_MAX_BODY = 8 * 1024 * 1024  # 单个 RPC 请求体上限（字节）
+SERVER_SHUTDOWN_TIMEOUT = 30.0  # 退出时等待任务收尾（关闭流式输出文件等）的最长秒数
 
 # 用户空间动态API
-SPACE_DYNAMICS_API_URL = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space"
+SPACE_DYNAMICS_API_URL = f"{API_BASE}/x/polymer/web-dynamic/v1/feed/space"
 # 关注页动态流API（需要登录Cookie）
-FOLLOWING_FEED_API_URL = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/all"
+FOLLOWING_FEED_API_URL = f"{API_BASE}/x/polymer/web-dynamic/v1/feed/all"
 MAX_DYNAMICS_PAGES = 100
 
 # 扫码登录API
 PASSPORT_QR_GENERATE_URL = "https://passport.bilibili.com/x/passport-login/web/qrcode/generate"
 PASSPORT_QR_POLL_URL = "https://passport.bilibili.com/x/passport-login/web/qrcode/poll"
 
+# 本地数据目录（跨运行的索引等持久化数据）
+DATA_DIR = os.environ.get(
+    "BILIBILI_CRAWLER_DATA_DIR",
+    os.path.join(os.path.expanduser("~"), ".bilibili_crawler"),
+)
+USER_INDEX_DB = "user_index.db"  # 用户活跃索引数据库文件名
+
 # CSV导出配置
 CSV_ENCODING = "utf-8-sig"  # UTF-8 with BOM，Excel可以正确识别中文
+
+# 导出配置
+RAW_KEY = "_raw"  # keep_raw 时保存接口原始对象的字段（"_" 开头的字段不参与表格导出）
@@ -181,6 +181,16 @@ fn ensure_sidecar(app: &AppHandle, state: &State<SidecarState>) -> Result<(), St
     thread::spawn(move || {
         for line in BufReader::new(stdout).lines().flatten() {
             match serde_json::from_str::<Value>(&line) {
+                Ok(Value::Object(mut frame))
+                    if frame.get("kind").and_then(Value::as_str) == Some("batch") =>
+                {
+                    // Coalesced frame: forward each message as its own event
+                    if let Some(Value::Array(events)) = frame.remove("events") {
+                        for value in events {
+                            let _ = out_app.emit("sidecar-event", value);
+                        }
+                    }
+                }
                 Ok(value) => {
                     let _ = out_app.emit("sidecar-event", value);
                 }
@@ -16,7 +16,7 @@ import { SideNav } from "./components/SideNav";
 import { TaskWorkspace } from "./components/TaskWorkspace";
 import { TitleBar } from "./components/TitleBar";
 import { chooseCsvPath, onSidecarEvent, readBackgroundDataUrl, readConfig, sendSidecar, writeConfig } from "./lib/tauri";
-import type { Mode, SidecarEvent, Stats, UIConfig } from "./types";
+import type { Mode, ProgressDetail, SidecarEvent, Stats, UIConfig } from "./types";
 
 const timePresetSeconds: Record<string, number> = {
   不限: 0,
@@ -69,6 +69,7 @@ export function App() {
   const [stats, setStats] = useState<Stats>({ total: 0, main_comments: 0, replies: 0, total_likes: 0 });
   const [progressPercent, setProgressPercent] = useState(0);
   const [progressStatus, setProgressStatus] = useState("爬取进度");
+  const [progressDetail, setProgressDetail] = useState<ProgressDetail | null>(null);
   const [backgroundDataUrl, setBackgroundDataUrl] = useState("");
   const [stopping, setStopping] = useState(false);
   const [qrImage, setQrImage] = useState<string>("");
@@ -143,11 +144,13 @@ export function App() {
         setRunning(event.status === "running");
         updateProgress(event.percent);
         if (event.status === "running") setSummary("任务运行中");
-        if (event.status === "running") setProgressStatus("爬取进度");
+        if (event.status === "running") setProgressStatus(event.phase === "replies" ? "爬取回复" : "爬取进度");
+        if (event.status === "running" && typeof event.req_per_sec === "number") setProgressDetail(event);
         if (event.status === "idle") {
           setSummary("就绪");
           setStopping(false);
           setProgressStatus("爬取进度");
+          setProgressDetail(null);
         }
         break;
       case "stats":
@@ -158,6 +161,7 @@ export function App() {
         setStopping(false);
         setProgressPercent(100);
         setProgressStatus("爬取完成");
+        setProgressDetail(null);
         setSummary(`完成：${event.count ?? 0} 条`);
         if (event.mode === "comments") setHasComments(Boolean(event.count));
         if (event.mode === "dynamics") setHasDynamics(Boolean(event.count));
@@ -167,6 +171,7 @@ export function App() {
         setRunning(false);
         setStopping(false);
         setProgressStatus("爬取进度");
+        setProgressDetail(null);
         setSummary("任务失败");
         toast.error(event.message || "任务失败");
         if (event.message) pushLog(`错误：${event.message}`);
@@ -191,6 +196,7 @@ export function App() {
     setLogs([`正在启动${taskName}爬取...`]);
     setProgressPercent(0);
     setProgressStatus("爬取进度");
+    setProgressDetail(null);
     setStopping(false);
     setSummary("任务运行中");
     setRunning(true);
@@ -296,6 +302,7 @@ export function App() {
             statCards={statCards}
             progressPercent={progressPercent}
             progressStatus={progressStatus}
+            progressDetail={progressDetail}
           />
         </section>
         <BottomActionBar
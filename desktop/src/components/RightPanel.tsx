@@ -1,5 +1,6 @@
 import { useEffect, useRef } from "react";
 import { LucideIcon, Terminal, UserRoundCheck } from "lucide-react";
+import type { ProgressDetail } from "../types";
 
 interface Props {
   summary: string;
@@ -9,9 +10,26 @@ interface Props {
   statCards: Array<{ icon: LucideIcon; label: string; value: string | number }>;
   progressPercent: number;
   progressStatus: string;
+  progressDetail: ProgressDetail | null;
 }
 
-export function RightPanel({ summary, running, loggedIn, logs, statCards, progressPercent, progressStatus }: Props) {
+function formatEta(seconds: number | null | undefined) {
+  if (typeof seconds !== "number") return "估算中";
+  if (seconds < 60) return `${Math.ceil(seconds)} 秒`;
+  if (seconds < 3600) return `${Math.floor(seconds / 60)} 分 ${Math.floor(seconds % 60)} 秒`;
+  return `${Math.floor(seconds / 3600)} 小时 ${Math.floor((seconds % 3600) / 60)} 分`;
+}
+
+export function RightPanel({
+  summary,
+  running,
+  loggedIn,
+  logs,
+  statCards,
+  progressPercent,
+  progressStatus,
+  progressDetail
+}: Props) {
   const logRef = useRef<HTMLDivElement>(null);
   useEffect(() => {
     logRef.current?.scrollTo({ top: logRef.current.scrollHeight, behavior: "smooth" });
@@ -64,6 +82,21 @@ export function RightPanel({ summary, running, loggedIn, logs, statCards, progre
           <div className="progress-track" aria-label={`爬取进度 ${progressPercent}%`}>
             <span style={{ width: `${progressPercent}%` }} />
           </div>
+          {progressDetail && (
+            <div className="progress-detail">
+              <span>
+                {progressDetail.rows ?? 0}
+                {progressDetail.expected_total ? ` / ${progressDetail.expected_total}` : ""} 条 · 第 {progressDetail.pages ?? 0} 页
+              </span>
+              <span>
+                {progressDetail.req_per_sec ?? 0} 请求/秒 · {progressDetail.rows_per_sec ?? 0} 条/秒
+              </span>
+              <span className={progressDetail.throttled ? "progress-throttled" : undefined}>
+                间隔 {progressDetail.delay ?? 0}s{progressDetail.throttled ? ` · 风控 ${progressDetail.throttled} 次` : ""}
+              </span>
+              <span>剩余 {formatEta(progressDetail.eta)}</span>
+            </div>
+          )}
         </div>
       </section>
     </aside>
@@ -17,11 +17,27 @@ export interface Stats {
   total_likes?: number;
 }
 
-export interface SidecarEvent {
+export interface ProgressDetail {
+  phase?: "pages" | "replies";
+  pages?: number;
+  max_pages?: number;
+  rows?: number;
+  expected_total?: number | null;
+  requests?: number;
+  throttled?: number;
+  delay?: number;
+  elapsed?: number;
+  eta?: number | null;
+  req_per_sec?: number;
+  rows_per_sec?: number;
+}
+
+export interface SidecarEvent extends ProgressDetail {
   kind: "event" | "response";
   event?: string;
   ok?: boolean;
   id?: string;
+  job_id?: string;
   message?: string;
   mode?: Mode;
   status?: string;
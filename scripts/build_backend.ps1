@@ -17,6 +17,8 @@ New-Item -ItemType Directory -Force $ResourceDir | Out-Null
     --workpath $WorkDir `
     --specpath $WorkDir `
     --paths $Root `
+    --exclude-module numpy `
+    --exclude-module pyarrow `
     (Join-Path $Root "backend\sidecar.py")
 
 Write-Host "Python sidecar built at $ResourceDir"
@@ -7,11 +7,13 @@ B站API调用封装模块
 """
 import time
 import logging
+import threading
 import requests
 from typing import Dict, Optional, Any
 from config.config import (
     COMMENT_API_URL,
     REPLY_API_URL,
+    VIDEO_INFO_API_URL,
     DYNAMIC_DETAIL_API_URL,
     ARTICLE_INFO_API_URL,
     SPACE_DYNAMICS_API_URL,
@@ -26,6 +28,7 @@ from config.config import (
     MAX_RETRIES,
     DEFAULT_PAGE_SIZE,
 )
+from src.api.rate_limiter import RateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -33,19 +36,48 @@ logger = logging.getLogger(__name__)
 class BilibiliAPI:
     """B站API调用封装类"""
 
-    def __init__(self, headers: Optional[Dict[str, str]] = None):
+    def __init__(self, headers: Optional[Dict[str, str]] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 session: Optional[requests.Session] = None):
+        """
+        Args:
+            headers: 请求头，默认 DEFAULT_HEADERS（传入 session 时以会话自身的请求头为准）
+            rate_limiter: 共享限速器；提供时由它统一控制请求间隔（多个实例共用一个请求预算）
+            session: 共用的会话（见 SessionManager）；为 None 时新建
+        """
         self.headers = headers or DEFAULT_HEADERS.copy()
-        self.session = requests.Session()
-        self.session.trust_env = False  # 忽略系统代理，避免连接干扰
-        self.session.headers.update(self.headers)
+        if session is None:
+            session = requests.Session()
+            session.trust_env = False  # 忽略系统代理，避免连接干扰
+            session.headers.update(self.headers)
+        self.session = session
+        self.rate_limiter = rate_limiter
         # 自适应延迟：初始值较小，被限速后动态增大
         self._current_delay = REQUEST_DELAY_DEFAULT
+        # 请求计数（含重试），回复并发线程共用同一实例
+        self.request_count = 0
+        self.throttled_count = 0
+        # 重试后仍失败（返回 None）的请求数与最近一次的原因，调用方据此区分"没有数据"和"没拿到数据"
+        self.failed_count = 0
+        self.last_error: Optional[str] = None
+        self._count_lock = threading.Lock()
+
+    @property
+    def current_delay(self) -> float:
+        """当前的请求间隔（秒）；使用共享限速器时为限速器当前速率对应的间隔"""
+        if self.rate_limiter is not None:
+            return 1 / self.rate_limiter.rate
+        return self._current_delay
 
     def _adaptive_sleep(self, was_rate_limited: bool = False):
         """
         自适应延迟控制。
         正常时逐步缩短到最小值；被限速时倍增到最大值。
+        设置了共享限速器时改由限速器排队。
         """
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait(was_rate_limited)
+            return
         if was_rate_limited:
             self._current_delay = min(self._current_delay * 2, REQUEST_DELAY_MAX)
         else:
@@ -53,6 +85,11 @@ class BilibiliAPI:
             self._current_delay = max(self._current_delay * 0.8, REQUEST_DELAY_MIN)
         time.sleep(self._current_delay)
 
+    def _record_failure(self, message: str):
+        with self._count_lock:
+            self.failed_count += 1
+            self.last_error = message
+
     def _request(self, url: str, params: Dict[str, Any]) -> Optional[Dict]:
         """
         发送HTTP请求（带重试机制，迭代式）
@@ -68,6 +105,9 @@ class BilibiliAPI:
         for attempt in range(MAX_RETRIES + 1):
             try:
                 self._adaptive_sleep(was_rate_limited=rate_limited)
+                with self._count_lock:
+                    self.request_count += 1
+                    self.throttled_count += rate_limited
                 rate_limited = False
                 response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
                 response.raise_for_status()
@@ -83,7 +123,9 @@ class BilibiliAPI:
                     rate_limited = True
                     continue
 
-                logger.warning(f"API返回错误: code={code}, message={data.get('message')}")
+                message = f"API返回错误: code={code}, message={data.get('message')}"
+                logger.warning(message)
+                self._record_failure(message)
                 return None
 
             except requests.exceptions.Timeout:
@@ -93,6 +135,7 @@ class BilibiliAPI:
                     time.sleep(wait)
                 else:
                     logger.error("请求超时，已达到最大重试次数")
+                    self._record_failure("请求超时，已达到最大重试次数")
                     return None
 
             except requests.exceptions.RequestException as e:
@@ -102,12 +145,16 @@ class BilibiliAPI:
                     time.sleep(wait)
                 else:
                     logger.error(f"请求失败，已达到最大重试次数: {e}")
+                    self._record_failure(f"请求失败: {e}")
                     return None
 
             except ValueError as e:
                 logger.error(f"JSON解析错误: {e}")
+                self._record_failure(f"JSON解析错误: {e}")
                 return None
 
+        # 风控重试次数用尽
+        self._record_failure("触发风控(code=-412)，已达到最大重试次数")
         return None
 
     # ============================================================
@@ -123,9 +170,8 @@ class BilibiliAPI:
         Returns:
             视频信息字典
         """
-        url = "https://api.bilibili.com/x/web-interface/view"
         params = {"bvid": bvid}
-        return self._request(url, params)
+        return self._request(VIDEO_INFO_API_URL, params)
 
     # ============================================================
     #  动态相关
@@ -318,7 +364,7 @@ class BilibiliAPI:
 
     def set_cookie(self, cookie: str):
         """
-        设置Cookie（用于需要登录的场景）
+        设置Cookie（用于需要登录的场景；会话共用时对所有共用它的实例生效）
 
         Args:
             cookie: Cookie字符串
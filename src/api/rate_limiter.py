@@ -0,0 +1,91 @@
+"""
+共享请求限速器
+- 多个爬取任务（及其回复并发线程）共用一个请求速率上限，整体不超过预算
+- 按时间槽排队：每次请求领取下一个发送时刻，锁内只做计算，等待在锁外进行
+- 自适应：被风控时速率减半，请求成功后逐步恢复到上限（与单个 BilibiliAPI 的退避规则一致）
+"""
+import logging
+import threading
+import time
+from typing import Dict
+
+from config.config import GLOBAL_RATE_LIMIT, REQUEST_DELAY_MAX
+
+logger = logging.getLogger(__name__)
+
+# 成功后的恢复系数（与 BilibiliAPI 自适应延迟每次乘 0.8 对应）
+_RECOVERY = 1 / 0.8
+
+
+class RateLimiter:
+    """
+    线程安全的全局限速器
+
+    用法:
+        limiter = RateLimiter(rate=20)
+        api = BilibiliAPI(rate_limiter=limiter)   # 多个 API 实例共用同一个限速器
+    """
+
+    def __init__(self, rate: float = GLOBAL_RATE_LIMIT, min_rate: float = 1 / REQUEST_DELAY_MAX):
+        """
+        Args:
+            rate: 请求速率上限（次/秒）
+            min_rate: 连续被风控时速率的下限（次/秒）
+        """
+        if rate <= 0:
+            raise ValueError("限速速率必须大于0")
+        self.max_rate = float(rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.rate = self.max_rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def wait(self, was_rate_limited: bool = False) -> float:
+        """
+        调整速率并等待到下一个可用的发送时刻
+
+        Args:
+            was_rate_limited: 上一次请求是否被风控
+
+        Returns:
+            实际等待的秒数
+        """
+        with self._lock:
+            if was_rate_limited:
+                self.rate = max(self.rate / 2, self.min_rate)
+                self.throttled += 1
+                # 已排好的时间槽按新速率顺延，避免风控后仍按旧速率连发
+                self._next_slot = max(self._next_slot, time.monotonic()) + 1 / self.rate
+            else:
+                self.rate = min(self.rate * _RECOVERY, self.max_rate)
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1 / self.rate
+            self.requests += 1
+            delay = slot - now
+            self.waited += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def set_rate(self, rate: float):
+        """修改速率上限（立即生效）"""
+        if rate <= 0:
+            raise ValueError("限速速率必须大于0")
+        with self._lock:
+            self.max_rate = float(rate)
+            self.min_rate = min(self.min_rate, self.max_rate)
+            self.rate = min(self.rate, self.max_rate)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'rate': round(self.rate, 3),
+                'max_rate': self.max_rate,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'waited': round(self.waited, 3),
+            }
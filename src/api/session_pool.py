@@ -0,0 +1,106 @@
+"""
+共享 HTTP 会话
+- 所有爬取任务（评论 / 动态）和扫码登录共用一个 requests.Session：保持长连接，
+  新任务不再重新做 DNS / TCP / TLS 握手，扫码登录得到的 Cookie 对所有任务生效
+- 连接池按“同时运行的任务数 x 每个任务的并发线程数”设定大小，并发回复线程不会因池满而丢弃连接
+- 每个任务拿到自己的 BilibiliAPI（请求计数各自独立，进度按任务统计），共用会话和限速器，
+  风控退避学到的速率在任务之间延续
+"""
+import logging
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.config import DEFAULT_HEADERS, MAX_CONCURRENT_JOBS, MAX_REPLY_WORKERS
+from src.api.bilibili_api import BilibiliAPI
+from src.api.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# 会话访问的主机数（api / passport / www），每个主机一个连接池
+_POOL_HOSTS = 4
+
+
+class SessionManager:
+    """
+    为多个爬取任务提供共用会话的 BilibiliAPI
+
+    用法:
+        sessions = SessionManager(rate_limiter=limiter)
+        crawler = CommentCrawler(api=sessions.new_api())
+        print(sessions.stats())   # 连接复用情况
+    """
+
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None, max_tasks: int = MAX_CONCURRENT_JOBS):
+        """
+        Args:
+            rate_limiter: 所有任务共用的限速器
+            max_tasks: 同时运行的任务数上限（决定连接池大小）
+        """
+        self.rate_limiter = rate_limiter
+        self.session = requests.Session()
+        self.session.trust_env = False  # 忽略系统代理，避免连接干扰
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.pool_size = 0
+        self.apis_created = 0
+        self._adapters = []
+        self._lock = threading.Lock()
+        self.resize(max_tasks)
+
+    def resize(self, max_tasks: int):
+        """
+        按任务数调整连接池大小（只增不减）
+
+        扩容时挂载新的适配器，已有的空闲连接随旧适配器释放，因此只在并发上限调大时发生。
+        """
+        pool_size = max(int(max_tasks), 1) * (MAX_REPLY_WORKERS + 1)
+        with self._lock:
+            if pool_size <= self.pool_size:
+                return
+            adapter = HTTPAdapter(pool_connections=_POOL_HOSTS, pool_maxsize=pool_size)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self._adapters.append(adapter)
+            self.pool_size = pool_size
+        logger.info(f"连接池大小: {pool_size}")
+
+    def new_api(self) -> BilibiliAPI:
+        """一个任务用的 API 实例（独立计数，共用会话、Cookie 和限速器）"""
+        with self._lock:
+            self.apis_created += 1
+        return BilibiliAPI(rate_limiter=self.rate_limiter, session=self.session)
+
+    def stats(self) -> Dict:
+        """
+        连接复用统计
+
+        Returns:
+            {'requests': 发出的 HTTP 请求数, 'connections': 新建的连接数,
+             'reused': 复用已有连接的请求数, 'reuse_ratio': 复用比例,
+             'pool_size': 每个主机的连接池大小, 'apis': 已创建的 API 实例数}
+        """
+        requests_sent = connections = 0
+        with self._lock:
+            adapters = list(self._adapters)
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+        reused = max(requests_sent - connections, 0)
+        return {
+            'requests': requests_sent,
+            'connections': connections,
+            'reused': reused,
+            'reuse_ratio': round(reused / requests_sent, 3) if requests_sent else 0.0,
+            'pool_size': self.pool_size,
+            'apis': self.apis_created,
+        }
+
+    def close(self):
+        self.session.close()
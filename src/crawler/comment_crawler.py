@@ -11,7 +11,9 @@ from datetime import datetime
 from typing import List, Dict, Optional, Callable
 
 from src.api.bilibili_api import BilibiliAPI
-from config.config import MAX_REPLY_WORKERS
+from src.api.rate_limiter import RateLimiter
+from src.crawler.progress import CrawlProgress
+from config.config import MAX_REPLY_WORKERS, RAW_KEY
 from utils.helpers import (
     parse_input, ParsedInput, ContentType,
     parse_video_id, validate_bvid,
@@ -23,15 +25,36 @@ logger = logging.getLogger(__name__)
 class CommentCrawler:
     """评论爬虫类（支持视频/动态/专栏文章）"""
 
-    def __init__(self, progress_callback: Optional[Callable[[str], None]] = None):
+    def __init__(
+        self,
+        progress_callback: Optional[Callable[[str], None]] = None,
+        batch_callback: Optional[Callable[[List[Dict]], None]] = None,
+        keep_raw: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        progress_hook: Optional[Callable[[Dict], None]] = None,
+        api: Optional[BilibiliAPI] = None,
+    ):
         """
         初始化爬虫
 
         Args:
             progress_callback: 进度回调函数，接收日志消息（需线程安全，由调用方保证）
+            batch_callback: 批回调函数，每页主评论处理完、每条主评论的回复爬完时各收到一批评论
+                            （始终在调用 crawl_comments 的线程中调用，无需加锁）
+            keep_raw: 是否在每条评论的 RAW_KEY 字段保留接口返回的原始评论对象
+            rate_limiter: 共享限速器（多个爬虫同时运行时共用请求预算）
+            progress_hook: 结构化进度回调，接收 CrawlProgress.snapshot() 的字典
+                           （回复爬取阶段在调用 crawl_comments 的线程中调用）
+            api: 使用的 API 实例（如 SessionManager.new_api()）；为 None 时新建，rate_limiter 仅在新建时使用
         """
-        self.api = BilibiliAPI()
+        self.api = api or BilibiliAPI(rate_limiter=rate_limiter)
         self.progress_callback = progress_callback or (lambda x: None)
+        self.batch_callback = batch_callback
+        self.keep_raw = keep_raw
+        self.progress_hook = progress_hook
+        self._progress: Optional[CrawlProgress] = None
+        # 最近一次 crawl_comments 解析出的目标（解析失败时为 None）
+        self.target: Optional[ParsedInput] = None
         self._stop_flag = False
 
     def _log(self, message: str):
@@ -199,7 +222,7 @@ class CommentCrawler:
         all_comments = []
 
         # 1. 解析用户输入
-        target = self.resolve_target(url_or_id)
+        target = self.target = self.resolve_target(url_or_id)
         if not target or target.oid is None:
             self._log("错误: 无法解析目标内容的OID")
             return all_comments
@@ -209,6 +232,7 @@ class CommentCrawler:
         type_label = ContentType.label(type_id)
 
         self._log(f"开始爬取评论 | 类型: {type_label} | OID: {oid} | type: {type_id}")
+        progress = self._progress = CrawlProgress(self.api, self.progress_hook, max_pages)
 
         # 2. 爬取评论
         page = 1
@@ -243,6 +267,7 @@ class CommentCrawler:
             self._log(f"第 {page} 页获取到 {len(replies)} 条评论")
 
             # ---- 收集需要爬取子评论的主评论 ----
+            batch_start = len(all_comments)
             reply_tasks = []  # (root_rpid, rcount)
             for reply in replies:
                 if self._stop_flag:
@@ -255,6 +280,15 @@ class CommentCrawler:
                     if rcount > 0:
                         reply_tasks.append((reply.get('rpid'), rcount))
 
+            self._emit_batch(all_comments[batch_start:])
+            progress.update(
+                added_rows=len(all_comments) - batch_start,
+                phase='replies' if reply_tasks else 'pages',
+                pages=page,
+                # 接口报告的总数包含回复，只爬主评论时无法据此估算
+                expected_total=self._reported_total(comment_data['data']) if include_replies else None,
+            )
+
             # ---- 并发爬取子评论 ----
             if reply_tasks and not self._stop_flag:
                 self._log(f"  并发爬取 {len(reply_tasks)} 条评论的回复 (workers={MAX_REPLY_WORKERS})...")
@@ -312,6 +346,9 @@ class CommentCrawler:
                 try:
                     replies = future.result()
                     all_replies.extend(replies)
+                    self._emit_batch(replies)
+                    if self._progress is not None:
+                        self._progress.update(added_rows=len(replies))
                 except Exception as e:
                     logger.error(f"爬取评论 {root_rpid} 的回复时出错: {e}")
         finally:
@@ -359,6 +396,17 @@ class CommentCrawler:
 
         return replies
 
+    @staticmethod
+    def _reported_total(data: Dict) -> Optional[int]:
+        """接口报告的评论总数（新版 cursor.all_count，旧版 page.count）"""
+        total = (data.get('cursor') or {}).get('all_count') or (data.get('page') or {}).get('count')
+        return int(total) if total else None
+
+    def _emit_batch(self, batch: List[Dict]):
+        """把一批已处理的评论交给批回调"""
+        if self.batch_callback and batch:
+            self.batch_callback(batch)
+
     def _process_comment(
         self,
         reply: Dict,
@@ -381,7 +429,7 @@ class CommentCrawler:
         member = reply.get('member', {})
         content = reply.get('content', {})
 
-        return {
+        comment = {
             'comment_id': reply.get('rpid'),
             'root_id': root_id if root_id is not None else reply.get('rpid'),
             'parent_id': reply.get('parent'),
@@ -402,6 +450,9 @@ class CommentCrawler:
             # 其他
             'ip_location': reply.get('reply_control', {}).get('location', ''),
         }
+        if self.keep_raw:
+            comment[RAW_KEY] = reply
+        return comment
 
     @staticmethod
     def _timestamp_to_str(timestamp: int) -> str:
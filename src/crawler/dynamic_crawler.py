@@ -6,10 +6,13 @@ import logging
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Optional, Callable
+from typing import List, Dict, Optional, Callable, Union
 
 from src.api.bilibili_api import BilibiliAPI
-from config.config import MAX_DYNAMICS_PAGES, MAX_REPLY_WORKERS
+from src.api.rate_limiter import RateLimiter
+from src.crawler.progress import CrawlProgress
+from src.processor.keyword_matcher import KeywordMatcher, compile_keywords
+from config.config import MAX_DYNAMICS_PAGES, MAX_REPLY_WORKERS, OPUS_PAGE_URL, RAW_KEY
 
 logger = logging.getLogger(__name__)
 
@@ -20,15 +23,41 @@ def _ts_str(ts: int) -> str:
     return '不限'
 
 
+def _time_fraction(newest_ts: int, oldest_ts: int, start_time: int) -> Optional[float]:
+    """按时间倒序翻页时，已覆盖的时间跨度占 [start_time, 最新动态] 的比例"""
+    if not start_time or not oldest_ts or newest_ts <= start_time:
+        return None
+    return min(max((newest_ts - oldest_ts) / (newest_ts - start_time), 0.0), 1.0)
+
+
 class DynamicCrawler:
     """从B站爬取动态内容（支持用户空间和关注页）"""
 
     def __init__(self, progress_callback: Optional[Callable[[str], None]] = None,
-                 cookie: str = ""):
-        self.api = BilibiliAPI()
+                 cookie: str = "",
+                 batch_callback: Optional[Callable[[List[Dict]], None]] = None,
+                 keep_raw: bool = False,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 progress_hook: Optional[Callable[[Dict], None]] = None,
+                 api: Optional[BilibiliAPI] = None):
+        """
+        Args:
+            progress_callback: 进度回调函数，接收日志消息
+            cookie: 登录Cookie（关注页动态流需要）
+            batch_callback: 批回调函数，每页动态充实、过滤完后收到该页保留的动态
+                            （始终在调用爬取方法的线程中调用）
+            keep_raw: 是否在每条动态的 RAW_KEY 字段保留接口返回的原始动态对象
+            rate_limiter: 共享限速器（多个爬虫同时运行时共用请求预算）
+            progress_hook: 结构化进度回调，每页结束时接收 CrawlProgress.snapshot() 的字典
+            api: 使用的 API 实例（如 SessionManager.new_api()）；为 None 时新建，rate_limiter 仅在新建时使用
+        """
+        self.api = api or BilibiliAPI(rate_limiter=rate_limiter)
         if cookie:
             self.api.set_cookie(cookie)
         self.progress_callback = progress_callback or (lambda x: None)
+        self.batch_callback = batch_callback
+        self.keep_raw = keep_raw
+        self.progress_hook = progress_hook
         self._stop_flag = False
 
     def _log(self, message: str):
@@ -53,13 +82,17 @@ class DynamicCrawler:
         offset = ""
         seen_ids = set()
         min_ts_seen = 0  # 当前页最早的时间戳，用于提前停止
+        fetched = 0
 
         self._log(f"开始爬取用户 {host_mid} 的空间动态...")
-        if keyword:
+        matcher = compile_keywords(keyword)  # 表达式有误时在发请求前报错
+        if matcher is not None:
             self._log(f"关键词过滤: {keyword}")
         if start_time or end_time:
             self._log(f"时间范围: {_ts_str(start_time)} ~ {_ts_str(end_time)}")
 
+        progress = CrawlProgress(self.api, self.progress_hook, max_pages)
+        newest_ts = 0
         while page <= max_pages and not self._stop_flag:
             self._log(f"正在爬取第 {page} 页动态...")
 
@@ -89,17 +122,27 @@ class DynamicCrawler:
                     page_ts.append(ts)
             if page_ts:
                 min_ts_seen = min(page_ts)
+                newest_ts = newest_ts or max(page_ts)
 
-            before = len(all_dynamics)
+            page_dynamics = []
             for item in new_items:
                 if self._stop_flag:
                     break
                 dynamic = self._process_dynamic(item)
                 if dynamic:
-                    all_dynamics.append(dynamic)
+                    page_dynamics.append(dynamic)
+            fetched += len(page_dynamics)
 
             self._log(f"第 {page} 页: 获取 {len(new_items)} 条，"
-                      f"新增 {len(all_dynamics) - before} 条")
+                      f"新增 {len(page_dynamics)} 条")
+
+            # 过滤和充实都是逐条的，按页做完即可交给批回调（边爬边导出）
+            kept = self._enrich_and_filter(page_dynamics, matcher, start_time, end_time,
+                                           verbose=False)
+            all_dynamics.extend(kept)
+            self._emit_batch(kept)
+            progress.update(added_rows=len(page_dynamics), pages=page,
+                            time_fraction=_time_fraction(newest_ts, min_ts_seen, start_time))
 
             # 提前停止：当前页最早动态已超出时间范围
             if start_time and min_ts_seen and min_ts_seen < start_time:
@@ -115,8 +158,9 @@ class DynamicCrawler:
                 self._log("已到达最后一页")
                 break
 
-        self._log(f"爬取完成！共获取 {len(all_dynamics)} 条动态")
-        all_dynamics = self._enrich_and_filter(all_dynamics, keyword, start_time, end_time)
+        self._log(f"爬取完成！共获取 {fetched} 条动态")
+        if fetched != len(all_dynamics):
+            self._log(f"过滤后剩余 {len(all_dynamics)} 条")
         return all_dynamics
 
     def crawl_following_feed(
@@ -133,13 +177,17 @@ class DynamicCrawler:
         offset = ""
         seen_ids = set()
         min_ts_seen = 0
+        fetched = 0
 
         self._log("开始爬取关注页动态流...")
-        if keyword:
+        matcher = compile_keywords(keyword)  # 表达式有误时在发请求前报错
+        if matcher is not None:
             self._log(f"关键词过滤: {keyword}")
         if start_time or end_time:
             self._log(f"时间范围: {_ts_str(start_time)} ~ {_ts_str(end_time)}")
 
+        progress = CrawlProgress(self.api, self.progress_hook, max_pages)
+        newest_ts = 0
         while page <= max_pages and not self._stop_flag:
             self._log(f"正在爬取第 {page} 页动态...")
 
@@ -169,17 +217,27 @@ class DynamicCrawler:
                     page_ts.append(ts)
             if page_ts:
                 min_ts_seen = min(page_ts)
+                newest_ts = newest_ts or max(page_ts)
 
-            before = len(all_dynamics)
+            page_dynamics = []
             for item in new_items:
                 if self._stop_flag:
                     break
                 dynamic = self._process_dynamic(item)
                 if dynamic:
-                    all_dynamics.append(dynamic)
+                    page_dynamics.append(dynamic)
+            fetched += len(page_dynamics)
 
             self._log(f"第 {page} 页: 获取 {len(new_items)} 条，"
-                      f"新增 {len(all_dynamics) - before} 条")
+                      f"新增 {len(page_dynamics)} 条")
+
+            # 过滤和充实都是逐条的，按页做完即可交给批回调（边爬边导出）
+            kept = self._enrich_and_filter(page_dynamics, matcher, start_time, end_time,
+                                           verbose=False)
+            all_dynamics.extend(kept)
+            self._emit_batch(kept)
+            progress.update(added_rows=len(page_dynamics), pages=page,
+                            time_fraction=_time_fraction(newest_ts, min_ts_seen, start_time))
 
             # 提前停止：当前页最早动态已超出时间范围
             if start_time and min_ts_seen and min_ts_seen < start_time:
@@ -195,13 +253,28 @@ class DynamicCrawler:
                 self._log("已到达最后一页")
                 break
 
-        self._log(f"爬取完成！共获取 {len(all_dynamics)} 条动态")
-        all_dynamics = self._enrich_and_filter(all_dynamics, keyword, start_time, end_time)
+        self._log(f"爬取完成！共获取 {fetched} 条动态")
+        if fetched != len(all_dynamics):
+            self._log(f"过滤后剩余 {len(all_dynamics)} 条")
         return all_dynamics
 
-    def _enrich_and_filter(self, dynamics: List[Dict], keyword: str = "",
-                           start_time: int = 0, end_time: int = 0) -> List[Dict]:
-        """充实空内容的动态（OPUS页面回退），然后按时间范围和关键词过滤"""
+    def _emit_batch(self, batch: List[Dict]):
+        """把一页已处理的动态交给批回调"""
+        if self.batch_callback and batch:
+            self.batch_callback(batch)
+
+    def _enrich_and_filter(self, dynamics: List[Dict],
+                           keyword: Union[str, KeywordMatcher, None] = "",
+                           start_time: int = 0, end_time: int = 0,
+                           verbose: bool = True) -> List[Dict]:
+        """
+        充实空内容的动态（OPUS页面回退），然后按时间范围和关键词表达式过滤
+
+        Args:
+            verbose: 是否输出每一步过滤后的剩余条数（逐页调用时关闭）
+        """
+        if not dynamics:
+            return dynamics
         # 时间过滤
         if start_time or end_time:
             filtered = []
@@ -213,7 +286,8 @@ class DynamicCrawler:
                     continue
                 filtered.append(d)
             dynamics = filtered
-            self._log(f"时间过滤后剩余 {len(dynamics)} 条")
+            if verbose:
+                self._log(f"时间过滤后剩余 {len(dynamics)} 条")
 
         # 找出需要充实文字的动态
         empty_ids = [d['dynamic_id'] for d in dynamics
@@ -239,10 +313,11 @@ class DynamicCrawler:
                         text = text + '\n' + ' '.join(img_urls)
                     d['content'] = text
 
-        if keyword:
-            kw = keyword.lower()
-            dynamics = [d for d in dynamics if kw in d.get('content', '').lower()]
-            self._log(f"关键词过滤后剩余 {len(dynamics)} 条")
+        matcher = compile_keywords(keyword)
+        if matcher is not None:
+            dynamics = matcher.filter(dynamics, annotate=True)
+            if verbose:
+                self._log(f"关键词过滤后剩余 {len(dynamics)} 条")
 
         return dynamics
 
@@ -257,7 +332,7 @@ class DynamicCrawler:
                 return dy_id, ""
             try:
                 r = session.get(
-                    f'https://www.bilibili.com/opus/{dy_id}',
+                    f'{OPUS_PAGE_URL}/{dy_id}',
                     timeout=10,
                     headers={'Referer': 'https://www.bilibili.com/'},
                 )
@@ -383,7 +458,7 @@ class DynamicCrawler:
                     return val.get('count', 0)
                 return val if isinstance(val, (int, float)) else 0
 
-            return {
+            dynamic = {
                 'dynamic_id': id_str,
                 'type': dynamic_type,
                 'content': content,
@@ -394,6 +469,9 @@ class DynamicCrawler:
                 'comment_count': _extract_count(stat.get('comment', 0)),
                 'forward_count': _extract_count(stat.get('forward', 0)),
             }
+            if self.keep_raw:
+                dynamic[RAW_KEY] = item
+            return dynamic
         except Exception as e:
             logger.warning(f"处理动态项时出错: {e}")
             return None
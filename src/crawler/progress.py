@@ -0,0 +1,129 @@
+"""
+结构化爬取进度
+- CrawlProgress: 爬虫维护的计数（页数、行数、请求数、当前退避间隔、接口报告的总数），
+  每页 / 每条主评论的回复爬完时以字典形式交给 progress_hook
+- ProgressEstimator: 由进度字典计算完成比例、剩余时间和最近一段时间的吞吐量
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+# 计算吞吐量的滑动窗口（秒）
+RATE_WINDOW = 10.0
+
+# 爬取结束前显示的最大完成比例（剩余部分在 finished 时补齐）
+_MAX_FRACTION = 0.99
+
+
+class CrawlProgress:
+    """
+    爬虫内部的进度计数
+
+    用法:
+        progress = CrawlProgress(self.api, hook, max_pages=100)
+        progress.update(added_rows=30, pages=1, expected_total=1200)
+    """
+
+    def __init__(self, api, hook: Optional[Callable[[Dict], None]], max_pages: int = 0):
+        """
+        Args:
+            api: BilibiliAPI 实例（读取请求计数和当前请求间隔）
+            hook: 进度回调，接收 snapshot() 的字典；为 None 时不报告
+            max_pages: 最大页数（页数上限也是爬取结束的条件之一）
+        """
+        self.api = api
+        self.hook = hook
+        self.max_pages = max_pages
+        self.phase = 'pages'
+        self.pages = 0
+        self.rows = 0
+        self.expected_total: Optional[int] = None
+        self.time_fraction: Optional[float] = None
+        self._requests_start = api.request_count
+        self._throttled_start = api.throttled_count
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, added_rows: int = 0, **changes):
+        """
+        更新计数并报告（可在回复并发线程中调用）
+
+        Args:
+            added_rows: 新增的行数
+            **changes: 直接覆盖的字段（phase、pages、expected_total、time_fraction）
+        """
+        with self._lock:
+            self.rows += added_rows
+            for key, value in changes.items():
+                setattr(self, key, value)
+            snapshot = self.snapshot()
+        if self.hook is not None:
+            self.hook(snapshot)
+
+    def snapshot(self) -> Dict:
+        return {
+            'phase': self.phase,
+            'pages': self.pages,
+            'max_pages': self.max_pages,
+            'rows': self.rows,
+            'expected_total': self.expected_total,
+            'time_fraction': self.time_fraction,
+            'requests': self.api.request_count - self._requests_start,
+            'throttled': self.api.throttled_count - self._throttled_start,
+            'delay': round(self.api.current_delay, 3),
+            'elapsed': round(time.monotonic() - self._started, 3),
+        }
+
+
+class ProgressEstimator:
+    """
+    由进度字典估算完成比例和剩余时间
+
+    爬取在页数达到上限、行数达到接口报告的总数、时间范围到达起点三者之一时结束，
+    所以完成比例取三者中最大的一个；吞吐量按最近 RATE_WINDOW 秒计算，退避时会及时下降。
+    """
+
+    def __init__(self, window: float = RATE_WINDOW):
+        self.window = window
+        self._samples: deque = deque()
+
+    def update(self, progress: Dict) -> Dict:
+        """
+        Args:
+            progress: CrawlProgress.snapshot() 的字典
+
+        Returns:
+            在 progress 基础上增加 percent、eta（秒，未知时为 None）、req_per_sec、rows_per_sec
+        """
+        elapsed = progress.get('elapsed', 0.0)
+        samples = self._samples
+        samples.append((elapsed, progress.get('requests', 0), progress.get('rows', 0)))
+        while len(samples) > 2 and elapsed - samples[0][0] > self.window:
+            samples.popleft()
+        first = samples[0]
+        span = elapsed - first[0]
+        req_rate = (samples[-1][1] - first[1]) / span if span > 0 else 0.0
+        row_rate = (samples[-1][2] - first[2]) / span if span > 0 else 0.0
+
+        fractions = [0.0]
+        max_pages = progress.get('max_pages')
+        if max_pages:
+            fractions.append(progress.get('pages', 0) / max_pages)
+        expected = progress.get('expected_total')
+        if expected:
+            fractions.append(progress.get('rows', 0) / expected)
+        if progress.get('time_fraction') is not None:
+            fractions.append(progress['time_fraction'])
+        fraction = min(max(fractions), _MAX_FRACTION)
+
+        eta = None
+        if fraction > 0 and elapsed > 0:
+            eta = round(elapsed * (1 - fraction) / fraction, 1)
+        return {
+            **progress,
+            'percent': round(fraction * 100, 1),
+            'eta': eta,
+            'req_per_sec': round(req_rate, 2),
+            'rows_per_sec': round(row_rate, 1),
+        }
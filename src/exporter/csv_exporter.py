@@ -3,12 +3,34 @@ CSV export helpers without heavyweight dataframe dependencies.
 """
 import csv
 import logging
+from itertools import chain
+from operator import itemgetter
 from typing import Dict, List, Optional
 
 from config.config import CSV_ENCODING
 
 logger = logging.getLogger(__name__)
 
+# Rows handed to csv.writer.writerows at a time, and the file write buffer size.
+WRITE_BATCH_ROWS = 10000
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _extract_values(rows: List[Dict], columns: List[str]) -> List:
+    """
+    Pull the column values out of a batch of rows.
+
+    Crawled rows normally carry every column, so the whole batch goes through a
+    single itemgetter; a batch with a missing key falls back to get() with "".
+    """
+    if len(columns) > 1:
+        try:
+            return list(map(itemgetter(*columns), rows))
+        except KeyError:
+            pass
+    defaults = [""] * len(columns)
+    return [list(map(row.get, columns, defaults)) for row in rows]
+
 
 class CSVExporter:
     COLUMN_MAPPING = {
@@ -92,6 +114,26 @@ class CSVExporter:
         columns = columns or cls.DEFAULT_COLUMNS_DYNAMICS
         return cls._write_csv(dynamics, filepath, columns, cls.COLUMN_MAPPING_DYNAMICS, index)
 
+    @staticmethod
+    def _infer_columns(rows: List[Dict], columns: Optional[List[str]]) -> List[str]:
+        """
+        Resolve the output columns in at most one pass over the rows.
+
+        Without explicit columns, every key seen in any row is kept in first-seen
+        order, except internal keys starting with "_" (e.g. the raw API
+        object kept by crawlers started with keep_raw=True). With explicit columns, only those present in at least one row are
+        kept; the scan stops as soon as all of them have been found, which for
+        uniform rows is the first row.
+        """
+        if columns is None:
+            return [key for key in dict.fromkeys(chain.from_iterable(rows)) if not key.startswith("_")]
+        missing = set(columns)
+        for row in rows:
+            missing = {col for col in missing if col not in row}
+            if not missing:
+                break
+        return [col for col in columns if col not in missing]
+
     @staticmethod
     def _write_csv(
         rows: List[Dict],
@@ -104,25 +146,18 @@ class CSVExporter:
             if not rows:
                 logger.warning("没有数据可导出")
                 return False
-            if columns is None:
-                available = []
-                for row in rows:
-                    for col in row.keys():
-                        if col not in available:
-                            available.append(col)
-            else:
-                available = [col for col in columns if any(col in row for row in rows)]
+            available = CSVExporter._infer_columns(rows, columns)
             if not available:
                 available = list(rows[0].keys())
             headers = (["index"] if index else []) + [mapping.get(col, col) for col in available]
-            with open(filepath, "w", newline="", encoding=CSV_ENCODING) as fh:
+            with open(filepath, "w", newline="", encoding=CSV_ENCODING, buffering=WRITE_BUFFER_SIZE) as fh:
                 writer = csv.writer(fh)
                 writer.writerow(headers)
-                for idx, row in enumerate(rows):
-                    values = [row.get(col, "") for col in available]
+                for start in range(0, len(rows), WRITE_BATCH_ROWS):
+                    values = _extract_values(rows[start:start + WRITE_BATCH_ROWS], available)
                     if index:
-                        values = [idx] + values
-                    writer.writerow(values)
+                        values = [(idx, *record) for idx, record in enumerate(values, start)]
+                    writer.writerows(values)
             logger.info("成功导出 %s 条数据到: %s", len(rows), filepath)
             return True
         except Exception as exc:
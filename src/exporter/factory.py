@@ -0,0 +1,49 @@
+"""
+Opening streaming exporters by format name.
+
+Shared by the desktop sidecar (stream_path) and the batch CLI, so both write
+the same formats with the same options. Exporter modules are imported only
+for the format requested, which keeps pyarrow and friends off the startup
+path.
+"""
+from typing import TYPE_CHECKING, Any, Union
+
+if TYPE_CHECKING:
+    from src.exporter.jsonl_exporter import JSONLExporter
+    from src.exporter.parquet_exporter import ParquetExporter
+    from src.exporter.partitioned import PartitionedExporter
+    from src.exporter.sqlite_store import SQLiteStore
+    from src.exporter.stream_exporter import StreamingCSVExporter
+
+    StreamExporter = Union[StreamingCSVExporter, ParquetExporter, SQLiteStore, JSONLExporter, PartitionedExporter]
+
+
+def open_stream_exporter(mode: str, path: str, fmt: str, **options: Any) -> "StreamExporter":
+    """
+    Open a single-file exporter that is written while the crawl runs.
+
+    Args:
+        mode: comments / dynamics
+        path: output path
+        fmt: csv / sqlite / jsonl / parquet / arrow
+        **options: payload / compression for jsonl
+    """
+    if fmt == "csv":
+        from src.exporter.stream_exporter import StreamingCSVExporter as exporter_cls
+
+        kwargs = {}
+    elif fmt == "sqlite":
+        from src.exporter.sqlite_store import SQLiteStore as exporter_cls
+
+        kwargs = {}
+    elif fmt == "jsonl":
+        from src.exporter.jsonl_exporter import JSONLExporter as exporter_cls
+
+        kwargs = options
+    else:
+        from src.exporter.parquet_exporter import ParquetExporter as exporter_cls
+
+        kwargs = {"fmt": fmt}
+    if mode == "comments":
+        return exporter_cls.for_comments(path, **kwargs)
+    return exporter_cls.for_dynamics(path, **kwargs)
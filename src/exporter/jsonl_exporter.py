@@ -0,0 +1,227 @@
+"""
+JSON Lines export, optionally gzip / zstd compressed.
+
+One JSON object per line, written as a stream. Unlike the tabular exporters
+nothing is dropped: the processed record keeps every field, and crawlers
+started with keep_raw=True also carry the untouched API object under RAW_KEY,
+which can be written instead of (or next to) the record.
+
+Encoding, compression and file I/O run on a background writer thread, so
+write_batch() only hands the batch over and never stalls the crawl. The
+hand-off queue is bounded, which keeps memory flat if the disk falls behind.
+
+orjson and zstandard are optional; without them the stdlib json encoder is
+used and only gzip / uncompressed output is available.
+"""
+import gzip
+import json
+import logging
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional
+    zstandard = None
+
+from config.config import RAW_KEY
+
+logger = logging.getLogger(__name__)
+
+PAYLOADS = ("record", "raw", "both")
+COMPRESSIONS = (None, "gzip", "zstd")
+
+_EXTENSION_COMPRESSION = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+# Batches waiting for the writer thread before write_batch() blocks.
+_QUEUE_BATCHES = 64
+
+_STOP = object()
+
+
+def compression_from_path(path: str) -> Optional[str]:
+    """Compression implied by the file extension (None for plain .jsonl)."""
+    for ext, compression in _EXTENSION_COMPRESSION.items():
+        if path.lower().endswith(ext):
+            return compression
+    return None
+
+
+def check_raw_payload(rows: List[Dict], payload: str):
+    """
+    Refuse raw / both payloads for rows crawled without keep_raw.
+
+    Raises:
+        ValueError: the rows carry no RAW_KEY (raw would write an empty file,
+                    both would write "raw": null on every line)
+    """
+    if payload in ("raw", "both") and rows and RAW_KEY not in rows[0]:
+        raise ValueError("该次爬取没有保留原始数据，请开启 keep_raw 后重新爬取")
+
+
+if orjson is not None:
+    def _encode_line(obj) -> bytes:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+else:
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def _encode_line(obj) -> bytes:
+        return (_json_encoder.encode(obj) + "\n").encode("utf-8")
+
+
+def _record(row: Dict) -> Dict:
+    """The processed row without internal ("_"-prefixed) fields."""
+    return {key: value for key, value in row.items() if not key.startswith("_")}
+
+
+class JSONLExporter:
+    """
+    Streaming JSON Lines writer.
+
+    Usage:
+        with JSONLExporter("comments.jsonl.gz", payload="both") as exporter:
+            pipeline.add_listener(exporter.write_batch)
+            crawler.crawl_comments(...)
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        payload: str = "record",
+        compression: Optional[str] = "auto",
+        level: Optional[int] = None,
+    ):
+        """
+        Args:
+            filepath: output path, truncated on open
+            payload: "record" (processed row), "raw" (API object, rows without
+                     one are skipped) or "both" ({"record": ..., "raw": ...})
+            compression: None, "gzip", "zstd" or "auto" (from the extension)
+            level: compression level (gzip default 6, zstd default 3)
+        """
+        if payload not in PAYLOADS:
+            raise ValueError(f"不支持的输出内容: {payload}")
+        if compression == "auto":
+            compression = compression_from_path(filepath)
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩格式: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("zstd 压缩需要安装 zstandard")
+        self.filepath = filepath
+        self.payload = payload
+        self.compression = compression
+        self.rows_written = 0
+        self._error: Optional[BaseException] = None
+
+        self._raw_fh = open(filepath, "wb")
+        if compression == "gzip":
+            self._fh = gzip.GzipFile(fileobj=self._raw_fh, mode="wb", compresslevel=level or 6)
+        elif compression == "zstd":
+            self._fh = zstandard.ZstdCompressor(level=level or 3).stream_writer(self._raw_fh)
+        else:
+            self._fh = self._raw_fh
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=_QUEUE_BATCHES)
+        self._thread = threading.Thread(target=self._run, name="jsonl-writer", daemon=True)
+        self._thread.start()
+        self._closed = False
+
+    # Comments and dynamics share the same layout
+    @classmethod
+    def for_comments(cls, filepath: str, **kwargs) -> "JSONLExporter":
+        return cls(filepath, **kwargs)
+
+    @classmethod
+    def for_dynamics(cls, filepath: str, **kwargs) -> "JSONLExporter":
+        return cls(filepath, **kwargs)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # ============================================================
+    #  Producer side (crawl thread)
+    # ============================================================
+    def write_batch(self, rows: Iterable[Dict]):
+        """Hand a batch to the writer thread."""
+        if self._error is not None:
+            raise RuntimeError(f"JSONL 写入失败: {self._error}")
+        if self._closed:
+            raise RuntimeError("JSONL 导出已关闭")
+        rows = rows if isinstance(rows, list) else list(rows)
+        if rows:
+            self._queue.put(rows)
+
+    def close(self):
+        """Drain the queue, finish the compressed stream and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        try:
+            if self._fh is not self._raw_fh:
+                self._fh.close()
+        finally:
+            if not self._raw_fh.closed:
+                self._raw_fh.close()
+        if self._error is not None:
+            raise RuntimeError(f"JSONL 写入失败: {self._error}")
+        logger.info("成功导出 %s 条数据到: %s", self.rows_written, self.filepath)
+
+    def __enter__(self) -> "JSONLExporter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ============================================================
+    #  Writer thread
+    # ============================================================
+    def _lines(self, rows: List[Dict]) -> List[bytes]:
+        if self.payload == "record":
+            return [_encode_line(_record(row)) for row in rows]
+        if self.payload == "raw":
+            return [_encode_line(row[RAW_KEY]) for row in rows if RAW_KEY in row]
+        return [_encode_line({"record": _record(row), "raw": row.get(RAW_KEY)}) for row in rows]
+
+    def _run(self):
+        while True:
+            rows = self._queue.get()
+            if rows is _STOP:
+                break
+            if self._error is not None:
+                continue  # keep draining so producers never block on a dead writer
+            try:
+                lines = self._lines(rows)
+                self._fh.write(b"".join(lines))
+                self.rows_written += len(lines)
+            except Exception as exc:
+                logger.error("JSONL 写入失败: %s", exc)
+                self._error = exc
+
+    # ============================================================
+    #  One-shot export (same contract as CSVExporter)
+    # ============================================================
+    @classmethod
+    def export(cls, rows: List[Dict], filepath: str, **kwargs) -> bool:
+        if not rows:
+            logger.warning("没有数据可导出")
+            return False
+        check_raw_payload(rows, kwargs.get("payload") or "record")
+        try:
+            with cls(filepath, **kwargs) as exporter:
+                for start in range(0, len(rows), 10000):
+                    exporter.write_batch(rows[start:start + 10000])
+            return True
+        except Exception as exc:
+            logger.error("导出 JSONL 时出错: %s", exc)
+            return False
+
+    export_dynamics = export
@@ -0,0 +1,383 @@
+"""
+Partitioned, multi-file output for large crawls.
+
+Rows are split by target, by day of ctime / timestamp, or into fixed-size
+chunks, and each partition is written to its own Hive-style directory
+(day=2024-01-01/part-00000.csv, ...) so tools can load only the slices they
+need, in parallel. A _manifest.json at the top lists every partition, its
+files and row counts.
+
+Rows are buffered per partition and handed over in blocks of flush_rows, so
+a crawl whose pages mix many days still produces large writes. Partition
+writers run on a small pool of worker threads; each partition is pinned to
+one worker, so its rows stay in order while different partitions are written
+concurrently. To stay under the open-file limit, only the most recently
+written partitions keep a file open; a partition that is evicted and later
+receives more rows continues in a new part file.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from src.exporter.jsonl_exporter import JSONLExporter
+from src.exporter.parquet_exporter import ParquetExporter
+from src.exporter.stream_exporter import StreamingCSVExporter
+
+logger = logging.getLogger(__name__)
+
+PARTITION_BY = ("target", "day", "chunk")
+FORMATS = ("csv", "parquet", "arrow", "jsonl")
+
+# Leading underscore: dataset readers (pyarrow, Spark, DuckDB hive scans) skip the file.
+MANIFEST_NAME = "_manifest.json"
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Partition key fields per kind (dynamics have no target oid; their author is the target).
+_TARGET_FIELDS = {"comments": "video_oid", "dynamics": "username"}
+_TIME_FIELDS = {"comments": "ctime", "dynamics": "timestamp"}
+
+_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow", "jsonl": ".jsonl"}
+_UNSAFE_NAME = re.compile(r"[^\w.-]+")
+
+# Write tasks queued per worker before write_batch() waits for the oldest one.
+_PENDING_PER_WORKER = 8
+
+# Buffered rows across all partitions before the largest buffers are written out early.
+_MAX_BUFFERED_ROWS = 200_000
+
+
+class _Partition:
+    __slots__ = ("key", "dirname", "worker", "exporter", "files", "rows", "buffer")
+
+    def __init__(self, key: str, dirname: str, worker: int):
+        self.key = key
+        self.dirname = dirname
+        self.worker = worker
+        self.exporter = None
+        self.files: List[Dict] = []
+        self.rows = 0
+        # Rows not yet handed to the worker (only touched by the producer thread)
+        self.buffer: List[Dict] = []
+
+
+class PartitionedExporter:
+    """
+    Streaming exporter that fans rows out to one file set per partition.
+
+    Usage:
+        exporter = PartitionedExporter("out/", kind="comments", fmt="parquet", by="day")
+        pipeline.add_listener(exporter.write_batch)
+        ...
+        exporter.close()        # flushes every partition and writes the manifest
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        kind: str = "comments",
+        fmt: str = "csv",
+        by: str = "day",
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        flush_rows: int = 10000,
+        max_workers: int = 4,
+        max_open: int = 64,
+        **exporter_options,
+    ):
+        """
+        Args:
+            directory: output directory (created if missing)
+            kind: "comments" or "dynamics"
+            fmt: csv, parquet, arrow or jsonl
+            by: target, day or chunk
+            chunk_rows: rows per partition when by="chunk"
+            flush_rows: rows buffered per partition before they are handed to its writer
+            max_workers: partition writer threads
+            max_open: partitions allowed to keep a file open at the same time
+            exporter_options: passed on to every per-partition exporter
+                              (e.g. payload / compression for jsonl)
+        """
+        if kind not in _TARGET_FIELDS:
+            raise ValueError(f"未知导出类型: {kind}")
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的分区导出格式: {fmt}")
+        if by not in PARTITION_BY:
+            raise ValueError(f"不支持的分区方式: {by}")
+        if fmt in ("parquet", "arrow"):
+            if not ParquetExporter.available():
+                raise RuntimeError("导出 Parquet / Arrow 需要安装 pyarrow")
+            exporter_options.setdefault("fmt", fmt)
+
+        self.filepath = directory
+        self.kind = kind
+        self.fmt = fmt
+        self.by = by
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.max_open = max(int(max_open), 1)
+        self.flush_rows = max(int(flush_rows), 1)
+        self._buffered = 0
+        self.rows_written = 0
+        self._extension = _EXTENSIONS[fmt]
+        if fmt == "jsonl":
+            compression = exporter_options.get("compression")
+            if compression in ("gzip", "zstd"):
+                self._extension += ".gz" if compression == "gzip" else ".zst"
+        self._factory = self._exporter_factory(fmt, kind, exporter_options)
+        self._key = self._key_function()
+        self._partitions: Dict[str, _Partition] = {}
+        # Directory names in use, lower-cased (case-insensitive file systems)
+        self._dirnames: set = set()
+        self._open: "OrderedDict[str, _Partition]" = OrderedDict()
+        self._workers = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"partition-{i}")
+            for i in range(max(int(max_workers), 1))
+        ]
+        self._pending: Deque = deque()
+        self._started = int(time.time())
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _exporter_factory(fmt: str, kind: str, options: Dict) -> Callable[[str], object]:
+        exporter_cls = {
+            "csv": StreamingCSVExporter,
+            "parquet": ParquetExporter,
+            "arrow": ParquetExporter,
+            "jsonl": JSONLExporter,
+        }[fmt]
+        opener = exporter_cls.for_comments if kind == "comments" else exporter_cls.for_dynamics
+        return lambda path: opener(path, **options)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # ============================================================
+    #  Partition keys
+    # ============================================================
+    def _key_function(self) -> Callable[[Dict], str]:
+        if self.by == "target":
+            field = _TARGET_FIELDS[self.kind]
+            return lambda row: str(row.get(field) or "unknown")
+        if self.by == "day":
+            field = _TIME_FIELDS[self.kind]
+            days: Dict[int, str] = {}
+
+            def day_of(row: Dict) -> str:
+                ts = row.get(field) or 0
+                if not ts:
+                    return "unknown"
+                # Local days start on an hour boundary, so one lookup per hour is enough.
+                hour = ts // 3600
+                day = days.get(hour)
+                if day is None:
+                    day = days[hour] = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+                return day
+            return day_of
+
+        counter = [0]
+        chunk_rows = self.chunk_rows
+
+        def chunk_of(row: Dict) -> str:
+            index = counter[0] // chunk_rows
+            counter[0] += 1
+            return f"{index:05d}"
+        return chunk_of
+
+    def _partition(self, key: str) -> _Partition:
+        partition = self._partitions.get(key)
+        if partition is None:
+            dirname = self._dirname(key)
+            worker = len(self._partitions) % len(self._workers)
+            partition = self._partitions[key] = _Partition(key, dirname, worker)
+        return partition
+
+    def _dirname(self, key: str) -> str:
+        """
+        Directory name for a new partition, unique within this export.
+
+        Keys that sanitizing changed (usernames like "★阿" and "☆阿" both become "_阿") get a
+        short hash of the raw key appended, so distinct keys never share a directory.
+        """
+        safe = _UNSAFE_NAME.sub("_", key)
+        if safe != key:
+            safe = f"{safe}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}"
+        dirname = f"{self.by}={safe}"
+        suffix = 1
+        while dirname.lower() in self._dirnames:
+            suffix += 1
+            dirname = f"{self.by}={safe}-{suffix}"
+        self._dirnames.add(dirname.lower())
+        return dirname
+
+    # ============================================================
+    #  Writing
+    # ============================================================
+    def write_batch(self, rows):
+        """Add a batch to the per-partition buffers; full buffers go to their workers."""
+        if self._closed:
+            raise RuntimeError("分区导出已关闭")
+        key_of = self._key
+        touched = {}
+        for row in rows:
+            key = key_of(row)
+            partition = touched.get(key)
+            if partition is None:
+                partition = touched[key] = self._partition(key)
+            partition.buffer.append(row)
+            self._buffered += 1
+
+        flush_rows = self.flush_rows
+        for partition in touched.values():
+            if len(partition.buffer) >= flush_rows:
+                self._dispatch(partition)
+
+        if self.by == "chunk" and touched:
+            # Earlier chunks never receive rows again
+            current = max(touched)
+            for key in [key for key in self._partitions if key < current]:
+                partition = self._partitions[key]
+                if partition.buffer:
+                    self._dispatch(partition)
+                if self._open.pop(key, None) is not None:
+                    self._submit(partition, self._close_partition, partition)
+
+        if self._buffered > _MAX_BUFFERED_ROWS:
+            for partition in sorted(self._partitions.values(), key=lambda p: len(p.buffer), reverse=True):
+                if self._buffered <= _MAX_BUFFERED_ROWS // 2 or not partition.buffer:
+                    break
+                self._dispatch(partition)
+        self._throttle()
+
+    def _dispatch(self, partition: _Partition):
+        """Hand a partition's buffered rows to its worker."""
+        rows, partition.buffer = partition.buffer, []
+        self._buffered -= len(rows)
+        self.rows_written += len(rows)
+        self._touch(partition)
+        self._submit(partition, self._write_partition, partition, rows)
+
+    def _touch(self, partition: _Partition):
+        if partition.key in self._open:
+            self._open.move_to_end(partition.key)
+            return
+        self._open[partition.key] = partition
+        while len(self._open) > self.max_open:
+            _, evicted = self._open.popitem(last=False)
+            self._submit(evicted, self._close_partition, evicted)
+
+    def _submit(self, partition: _Partition, fn, *args):
+        self._pending.append(self._workers[partition.worker].submit(fn, *args))
+
+    def _throttle(self):
+        """Bound the queued work; also surfaces errors from the writer threads."""
+        limit = _PENDING_PER_WORKER * len(self._workers)
+        while self._pending and (len(self._pending) > limit or self._pending[0].done()):
+            self._pending.popleft().result()
+
+    # The two methods below only ever run on the partition's own worker thread.
+    def _write_partition(self, partition: _Partition, rows: List[Dict]):
+        if partition.exporter is None:
+            relative = os.path.join(partition.dirname, f"part-{len(partition.files):05d}{self._extension}")
+            path = os.path.join(self.filepath, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partition.exporter = self._factory(path)
+            partition.files.append({"path": relative.replace(os.sep, "/"), "rows": 0})
+        partition.exporter.write_batch(rows)
+        partition.files[-1]["rows"] += len(rows)
+        partition.rows += len(rows)
+
+    @staticmethod
+    def _close_partition(partition: _Partition):
+        if partition.exporter is not None:
+            exporter, partition.exporter = partition.exporter, None
+            exporter.close()
+
+    def close(self):
+        """Close every partition file, stop the workers and write the manifest."""
+        if self._closed:
+            return
+        self._closed = True
+        for partition in self._partitions.values():
+            if partition.buffer:
+                self._dispatch(partition)
+        for partition in self._open.values():
+            self._submit(partition, self._close_partition, partition)
+        self._open.clear()
+        errors = []
+        while self._pending:
+            try:
+                self._pending.popleft().result()
+            except Exception as exc:
+                errors.append(exc)
+        for worker in self._workers:
+            worker.shutdown(wait=True)
+        self.write_manifest()
+        if errors:
+            raise RuntimeError(f"分区写入失败: {errors[0]}")
+        logger.info("成功导出 %s 条数据到 %s 个分区: %s", self.rows_written, len(self._partitions), self.filepath)
+
+    def __enter__(self) -> "PartitionedExporter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ============================================================
+    #  Manifest
+    # ============================================================
+    def manifest(self) -> Dict:
+        partitions = sorted(self._partitions.values(), key=lambda p: p.key)
+        return {
+            "kind": self.kind,
+            "format": self.fmt,
+            "partition_by": self.by,
+            "created_at": self._started,
+            "finished_at": int(time.time()) if self._closed else None,
+            "rows": sum(p.rows for p in partitions),
+            "partitions": [
+                {"key": p.key, "path": p.dirname, "rows": p.rows, "files": list(p.files)}
+                for p in partitions
+            ],
+        }
+
+    def write_manifest(self) -> str:
+        """Write the manifest atomically (readers never see a half-written file)."""
+        path = os.path.join(self.filepath, MANIFEST_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.manifest(), fh, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    # ============================================================
+    #  One-shot export
+    # ============================================================
+    @classmethod
+    def export(cls, rows: List[Dict], directory: str, kind: str = "comments", **kwargs) -> bool:
+        if not rows:
+            logger.warning("没有数据可导出")
+            return False
+        try:
+            with cls(directory, kind=kind, **kwargs) as exporter:
+                for start in range(0, len(rows), 10000):
+                    exporter.write_batch(rows[start:start + 10000])
+            return True
+        except Exception as exc:
+            logger.error("分区导出时出错: %s", exc)
+            return False
+
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    """Load a partitioned output's manifest (None when missing)."""
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
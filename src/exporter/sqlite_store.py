@@ -0,0 +1,379 @@
+"""
+SQLite storage backend for comments and dynamics.
+
+Rows are keyed on comment_id / dynamic_id and written with bulk upserts, so
+re-crawling a target updates like/reply counts in place instead of producing
+another overlapping file. The database runs in WAL mode and keeps indexes on
+the columns the UI and analytics filter by (target oid, ctime, user_id,
+root_id), so reads are indexed queries rather than file scans. Query-only
+callers open the file read-only, which leaves foreign databases untouched.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comments (
+    comment_id  INTEGER PRIMARY KEY,
+    root_id     INTEGER NOT NULL DEFAULT 0,
+    parent_id   INTEGER NOT NULL DEFAULT 0,
+    is_reply    INTEGER NOT NULL DEFAULT 0,
+    video_oid   INTEGER NOT NULL DEFAULT 0,
+    user_id     INTEGER NOT NULL DEFAULT 0,
+    username    TEXT NOT NULL DEFAULT '',
+    user_level  INTEGER NOT NULL DEFAULT 0,
+    content     TEXT NOT NULL DEFAULT '',
+    like_count  INTEGER NOT NULL DEFAULT 0,
+    reply_count INTEGER NOT NULL DEFAULT 0,
+    ctime       INTEGER NOT NULL DEFAULT 0,
+    ctime_text  TEXT NOT NULL DEFAULT '',
+    ip_location TEXT NOT NULL DEFAULT '',
+    first_seen  INTEGER NOT NULL,
+    updated_at  INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_comments_oid_ctime ON comments (video_oid, ctime);
+CREATE INDEX IF NOT EXISTS idx_comments_ctime ON comments (ctime);
+CREATE INDEX IF NOT EXISTS idx_comments_user ON comments (user_id);
+CREATE INDEX IF NOT EXISTS idx_comments_root ON comments (root_id);
+
+CREATE TABLE IF NOT EXISTS dynamics (
+    dynamic_id    TEXT PRIMARY KEY,
+    type          TEXT NOT NULL DEFAULT '',
+    content       TEXT NOT NULL DEFAULT '',
+    username      TEXT NOT NULL DEFAULT '',
+    timestamp     INTEGER NOT NULL DEFAULT 0,
+    publish_time  TEXT NOT NULL DEFAULT '',
+    like_count    INTEGER NOT NULL DEFAULT 0,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    forward_count INTEGER NOT NULL DEFAULT 0,
+    first_seen    INTEGER NOT NULL,
+    updated_at    INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_dynamics_timestamp ON dynamics (timestamp);
+CREATE INDEX IF NOT EXISTS idx_dynamics_username ON dynamics (username);
+"""
+
+COMMENT_FIELDS = (
+    "comment_id", "root_id", "parent_id", "is_reply", "video_oid", "user_id", "username",
+    "user_level", "content", "like_count", "reply_count", "ctime", "ctime_text", "ip_location",
+)
+DYNAMIC_FIELDS = (
+    "dynamic_id", "type", "content", "username", "timestamp", "publish_time",
+    "like_count", "comment_count", "forward_count",
+)
+
+# Fields refreshed when a row is crawled again (ids, parentage and times never change).
+_COMMENT_UPDATES = ("username", "user_level", "content", "like_count", "reply_count", "ip_location")
+_DYNAMIC_UPDATES = ("content", "username", "like_count", "comment_count", "forward_count")
+
+
+def _upsert_sql(table: str, fields, key: str, updates) -> str:
+    columns = ", ".join(fields)
+    placeholders = ", ".join("?" for _ in fields)
+    assignments = ", ".join(f"{col} = excluded.{col}" for col in updates)
+    return (
+        f"INSERT INTO {table} ({columns}, first_seen, updated_at) VALUES ({placeholders}, ?, ?) "
+        f"ON CONFLICT ({key}) DO UPDATE SET {assignments}, updated_at = excluded.updated_at"
+    )
+
+
+_UPSERT_COMMENTS = _upsert_sql("comments", COMMENT_FIELDS, "comment_id", _COMMENT_UPDATES)
+_UPSERT_DYNAMICS = _upsert_sql("dynamics", DYNAMIC_FIELDS, "dynamic_id", _DYNAMIC_UPDATES)
+
+COMMENT_SORT_KEYS = ("ctime", "like_count", "reply_count")
+DYNAMIC_SORT_KEYS = ("timestamp", "like_count", "comment_count", "forward_count")
+MAX_QUERY_LIMIT = 1000
+
+
+def _comment_record(row: Dict, now: int) -> tuple:
+    return (
+        row["comment_id"],
+        row.get("root_id") or 0,
+        row.get("parent_id") or 0,
+        int(bool(row.get("is_reply"))),
+        row.get("video_oid") or 0,
+        row.get("user_id") or 0,
+        row.get("username") or "",
+        row.get("user_level") or 0,
+        row.get("content") or "",
+        row.get("like_count") or 0,
+        row.get("reply_count") or 0,
+        row.get("ctime") or 0,
+        row.get("ctime_text") or "",
+        row.get("ip_location") or "",
+        now,
+        now,
+    )
+
+
+def _dynamic_record(row: Dict, now: int) -> tuple:
+    return (
+        str(row["dynamic_id"]),
+        row.get("type") or "",
+        row.get("content") or "",
+        row.get("username") or "",
+        int(row.get("timestamp") or 0),
+        row.get("publish_time") or "",
+        int(row.get("like_count") or 0),
+        int(row.get("comment_count") or 0),
+        int(row.get("forward_count") or 0),
+        now,
+        now,
+    )
+
+
+def _upsert_records(kind: str, rows: Iterable[Dict]) -> Tuple[str, List[tuple]]:
+    """Upsert statement and parameter tuples for one table; rows without an id are skipped."""
+    now = int(time.time())
+    if kind == "comments":
+        return _UPSERT_COMMENTS, [_comment_record(row, now) for row in rows if row.get("comment_id")]
+    return _UPSERT_DYNAMICS, [_dynamic_record(row, now) for row in rows if row.get("dynamic_id")]
+
+
+class SQLiteStore:
+    """
+    Upserting SQLite store.
+
+    Usage:
+        store = SQLiteStore.for_comments("bilibili.db")
+        pipeline.add_listener(store.write_batch)
+        ...
+        store.close()
+        SQLiteStore.open_readonly("bilibili.db").query_comments(oid=170001, order_by="like_count")
+    """
+
+    def __init__(self, filepath: str, kind: str = "comments", flush_rows: int = 2000, readonly: bool = False):
+        """
+        Args:
+            filepath: database path (created if missing, unless readonly)
+            kind: table that write_batch() targets, "comments" or "dynamics"
+            flush_rows: rows buffered by write_batch() before one upsert transaction
+            readonly: open an existing file with mode=ro; no pragmas, no schema
+                      changes, so querying an arbitrary .db leaves it as it was
+        """
+        if kind not in ("comments", "dynamics"):
+            raise ValueError(f"未知存储类型: {kind}")
+        self.filepath = filepath
+        self.kind = kind
+        self.flush_rows = flush_rows
+        self.rows_written = 0
+        self._pending: List[Dict] = []
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        if readonly:
+            uri = f"{Path(filepath).resolve().as_uri()}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(filepath, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if not readonly:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_comments(cls, filepath: str, **kwargs) -> "SQLiteStore":
+        return cls(filepath, kind="comments", **kwargs)
+
+    @classmethod
+    def for_dynamics(cls, filepath: str, **kwargs) -> "SQLiteStore":
+        return cls(filepath, kind="dynamics", **kwargs)
+
+    @classmethod
+    def open_readonly(cls, filepath: str, kind: str = "comments") -> "SQLiteStore":
+        """Query-only connection to an existing database."""
+        return cls(filepath, kind=kind, readonly=True)
+
+    @property
+    def closed(self) -> bool:
+        return self._conn is None
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_locked()
+            self._conn.close()
+            self._conn = None
+        if not self.readonly:
+            logger.info("成功写入 %s 条数据到: %s", self.rows_written, self.filepath)
+
+    def __enter__(self) -> "SQLiteStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ============================================================
+    #  Writing
+    # ============================================================
+    def upsert_comments(self, rows: Iterable[Dict]) -> int:
+        """Insert or refresh comments in one transaction; returns rows written."""
+        return self._execute_upsert(*_upsert_records("comments", rows))
+
+    def upsert_dynamics(self, rows: Iterable[Dict]) -> int:
+        """Insert or refresh dynamics in one transaction; returns rows written."""
+        return self._execute_upsert(*_upsert_records("dynamics", rows))
+
+    def _execute_upsert(self, sql: str, records: List[tuple]) -> int:
+        if not records:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(sql, records)
+            self.rows_written += len(records)
+        return len(records)
+
+    def write_batch(self, rows: Iterable[Dict]):
+        """
+        Buffer a batch for the table chosen by kind.
+
+        Crawler pages are small, so batches are merged and upserted every
+        flush_rows rows instead of committing a transaction per page.
+        """
+        with self._lock:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.flush_rows:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        rows, self._pending = self._pending, []
+        if not rows or self._conn is None:
+            return
+        sql, records = _upsert_records(self.kind, rows)
+        with self._conn:
+            self._conn.executemany(sql, records)
+        self.rows_written += len(records)
+
+    # ============================================================
+    #  Queries
+    # ============================================================
+    def _query(self, sql: str, args: list) -> List[Dict]:
+        with self._lock:
+            self._flush_locked()
+            return [dict(row) for row in self._conn.execute(sql, args)]
+
+    def query_comments(
+        self,
+        oid: Optional[int] = None,
+        user_id: Optional[int] = None,
+        root_id: Optional[int] = None,
+        start_time: int = 0,
+        end_time: int = 0,
+        order_by: str = "ctime",
+        descending: bool = True,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict]:
+        """
+        Filtered, sorted page of stored comments.
+
+        Args:
+            oid: target oid (video / article / dynamic)
+            user_id: author
+            root_id: thread root (the root comment itself included)
+            start_time / end_time: ctime range in Unix seconds, 0 = unbounded
+            order_by: ctime, like_count or reply_count
+        """
+        if order_by not in COMMENT_SORT_KEYS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        where, args = [], []
+        if oid is not None:
+            where.append("video_oid = ?")
+            args.append(int(oid))
+        if user_id is not None:
+            where.append("user_id = ?")
+            args.append(int(user_id))
+        if root_id is not None:
+            where.append("(root_id = ? OR comment_id = ?)")
+            args.extend((int(root_id), int(root_id)))
+        if start_time:
+            where.append("ctime >= ?")
+            args.append(int(start_time))
+        if end_time:
+            where.append("ctime <= ?")
+            args.append(int(end_time))
+        sql = "SELECT * FROM comments"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}, comment_id LIMIT ? OFFSET ?"
+        args.extend((min(int(limit), MAX_QUERY_LIMIT), max(int(offset), 0)))
+        return self._query(sql, args)
+
+    def query_dynamics(
+        self,
+        username: Optional[str] = None,
+        start_time: int = 0,
+        end_time: int = 0,
+        order_by: str = "timestamp",
+        descending: bool = True,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict]:
+        """Filtered, sorted page of stored dynamics (same conventions as query_comments)."""
+        if order_by not in DYNAMIC_SORT_KEYS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        where, args = [], []
+        if username:
+            where.append("username = ?")
+            args.append(username)
+        if start_time:
+            where.append("timestamp >= ?")
+            args.append(int(start_time))
+        if end_time:
+            where.append("timestamp <= ?")
+            args.append(int(end_time))
+        sql = "SELECT * FROM dynamics"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}, dynamic_id LIMIT ? OFFSET ?"
+        args.extend((min(int(limit), MAX_QUERY_LIMIT), max(int(offset), 0)))
+        return self._query(sql, args)
+
+    def stats(self) -> Dict:
+        """Row counts per table and number of distinct targets."""
+        with self._lock:
+            self._flush_locked()
+            conn = self._conn
+            return {
+                "comments": conn.execute("SELECT COUNT(*) FROM comments").fetchone()[0],
+                "targets": conn.execute("SELECT COUNT(DISTINCT video_oid) FROM comments").fetchone()[0],
+                "dynamics": conn.execute("SELECT COUNT(*) FROM dynamics").fetchone()[0],
+            }
+
+    # ============================================================
+    #  One-shot export (same contract as CSVExporter)
+    # ============================================================
+    @classmethod
+    def export(cls, comments: List[Dict], filepath: str) -> bool:
+        if not comments:
+            logger.warning("没有评论数据可导出")
+            return False
+        return cls._export_all(filepath, "comments", comments)
+
+    @classmethod
+    def export_dynamics(cls, dynamics: List[Dict], filepath: str) -> bool:
+        if not dynamics:
+            logger.warning("没有动态数据可导出")
+            return False
+        return cls._export_all(filepath, "dynamics", dynamics)
+
+    @classmethod
+    def _export_all(cls, filepath: str, kind: str, rows: List[Dict]) -> bool:
+        try:
+            with cls(filepath, kind=kind) as store:
+                store.write_batch(rows)
+            return True
+        except Exception as exc:
+            logger.error("写入 SQLite 时出错: %s", exc)
+            return False
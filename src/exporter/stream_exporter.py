@@ -0,0 +1,142 @@
+"""
+Streaming CSV export: rows are appended while the crawl is still running.
+
+The file is opened when the crawl starts and every flush writes whole rows,
+so after a stop or a crash it stays a valid CSV holding everything fetched
+so far. Only the current buffer is kept in memory; a background thread
+flushes it every flush_interval seconds even while the crawl is stalled
+(e.g. backing off after risk control), so rows never sit unwritten for long.
+"""
+import csv
+import io
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from config.config import CSV_ENCODING
+from src.exporter.csv_exporter import CSVExporter, _extract_values
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingCSVExporter:
+    """
+    Incremental CSV writer.
+
+    Usage:
+        with StreamingCSVExporter.for_comments(path) as exporter:
+            pipeline.add_listener(exporter.write_batch)
+            crawler.crawl_comments(...)
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        columns: Optional[List[str]] = None,
+        mapping: Optional[Dict[str, str]] = None,
+        buffer_rows: int = 1000,
+        flush_interval: float = 2.0,
+    ):
+        """
+        Args:
+            filepath: output path, truncated on open
+            columns: column order; inferred from the first batch when None
+                     (keys starting with "_" are skipped)
+            mapping: column -> header text
+            buffer_rows: flush once this many rows are buffered
+            flush_interval: flush buffered rows at least this often (seconds),
+                            also when no new batches arrive; 0 disables the timer
+        """
+        self.filepath = filepath
+        self.columns = list(columns) if columns else None
+        self.mapping = mapping or {}
+        self.buffer_rows = buffer_rows
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._buffer: List[List] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._fh = open(filepath, "w", newline="", encoding=CSV_ENCODING)
+        if self.columns:
+            self._write_header()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name="csv-flusher")
+            self._flusher.start()
+
+    @classmethod
+    def for_comments(cls, filepath: str, **kwargs) -> "StreamingCSVExporter":
+        kwargs.setdefault("columns", CSVExporter.DEFAULT_COLUMNS)
+        return cls(filepath, mapping=CSVExporter.COLUMN_MAPPING, **kwargs)
+
+    @classmethod
+    def for_dynamics(cls, filepath: str, **kwargs) -> "StreamingCSVExporter":
+        kwargs.setdefault("columns", CSVExporter.DEFAULT_COLUMNS_DYNAMICS)
+        return cls(filepath, mapping=CSVExporter.COLUMN_MAPPING_DYNAMICS, **kwargs)
+
+    def _write_header(self):
+        csv.writer(self._fh).writerow([self.mapping.get(col, col) for col in self.columns])
+        self._fh.flush()
+
+    @property
+    def closed(self) -> bool:
+        return self._fh.closed
+
+    def write_batch(self, rows: Iterable[Dict]):
+        """Buffer a batch of rows; flushes by size or by time."""
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return
+        with self._lock:
+            if self.columns is None:
+                seen = dict.fromkeys(key for row in rows for key in row if not key.startswith("_"))
+                self.columns = list(seen)
+                self._write_header()
+            self._buffer.extend(_extract_values(rows, self.columns))
+            if len(self._buffer) >= self.buffer_rows:
+                self._flush_locked()
+
+    def _flush_loop(self):
+        """Timer thread: flush whatever is buffered once flush_interval has passed."""
+        while not self._stopped.wait(self.flush_interval):
+            with self._lock:
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+    def flush(self):
+        """Write buffered rows as one chunk and push them to the OS."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer or self._fh.closed:
+            return
+        # Render the whole buffer first so a single write() lands complete rows.
+        chunk = io.StringIO()
+        csv.writer(chunk).writerows(self._buffer)
+        self._fh.write(chunk.getvalue())
+        self._fh.flush()
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        if self._fh.closed:
+            return
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            try:
+                self._flush_locked()
+            finally:
+                self._fh.close()
+        logger.info("streamed %s rows to: %s", self.rows_written, self.filepath)
+
+    def __enter__(self) -> "StreamingCSVExporter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
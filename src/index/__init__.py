@@ -0,0 +1 @@
+# 索引模块
@@ -0,0 +1,225 @@
+"""
+全文检索索引模块
+- 按字符二元组（bigram）建倒排索引，中文无需分词
+- 按批增量追加，可挂在处理流水线的批监听器上边爬边建
+- 查询先用倒排表求交得到候选，再做子串校验，按点赞数或时间排序后分页
+"""
+import heapq
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# 文本结尾补一个哨兵字符，保证每个字符都是某个 bigram 的首字符（支持单字查询）
+_SENTINEL = '\x00'
+
+# 候选集比倒排表小这么多倍时，改用二分查找求交
+_BISECT_RATIO = 16
+
+SORT_FIELDS = ('like_count', 'time')
+MAX_PAGE_SIZE = 200
+
+
+def _bigrams(text: str) -> set:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _intersect(candidates: List[int], posting: array) -> List[int]:
+    """两个升序文档ID序列求交，结果保持升序"""
+    if len(candidates) * _BISECT_RATIO < len(posting):
+        result = []
+        size = len(posting)
+        for doc in candidates:
+            i = bisect_left(posting, doc)
+            if i < size and posting[i] == doc:
+                result.append(doc)
+        return result
+    wanted = set(candidates)
+    return [doc for doc in posting if doc in wanted]
+
+
+class SearchIndex:
+    """
+    评论 / 动态内容的倒排索引
+
+    用法:
+        index = SearchIndex()
+        pipeline.add_listener(index.add_rows)
+        page = index.search('原神 抽卡', sort='like_count', limit=20)
+    """
+
+    def __init__(self, field: str = 'content', time_field: str = 'ctime'):
+        """
+        Args:
+            field: 建索引的文本字段
+            time_field: 按时间排序时使用的字段（评论为 ctime，动态为 timestamp）
+        """
+        self.field = field
+        self.time_field = time_field
+        self.rows: List[Dict] = []
+        self._texts: List[str] = []
+        self._likes = array('q')
+        self._times = array('q')
+        self._postings: Dict[str, array] = {}
+        # 首字符 -> 以它开头的 bigram，用于单字查询
+        self._by_first: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            self.rows = []
+            self._texts = []
+            self._likes = array('q')
+            self._times = array('q')
+            self._postings = {}
+            self._by_first = {}
+
+    def add_rows(self, rows: Iterable[Dict]):
+        """
+        追加一批行
+
+        文档ID按追加顺序递增，倒排表天然保持升序，无需重排
+        """
+        field = self.field
+        time_field = self.time_field
+        with self._lock:
+            postings = self._postings
+            by_first = self._by_first
+            doc = len(self.rows)
+            for row in rows:
+                text = (row.get(field) or '').lower()
+                for gram in _bigrams(text + _SENTINEL):
+                    posting = postings.get(gram)
+                    if posting is None:
+                        posting = postings[gram] = array('I')
+                        by_first.setdefault(gram[0], []).append(gram)
+                    posting.append(doc)
+                self.rows.append(row)
+                self._texts.append(text)
+                self._likes.append(int(row.get('like_count') or 0))
+                self._times.append(int(row.get(time_field) or 0))
+                doc += 1
+
+    # 与流水线批聚合器接口一致
+    append_rows = add_rows
+
+    # ============================================================
+    #  查询
+    # ============================================================
+    def _char_candidates(self, char: str) -> List[int]:
+        """包含某个字的文档（升序）：以该字开头的全部 bigram 倒排表求并"""
+        grams = self._by_first.get(char)
+        if not grams:
+            return []
+        if len(grams) == 1:
+            return list(self._postings[grams[0]])
+        docs = set()
+        for gram in grams:
+            docs.update(self._postings[gram])
+        return sorted(docs)
+
+    def match(self, query: str) -> List[int]:
+        """
+        返回满足查询的全部文档ID（升序）
+
+        查询按空白拆分为多个词，需全部出现（AND）。所有词的 bigram 倒排表
+        从短到长依次求交，候选集越求越小；单字词和长于两个字的词最后做子串校验。
+        """
+        terms = set(query.lower().split())
+        if not terms:
+            return []
+        multi = [term for term in terms if len(term) > 1]
+        single = [term for term in terms if len(term) == 1]
+        with self._lock:
+            postings = {}
+            for term in multi:
+                for gram in _bigrams(term):
+                    posting = self._postings.get(gram)
+                    if posting is None:
+                        return []
+                    postings[gram] = posting
+            if postings:
+                ordered = sorted(postings.values(), key=len)
+                candidates = list(ordered[0])
+                for posting in ordered[1:]:
+                    if not candidates:
+                        return []
+                    candidates = _intersect(candidates, posting)
+                # bigram 全部命中不代表连续出现，长于两个字的词需再校验
+                verify = [term for term in multi if len(term) > 2] + single
+            else:
+                candidates = self._char_candidates(single[0])
+                verify = single[1:]
+
+            texts = self._texts
+            for term in verify:
+                if not candidates:
+                    break
+                candidates = [
+                    doc for doc, text in zip(candidates, map(texts.__getitem__, candidates))
+                    if term in text
+                ]
+            return candidates
+
+    def search(
+        self,
+        query: str,
+        sort: str = 'like_count',
+        descending: bool = True,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Dict:
+        """
+        检索并分页
+
+        Args:
+            query: 查询词，多个词用空格分隔
+            sort: 排序字段，like_count 或 time
+            descending: 是否降序
+            offset: 分页起点
+            limit: 每页条数（不超过 MAX_PAGE_SIZE）
+
+        Returns:
+            {'total': 命中总数, 'offset', 'limit', 'items': 当前页的行（不含内部字段）, 'took_ms': 耗时}
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort}")
+        started = time.perf_counter()
+        offset = max(int(offset), 0)
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        docs = self.match(query)
+
+        column = self._likes if sort == 'like_count' else self._times
+        # 排序稳定，同值时保持文档ID（爬取顺序），保证翻页结果一致
+        end = offset + limit
+        if end < len(docs) // 4:
+            select = heapq.nlargest if descending else heapq.nsmallest
+            ordered = select(end, docs, key=column.__getitem__)
+        else:
+            ordered = sorted(docs, key=column.__getitem__, reverse=descending)
+        rows = self.rows
+        return {
+            'total': len(docs),
+            'offset': offset,
+            'limit': limit,
+            # 去掉 "_" 开头的内部字段（如 keep_raw 保留的原始 API 对象）
+            'items': [{key: value for key, value in rows[doc].items() if not key.startswith('_')}
+                      for doc in ordered[offset:end]],
+            'took_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def stats(self) -> Dict:
+        """索引规模"""
+        return {
+            'documents': len(self.rows),
+            'grams': len(self._postings),
+            'postings': sum(len(p) for p in self._postings.values()),
+        }
@@ -0,0 +1,207 @@
+"""
+回复树索引模块
+- 由每条评论的 root_id / parent_id 还原楼中楼结构：父 -> 子邻接表、节点深度、子树大小
+- 每个楼的总条数和最大深度在插入时常数维护，查询单个楼或 Top-K 楼不需要扫描无关数据
+- 父评论尚未爬到（或被过滤掉）的回复先挂在楼主下作为孤儿，父评论到达后再重新挂载
+- 返回的评论去掉 "_" 开头的内部字段（如 keep_raw 保留的原始 API 对象）
+"""
+import heapq
+import logging
+import threading
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+THREAD_SORT_KEYS = ('size', 'depth')
+
+
+def _public(row: Optional[Dict]) -> Optional[Dict]:
+    if row is None:
+        return None
+    return {key: value for key, value in row.items() if not key.startswith('_')}
+
+
+class ThreadIndex:
+    """
+    评论回复树索引
+
+    用法:
+        index = ThreadIndex()
+        pipeline.add_listener(index.add_rows)
+        thread = index.get_thread(root_id)
+        largest = index.top_threads(10, by='size')
+    """
+
+    def __init__(self):
+        self.rows: Dict[int, Dict] = {}
+        self.children: Dict[int, List[int]] = {}
+        self.depth: Dict[int, int] = {}
+        self.thread_of: Dict[int, int] = {}
+        self.thread_size: Dict[int, int] = {}
+        self.thread_depth: Dict[int, int] = {}
+        # 缺失的父评论ID -> 等待它的子评论；楼主ID -> 该楼的孤儿（有序集合）
+        self._waiting: Dict[int, List[int]] = {}
+        self._orphans: Dict[int, Dict[int, None]] = {}
+        # 楼主ID -> (计算时的楼大小, 子树大小表)
+        self._subtree_cache: Dict[int, Tuple[int, Dict[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    # ============================================================
+    #  构建
+    # ============================================================
+    def add(self, row: Dict):
+        """插入一条评论（重复的 comment_id 会被忽略）"""
+        comment_id = row.get('comment_id')
+        if comment_id is None or comment_id in self.rows:
+            return
+        root_id = row.get('root_id') or comment_id
+        parent_id = row.get('parent_id') or 0
+        self.rows[comment_id] = row
+        self.thread_of[comment_id] = root_id
+        self.thread_size[root_id] = self.thread_size.get(root_id, 0) + 1
+
+        if not parent_id or comment_id == root_id:
+            depth = 0
+        else:
+            self.children.setdefault(parent_id, []).append(comment_id)
+            parent_depth = self.depth.get(parent_id)
+            if parent_depth is None:
+                # 父评论尚未出现，暂按直接回复楼主计深度
+                self._waiting.setdefault(parent_id, []).append(comment_id)
+                self._orphans.setdefault(root_id, {})[comment_id] = None
+                depth = 1
+            else:
+                depth = parent_depth + 1
+        self._set_depth(comment_id, root_id, depth)
+
+        waiting = self._waiting.pop(comment_id, None)
+        if waiting:
+            self._relink(comment_id, waiting)
+
+    def add_rows(self, rows):
+        """插入一批评论"""
+        add = self.add
+        with self._lock:
+            for row in rows:
+                add(row)
+
+    # 与流水线批聚合器接口一致
+    append_rows = add_rows
+
+    def _set_depth(self, comment_id: int, root_id: int, depth: int):
+        self.depth[comment_id] = depth
+        if depth > self.thread_depth.get(root_id, -1):
+            self.thread_depth[root_id] = depth
+
+    def _relink(self, parent_id: int, waiting: List[int]):
+        """父评论到达后，把等待它的孤儿挂回来，并按真实深度修正整棵子树"""
+        for orphan in waiting:
+            orphans = self._orphans.get(self.thread_of[orphan])
+            if orphans is not None:
+                orphans.pop(orphan, None)
+        stack = [parent_id]
+        while stack:
+            node = stack.pop()
+            child_depth = self.depth[node] + 1
+            for child in self.children.get(node, ()):
+                if self.depth[child] != child_depth:
+                    self._set_depth(child, self.thread_of[child], child_depth)
+                    stack.append(child)
+
+    # ============================================================
+    #  查询
+    # ============================================================
+    def iter_thread(self, root_id: int) -> Iterator[Tuple[Dict, int]]:
+        """
+        惰性先序遍历一个楼，依次产出 (评论, 深度)
+
+        楼主在前，同层按插入（爬取）顺序；父评论缺失的孤儿子树排在最后
+        """
+        starts = [root_id] if root_id in self.rows else []
+        starts.extend(self._orphans.get(root_id, ()))
+        stack = starts[::-1]
+        rows = self.rows
+        children = self.children
+        depth = self.depth
+        while stack:
+            node = stack.pop()
+            yield rows[node], depth[node]
+            kids = children.get(node)
+            if kids:
+                stack.extend(reversed(kids))
+
+    def subtree_sizes(self, root_id: int) -> Dict[int, int]:
+        """一个楼内每个节点的子树大小（含自身），按楼大小缓存"""
+        size = self.thread_size.get(root_id, 0)
+        cached = self._subtree_cache.get(root_id)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        sizes: Dict[int, int] = {}
+        order = [row['comment_id'] for row, _ in self.iter_thread(root_id)]
+        children = self.children
+        # 先序的逆序即保证子节点先于父节点完成
+        for node in reversed(order):
+            sizes[node] = 1 + sum(sizes[child] for child in children.get(node, ()))
+        self._subtree_cache[root_id] = (size, sizes)
+        return sizes
+
+    def summary(self, root_id: int) -> Optional[Dict]:
+        """楼的概要：条数、最大深度、孤儿数、楼主评论"""
+        if root_id not in self.thread_size:
+            return None
+        return {
+            'root_id': root_id,
+            'size': self.thread_size[root_id],
+            'depth': self.thread_depth.get(root_id, 0),
+            'orphans': len(self._orphans.get(root_id, ())),
+            'root': _public(self.rows.get(root_id)),
+        }
+
+    def get_thread(self, root_id: int, offset: int = 0, limit: int = 500) -> Optional[Dict]:
+        """
+        获取一个楼
+
+        Args:
+            root_id: 楼主评论ID
+            offset: 先序遍历中的起始位置
+            limit: 最多返回的评论条数
+
+        Returns:
+            楼概要 + comments（每条附带 depth / children / subtree_size），楼不存在时返回None
+        """
+        with self._lock:
+            summary = self.summary(root_id)
+            if summary is None:
+                return None
+            sizes = self.subtree_sizes(root_id)
+            children = self.children
+            page = islice(self.iter_thread(root_id), max(offset, 0), max(offset, 0) + limit)
+            summary['comments'] = [
+                {
+                    **_public(row),
+                    'depth': depth,
+                    'children': len(children.get(row['comment_id'], ())),
+                    'subtree_size': sizes[row['comment_id']],
+                }
+                for row, depth in page
+            ]
+            return summary
+
+    def top_threads(self, k: int = 10, by: str = 'size') -> List[Dict]:
+        """
+        条数最多或嵌套最深的 k 个楼
+
+        Args:
+            k: 返回数量
+            by: size 或 depth，同值时按楼主ID升序
+        """
+        if by not in THREAD_SORT_KEYS:
+            raise ValueError(f"不支持的排序字段: {by}")
+        with self._lock:
+            metric = self.thread_size if by == 'size' else self.thread_depth
+            top = heapq.nsmallest(k, metric, key=lambda root: (-metric[root], root))
+            return [self.summary(root) for root in top]
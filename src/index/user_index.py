@@ -0,0 +1,321 @@
+"""
+跨运行用户活跃索引模块
+- 基于 sqlite3（标准库），按 user_id 记录每条评论出现在哪个目标、哪次运行
+- 每批数据只追加，重复爬取同一目标时同一条评论不会重复计数
+- 用户汇总表（评论数、涉及目标数、首末活跃时间）每批按集合运算增量更新，
+  查询单个用户或活跃用户排行都走索引，不扫描原始数据
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from config.config import DATA_DIR, USER_INDEX_DB
+
+logger = logging.getLogger(__name__)
+
+USER_SORT_KEYS = ('comments', 'targets', 'last_seen')
+
+# 评论摘要最大长度
+SNIPPET_LENGTH = 120
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    target      TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    started_at  INTEGER NOT NULL,
+    finished_at INTEGER,
+    rows        INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS activity (
+    user_id    INTEGER NOT NULL,
+    oid        INTEGER NOT NULL,
+    comment_id INTEGER NOT NULL,
+    run_id     INTEGER NOT NULL,
+    ctime      INTEGER NOT NULL,
+    like_count INTEGER NOT NULL,
+    is_reply   INTEGER NOT NULL,
+    snippet    TEXT NOT NULL,
+    PRIMARY KEY (user_id, oid, comment_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id    INTEGER PRIMARY KEY,
+    username   TEXT NOT NULL DEFAULT '',
+    comments   INTEGER NOT NULL DEFAULT 0,
+    targets    INTEGER NOT NULL DEFAULT 0,
+    first_seen INTEGER NOT NULL DEFAULT 0,
+    last_seen  INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS usernames (
+    username TEXT NOT NULL,
+    user_id  INTEGER NOT NULL,
+    PRIMARY KEY (username, user_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_usernames_user ON usernames (user_id);
+CREATE INDEX IF NOT EXISTS idx_users_comments ON users (comments DESC);
+CREATE INDEX IF NOT EXISTS idx_users_targets ON users (targets DESC);
+CREATE INDEX IF NOT EXISTS idx_users_last_seen ON users (last_seen DESC);
+
+-- 每批数据先写入暂存表，剔除已索引的评论后再整体合并，用户汇总按集合运算更新
+CREATE TEMP TABLE IF NOT EXISTS staging (
+    user_id    INTEGER NOT NULL,
+    oid        INTEGER NOT NULL,
+    comment_id INTEGER NOT NULL,
+    run_id     INTEGER NOT NULL,
+    ctime      INTEGER NOT NULL,
+    like_count INTEGER NOT NULL,
+    is_reply   INTEGER NOT NULL,
+    snippet    TEXT NOT NULL,
+    PRIMARY KEY (user_id, oid, comment_id)
+) WITHOUT ROWID;
+"""
+
+
+class UserActivityIndex:
+    """
+    跨运行用户活跃索引
+
+    用法:
+        index = UserActivityIndex()
+        run_id = index.start_run('BV1xx411c7mD')
+        pipeline.add_listener(lambda batch: index.add_rows(batch, run_id))
+        index.finish_run(run_id)     # 写入剩余缓冲
+        index.lookup(user_id=12345)
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_rows: int = 5000):
+        """
+        Args:
+            path: 数据库文件路径，默认为 DATA_DIR 下的 USER_INDEX_DB
+            flush_rows: 缓冲多少条评论后合并写入一次
+        """
+        if path is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            path = os.path.join(DATA_DIR, USER_INDEX_DB)
+        self.path = path
+        self.flush_rows = flush_rows
+        self._pending: List[tuple] = []
+        self._pending_names: Dict[int, str] = {}
+        self._pending_runs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # 主键按用户ID随机写入，页缓存过小时数据量一大就频繁换页
+        self._conn.execute("PRAGMA cache_size=-65536")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    # ============================================================
+    #  写入
+    # ============================================================
+    def start_run(self, target: str, kind: str = 'comments') -> int:
+        """登记一次爬取，返回运行ID"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (target, kind, started_at) VALUES (?, ?, ?)",
+                (str(target), kind, int(time.time())),
+            )
+            return cursor.lastrowid
+
+    def finish_run(self, run_id: int):
+        """标记一次爬取结束（同时写入尚未落盘的缓冲）"""
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE runs SET finished_at = ? WHERE run_id = ?",
+                    (int(time.time()), run_id),
+                )
+
+    def add_rows(self, rows: Iterable[Dict], run_id: int):
+        """
+        追加一批评论
+
+        爬虫每页只有几十条，逐页提交事务的开销远大于写入本身，
+        因此先放进缓冲区，攒够 flush_rows 条再合并写入
+
+        Args:
+            rows: 评论列表（需含 user_id / video_oid / comment_id）
+            run_id: start_run 返回的运行ID
+        """
+        records = []
+        names = {}
+        for row in rows:
+            user_id = row.get('user_id')
+            comment_id = row.get('comment_id')
+            if not user_id or not comment_id:
+                continue
+            records.append((
+                user_id,
+                row.get('video_oid') or 0,
+                comment_id,
+                run_id,
+                row.get('ctime') or 0,
+                row.get('like_count') or 0,
+                int(bool(row.get('is_reply'))),
+                (row.get('content') or '')[:SNIPPET_LENGTH],
+            ))
+            if row.get('username'):
+                names[user_id] = row['username']
+        if not records:
+            return
+        with self._lock:
+            self._pending.extend(records)
+            self._pending_names.update(names)
+            self._pending_runs[run_id] = self._pending_runs.get(run_id, 0) + len(records)
+            if len(self._pending) >= self.flush_rows:
+                self._flush_locked()
+
+    def flush(self) -> int:
+        """
+        把缓冲区写入数据库
+
+        Returns:
+            新增（此前未出现过）的评论数
+        """
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        records = self._pending
+        if not records:
+            return 0
+        names = self._pending_names
+        runs = self._pending_runs
+        self._pending = []
+        self._pending_names = {}
+        self._pending_runs = {}
+
+        with self._conn:
+            conn = self._conn
+            conn.execute("DELETE FROM staging")
+            conn.executemany("INSERT OR IGNORE INTO staging VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
+            conn.execute(
+                "DELETE FROM staging WHERE EXISTS (SELECT 1 FROM activity a WHERE "
+                "a.user_id = staging.user_id AND a.oid = staging.oid AND a.comment_id = staging.comment_id)"
+            )
+            # 新涉及的目标：该用户此前在这个目标下没有任何评论
+            conn.execute(
+                "INSERT INTO users (user_id, comments, targets, first_seen, last_seen) "
+                "SELECT s.user_id, COUNT(*), COUNT(DISTINCT CASE WHEN NOT EXISTS ("
+                "    SELECT 1 FROM activity a WHERE a.user_id = s.user_id AND a.oid = s.oid"
+                ") THEN s.oid END), MIN(s.ctime), MAX(s.ctime) "
+                "FROM staging s WHERE true GROUP BY s.user_id "
+                "ON CONFLICT (user_id) DO UPDATE SET "
+                "comments = comments + excluded.comments, "
+                "targets = targets + excluded.targets, "
+                "first_seen = MIN(first_seen, excluded.first_seen), "
+                "last_seen = MAX(last_seen, excluded.last_seen)"
+            )
+            added = conn.execute("INSERT INTO activity SELECT * FROM staging").rowcount
+            if names:
+                conn.executemany(
+                    "UPDATE users SET username = ? WHERE user_id = ?",
+                    [(name, user_id) for user_id, name in names.items()],
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO usernames (username, user_id) VALUES (?, ?)",
+                    [(name, user_id) for user_id, name in names.items()],
+                )
+            conn.executemany(
+                "UPDATE runs SET rows = rows + ? WHERE run_id = ?",
+                [(count, run_id) for run_id, count in runs.items()],
+            )
+        return added
+
+    # ============================================================
+    #  查询
+    # ============================================================
+    def lookup(
+        self,
+        user_id: Optional[int] = None,
+        username: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict]:
+        """
+        查询用户及其在各目标下的评论
+
+        Args:
+            user_id: 用户ID
+            username: 用户名（可能对应多个用户，按用户分别返回）
+            limit: 每个用户最多返回的评论条数（按时间倒序）
+            offset: 评论分页起点
+
+        Returns:
+            [{user_id, username, comments, targets, first_seen, last_seen, names, activity: [...]}]
+        """
+        if user_id is None and not username:
+            raise ValueError("需要提供 user_id 或 username")
+        with self._lock:
+            self._flush_locked()
+            conn = self._conn
+            if user_id is not None:
+                user_ids = [int(user_id)]
+            else:
+                user_ids = [
+                    row['user_id'] for row in
+                    conn.execute("SELECT user_id FROM usernames WHERE username = ?", (username,))
+                ]
+            result = []
+            for uid in user_ids:
+                user = conn.execute("SELECT * FROM users WHERE user_id = ?", (uid,)).fetchone()
+                if user is None:
+                    continue
+                entry = dict(user)
+                entry['names'] = [
+                    row['username'] for row in
+                    conn.execute("SELECT username FROM usernames WHERE user_id = ?", (uid,))
+                ]
+                entry['activity'] = [
+                    dict(row) for row in conn.execute(
+                        "SELECT a.oid, a.comment_id, a.ctime, a.like_count, a.is_reply, a.snippet, "
+                        "a.run_id, r.target FROM activity a JOIN runs r ON r.run_id = a.run_id "
+                        "WHERE a.user_id = ? ORDER BY a.ctime DESC LIMIT ? OFFSET ?",
+                        (uid, int(limit), int(offset)),
+                    )
+                ]
+                result.append(entry)
+            return result
+
+    def top_users(self, k: int = 10, by: str = 'comments') -> List[Dict]:
+        """
+        活跃用户排行
+
+        Args:
+            k: 返回数量
+            by: comments（评论数）/ targets（涉及目标数）/ last_seen（最近活跃）
+        """
+        if by not in USER_SORT_KEYS:
+            raise ValueError(f"不支持的排序字段: {by}")
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                f"SELECT * FROM users ORDER BY {by} DESC, user_id LIMIT ?", (int(k),)
+            )
+            return [dict(row) for row in rows]
+
+    def stats(self) -> Dict:
+        """索引规模"""
+        with self._lock:
+            self._flush_locked()
+            conn = self._conn
+            return {
+                'users': conn.execute("SELECT COUNT(*) FROM users").fetchone()[0],
+                'comments': conn.execute("SELECT COUNT(*) FROM activity").fetchone()[0],
+                'runs': conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0],
+            }
@@ -0,0 +1,149 @@
+"""
+增量聚合模块
+- 每来一行只做常数次累加，不需要保留或重扫全部数据
+- 可以挂在处理流水线上，也可以直接逐批喂入
+"""
+import heapq
+import logging
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CommentStatsAccumulator:
+    """
+    评论基础统计的增量累加器
+
+    输出与 DataProcessor.get_statistics 的六项统计一致
+    """
+
+    __slots__ = ('total', 'main_comments', 'replies', 'total_likes', 'total_replies')
+
+    def __init__(self):
+        self.total = 0
+        self.main_comments = 0
+        self.replies = 0
+        self.total_likes = 0
+        self.total_replies = 0
+
+    def add(self, comment: Dict):
+        """累加一条评论"""
+        self.total += 1
+        self.total_likes += comment.get('like_count') or 0
+        if comment.get('is_reply'):
+            self.replies += 1
+        else:
+            self.main_comments += 1
+            self.total_replies += comment.get('reply_count') or 0
+
+    def add_rows(self, comments: Iterable[Dict]):
+        """累加一批评论"""
+        add = self.add
+        for comment in comments:
+            add(comment)
+
+    def snapshot(self) -> Dict:
+        """当前统计结果"""
+        return {
+            'total': self.total,
+            'main_comments': self.main_comments,
+            'replies': self.replies,
+            'total_likes': self.total_likes,
+            'avg_likes': round(self.total_likes / self.total, 2) if self.total else 0,
+            'total_replies': self.total_replies,
+        }
+
+
+class TopCounter:
+    """
+    精确计数 + 增量维护的 Top-K 候选集
+
+    每次累加为 O(1) 均摊：计数超过候选集门槛的键才进入候选集，
+    候选集超过 2K 时裁剪回 K 个并抬高门槛。计数只增不减，
+    所以被裁掉的键重新超过门槛时会再次进入，结果与全量排序一致（并列时顺序可能不同）。
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.counts: Dict = {}
+        self._top: Dict = {}
+        self._threshold = 0
+
+    def add(self, key, weight: int = 1):
+        count = self.counts.get(key, 0) + weight
+        self.counts[key] = count
+        if count > self._threshold or key in self._top:
+            self._top[key] = count
+            if len(self._top) > 2 * self.k:
+                kept = heapq.nlargest(self.k, self._top.items(), key=itemgetter(1))
+                self._top = dict(kept)
+                self._threshold = kept[-1][1]
+
+    def top(self, n: Optional[int] = None) -> List[Tuple]:
+        """返回计数最高的 n 个 (键, 计数)，默认 K 个"""
+        return heapq.nlargest(min(n or self.k, self.k), self._top.items(), key=itemgetter(1))
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class LiveCommentStats(CommentStatsAccumulator):
+    """
+    爬取过程中的实时评论统计
+
+    在六项基础统计之上增加：活跃用户 Top-K、IP 属地分布、每小时评论数。
+    每行更新为 O(1) 均摊，快照只读取有界大小的结构，不重扫已爬取的数据。
+    """
+
+    __slots__ = ('users', 'usernames', 'locations', 'hourly', '_latest_hour', 'hour_window')
+
+    def __init__(self, top_k: int = 10, hour_window: int = 72):
+        """
+        Args:
+            top_k: 活跃用户榜单长度
+            hour_window: 快照中每小时评论数覆盖的小时数（从最新一条评论往前）
+        """
+        super().__init__()
+        self.users = TopCounter(top_k)
+        self.usernames: Dict = {}
+        self.locations: Dict[str, int] = {}
+        self.hourly: Dict[int, int] = {}
+        self._latest_hour = 0
+        self.hour_window = hour_window
+
+    def add(self, comment: Dict):
+        """累加一条评论"""
+        super().add(comment)
+        user_id = comment.get('user_id')
+        if user_id:
+            self.users.add(user_id)
+            self.usernames[user_id] = comment.get('username', '')
+        location = comment.get('ip_location') or '未知'
+        self.locations[location] = self.locations.get(location, 0) + 1
+        ctime = comment.get('ctime') or 0
+        if ctime > 0:
+            hour = ctime // 3600
+            self.hourly[hour] = self.hourly.get(hour, 0) + 1
+            if hour > self._latest_hour:
+                self._latest_hour = hour
+
+    def snapshot(self) -> Dict:
+        """当前统计结果（含实时扩展项）"""
+        stats = super().snapshot()
+        stats['unique_users'] = len(self.users)
+        stats['top_users'] = [
+            {'user_id': user_id, 'username': self.usernames.get(user_id, ''), 'count': count}
+            for user_id, count in self.users.top()
+        ]
+        stats['ip_locations'] = dict(sorted(self.locations.items(), key=itemgetter(1), reverse=True))
+        if self._latest_hour:
+            first = self._latest_hour - self.hour_window + 1
+            stats['per_hour'] = [
+                [hour * 3600, self.hourly[hour]]
+                for hour in range(first, self._latest_hour + 1)
+                if hour in self.hourly
+            ]
+        else:
+            stats['per_hour'] = []
+        return stats
@@ -0,0 +1,274 @@
+"""
+列式评论统计模块
+- 评论字典只遍历一次，数值字段装入 array 列（连续内存，无逐行对象开销）
+- 安装了 NumPy 时直接在列上做向量化计算；未安装时退回纯 Python 实现，结果一致
+- 支持按批追加，爬取过程中可以边收边装列
+"""
+import heapq
+import logging
+from array import array
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 参与列式统计的字段（统一存为 64 位整数列）
+_NUMERIC_FIELDS = ('like_count', 'reply_count', 'ctime', 'user_level', 'is_reply', 'root_id')
+
+# 点赞数 / 回复数分布的分桶上界（左闭右开），最后一个桶为 >= 10000
+DISTRIBUTION_EDGES = (1, 10, 100, 1000, 10000)
+PERCENTILES = (50, 90, 99)
+TOP_ROOTS = 10
+
+
+def _bucket_labels(edges: Sequence[int]) -> List[str]:
+    labels = [f"<{edges[0]}"]
+    for lo, hi in zip(edges, edges[1:]):
+        labels.append(f"{lo}-{hi - 1}")
+    labels.append(f">={edges[-1]}")
+    return labels
+
+
+def _percentile(sorted_values: Sequence[int], q: float) -> float:
+    """线性插值分位数（与 numpy.percentile 默认行为一致）"""
+    if not sorted_values:
+        return 0
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+class CommentColumns:
+    """
+    评论数据的列式存储
+
+    用法:
+        columns = CommentColumns.from_rows(comments)
+        stats = columns.statistics()
+    """
+
+    def __init__(self):
+        self.like_count = array('q')
+        self.reply_count = array('q')
+        self.ctime = array('q')
+        self.user_level = array('q')
+        self.is_reply = array('q')
+        self.root_id = array('q')
+        self._columns = (self.like_count, self.reply_count, self.ctime,
+                         self.user_level, self.is_reply, self.root_id)
+
+    def __len__(self):
+        return len(self.like_count)
+
+    @classmethod
+    def from_rows(cls, comments: Iterable[Dict]) -> 'CommentColumns':
+        """由评论列表构造列存储（只遍历一次）"""
+        columns = cls()
+        columns.append_rows(comments)
+        return columns
+
+    def append_rows(self, comments: Iterable[Dict]):
+        """
+        追加一批评论
+
+        清洗后的评论字段齐全，走 itemgetter 取值、交错写入单个 array 再按步长切列的
+        C 层快速路径；字段缺失或为 None 时退回逐行 get 的慢路径。
+        """
+        comments = comments if isinstance(comments, list) else list(comments)
+        if not comments:
+            return
+        width = len(_NUMERIC_FIELDS)
+        try:
+            interleaved = array('q', chain.from_iterable(map(itemgetter(*_NUMERIC_FIELDS), comments)))
+        except (KeyError, TypeError, OverflowError):
+            interleaved = array('q', [
+                int(comment.get(field) or 0)
+                for comment in comments
+                for field in _NUMERIC_FIELDS
+            ])
+        for offset, column in enumerate(self._columns):
+            column.extend(interleaved[offset::width])
+
+    # ============================================================
+    #  统计
+    # ============================================================
+    def statistics(self, time_bucket: Optional[int] = None) -> Dict:
+        """
+        计算完整统计信息
+
+        Args:
+            time_bucket: 时间直方图的桶宽（秒），为空时按时间跨度自动选择小时或天
+
+        Returns:
+            统计信息字典，前六项与 DataProcessor.get_statistics 一致
+        """
+        if not len(self):
+            return {
+                'total': 0,
+                'main_comments': 0,
+                'replies': 0,
+                'total_likes': 0,
+                'avg_likes': 0,
+                'total_replies': 0,
+            }
+        if np is not None:
+            return self._statistics_numpy(time_bucket)
+        return self._statistics_python(time_bucket)
+
+    def _statistics_numpy(self, time_bucket: Optional[int]) -> Dict:
+        likes = np.frombuffer(self.like_count, dtype=np.int64)
+        reply_counts = np.frombuffer(self.reply_count, dtype=np.int64)
+        ctime = np.frombuffer(self.ctime, dtype=np.int64)
+        levels = np.frombuffer(self.user_level, dtype=np.int64)
+        is_reply = np.frombuffer(self.is_reply, dtype=np.int64).astype(bool)
+        root_ids = np.frombuffer(self.root_id, dtype=np.int64)
+
+        total = int(likes.size)
+        replies = int(is_reply.sum())
+        main_reply_counts = reply_counts[~is_reply]
+        total_likes = int(likes.sum())
+
+        def distribution(values):
+            if not values.size:
+                return self._empty_distribution()
+            counts = np.bincount(np.searchsorted(DISTRIBUTION_EDGES, values, side='right'),
+                                 minlength=len(DISTRIBUTION_EDGES) + 1)
+            pct = np.percentile(values, PERCENTILES)
+            return {
+                'mean': round(float(values.mean()), 2),
+                'max': int(values.max()),
+                **{f'p{q}': round(float(v), 2) for q, v in zip(PERCENTILES, pct)},
+                'histogram': dict(zip(_bucket_labels(DISTRIBUTION_EDGES), counts.tolist())),
+            }
+
+        level_counts = np.bincount(np.clip(levels, 0, None))
+        by_level = {str(lv): int(n) for lv, n in enumerate(level_counts.tolist()) if n}
+
+        roots, per_root = np.unique(root_ids[is_reply], return_counts=True)
+        if per_root.size:
+            top_idx = np.lexsort((roots, -per_root))[:TOP_ROOTS]  # 回复数降序，同数按根评论ID升序
+            replies_per_root = {
+                'threads': int(per_root.size),
+                'mean': round(float(per_root.mean()), 2),
+                'max': int(per_root.max()),
+                'p90': round(float(np.percentile(per_root, 90)), 2),
+                'top': [[int(roots[i]), int(per_root[i])] for i in top_idx],
+            }
+        else:
+            replies_per_root = self._empty_replies_per_root()
+
+        valid_ctime = ctime[ctime > 0]
+        if valid_ctime.size:
+            bucket = time_bucket or self._auto_bucket(int(valid_ctime.min()), int(valid_ctime.max()))
+            starts, counts = np.unique(valid_ctime // bucket, return_counts=True)
+            timeline = [[int(s) * bucket, int(n)] for s, n in zip(starts, counts)]
+        else:
+            bucket, timeline = time_bucket or 3600, []
+
+        return {
+            'total': total,
+            'main_comments': total - replies,
+            'replies': replies,
+            'total_likes': total_likes,
+            'avg_likes': round(total_likes / total, 2),
+            'total_replies': int(main_reply_counts.sum()),
+            'likes': distribution(likes),
+            'reply_counts': distribution(main_reply_counts),
+            'by_level': by_level,
+            'replies_per_root': replies_per_root,
+            'time_bucket': bucket,
+            'timeline': timeline,
+        }
+
+    def _statistics_python(self, time_bucket: Optional[int]) -> Dict:
+        likes = self.like_count
+        is_reply = self.is_reply
+        total = len(likes)
+        replies = sum(is_reply)
+        total_likes = sum(likes)
+        main_reply_counts = [n for n, r in zip(self.reply_count, is_reply) if not r]
+
+        labels = _bucket_labels(DISTRIBUTION_EDGES)
+
+        def distribution(values):
+            if not values:
+                return self._empty_distribution()
+            ordered = sorted(values)
+            histogram = dict.fromkeys(labels, 0)
+            edge_iter = 0
+            for value in ordered:
+                while edge_iter < len(DISTRIBUTION_EDGES) and value >= DISTRIBUTION_EDGES[edge_iter]:
+                    edge_iter += 1
+                histogram[labels[edge_iter]] += 1
+            return {
+                'mean': round(sum(ordered) / len(ordered), 2),
+                'max': ordered[-1],
+                **{f'p{q}': round(_percentile(ordered, q), 2) for q in PERCENTILES},
+                'histogram': histogram,
+            }
+
+        level_counts = Counter(max(lv, 0) for lv in self.user_level)
+        by_level = {str(lv): level_counts[lv] for lv in sorted(level_counts)}
+
+        per_root = Counter(root for root, r in zip(self.root_id, is_reply) if r)
+        if per_root:
+            ordered = sorted(per_root.values())
+            top = heapq.nsmallest(TOP_ROOTS, per_root.items(), key=lambda kv: (-kv[1], kv[0]))
+            replies_per_root = {
+                'threads': len(per_root),
+                'mean': round(sum(ordered) / len(ordered), 2),
+                'max': ordered[-1],
+                'p90': round(_percentile(ordered, 90), 2),
+                'top': [[root, n] for root, n in top],
+            }
+        else:
+            replies_per_root = self._empty_replies_per_root()
+
+        valid_ctime = [ts for ts in self.ctime if ts > 0]
+        if valid_ctime:
+            bucket = time_bucket or self._auto_bucket(min(valid_ctime), max(valid_ctime))
+            counts = Counter(ts // bucket for ts in valid_ctime)
+            timeline = [[start * bucket, counts[start]] for start in sorted(counts)]
+        else:
+            bucket, timeline = time_bucket or 3600, []
+
+        return {
+            'total': total,
+            'main_comments': total - replies,
+            'replies': replies,
+            'total_likes': total_likes,
+            'avg_likes': round(total_likes / total, 2),
+            'total_replies': sum(main_reply_counts),
+            'likes': distribution(likes),
+            'reply_counts': distribution(main_reply_counts),
+            'by_level': by_level,
+            'replies_per_root': replies_per_root,
+            'time_bucket': bucket,
+            'timeline': timeline,
+        }
+
+    @staticmethod
+    def _auto_bucket(start: int, end: int) -> int:
+        """跨度不超过两天按小时分桶，否则按天"""
+        return 3600 if end - start <= 2 * 86400 else 86400
+
+    @staticmethod
+    def _empty_distribution() -> Dict:
+        return {
+            'mean': 0,
+            'max': 0,
+            **{f'p{q}': 0 for q in PERCENTILES},
+            'histogram': dict.fromkeys(_bucket_labels(DISTRIBUTION_EDGES), 0),
+        }
+
+    @staticmethod
+    def _empty_replies_per_root() -> Dict:
+        return {'threads': 0, 'mean': 0, 'max': 0, 'p90': 0, 'top': []}
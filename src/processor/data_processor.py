@@ -2,14 +2,65 @@
 数据处理和清洗模块
 """
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Union
+
+from src.processor.aggregates import CommentStatsAccumulator
+from src.processor.columnar_stats import CommentColumns
+from src.processor.dedup import DEFAULT_THRESHOLD, deduplicate
+from src.processor.keyword_matcher import KeywordMatcher, compile_keywords
 
 logger = logging.getLogger(__name__)
 
+# 评论必需字段及默认值
+COMMENT_DEFAULTS = {
+    'comment_id': 0,
+    'root_id': 0,
+    'parent_id': 0,
+    'is_reply': False,
+    'user_id': 0,
+    'username': '',
+    'user_level': 0,
+    'like_count': 0,
+    'reply_count': 0,
+    'ctime': 0,
+    'ctime_text': '',
+    'ip_location': '',
+}
+_COMMENT_KEYS = COMMENT_DEFAULTS.keys()
+
 
 class DataProcessor:
     """数据处理器类"""
 
+    @staticmethod
+    def clean_comment(comment: Dict) -> bool:
+        """
+        就地清洗单条评论
+
+        内容中的空白只在确实不规范时才重建字符串；字段齐全时跳过补默认值。
+
+        Args:
+            comment: 评论字典
+
+        Returns:
+            评论是否保留（空评论返回False）
+        """
+        content = comment.get('content') or ''
+        if not content or content.isspace():
+            return False
+
+        # 清理内容中的多余空白：除 ASCII 空格外的空白字符都不可打印，
+        # 可打印且没有首尾空格、连续空格时内容已规范，无需重建字符串
+        if (not content.isprintable() or '  ' in content
+                or content[0] == ' ' or content[-1] == ' '):
+            comment['content'] = ' '.join(content.split())
+
+        # 确保所有必需字段都存在
+        if not comment.keys() >= _COMMENT_KEYS:
+            for key, value in COMMENT_DEFAULTS.items():
+                comment.setdefault(key, value)
+        return True
+
     @staticmethod
     def clean_comments(comments: List[Dict]) -> List[Dict]:
         """
@@ -21,39 +72,13 @@ class DataProcessor:
         Returns:
             清洗后的评论列表
         """
-        cleaned = []
-        for comment in comments:
-            # 移除空评论
-            if not comment.get('content', '').strip():
-                continue
-
-            # 清理内容中的多余空白
-            content = comment.get('content', '')
-            content = ' '.join(content.split())
-            comment['content'] = content
-
-            # 确保所有必需字段都存在
-            comment.setdefault('comment_id', 0)
-            comment.setdefault('root_id', 0)
-            comment.setdefault('parent_id', 0)
-            comment.setdefault('is_reply', False)
-            comment.setdefault('user_id', 0)
-            comment.setdefault('username', '')
-            comment.setdefault('user_level', 0)
-            comment.setdefault('like_count', 0)
-            comment.setdefault('reply_count', 0)
-            comment.setdefault('ctime', 0)
-            comment.setdefault('ctime_text', '')
-            comment.setdefault('ip_location', '')
-
-            cleaned.append(comment)
-
-        return cleaned
+        clean_comment = DataProcessor.clean_comment
+        return [comment for comment in comments if clean_comment(comment)]
 
     @staticmethod
     def filter_comments(comments: List[Dict], filters: Optional[Dict] = None) -> List[Dict]:
         """
-        过滤评论
+        过滤评论（单次遍历，关键词预先编译）
 
         Args:
             comments: 评论列表
@@ -61,7 +86,11 @@ class DataProcessor:
                 {
                     'min_likes': 10,
                     'min_level': 3,
-                    'keyword': '关键词',
+                    'keyword': '原神 | 崩铁 & !广告',   # 关键词表达式
+                    'keywords': ['关键词1', '关键词2'],  # 命中任一即可
+                    'annotate': True,                    # 写入 matched_keywords 字段
+                    'dedup': 0.8,                        # 近似去重阈值，True 表示默认阈值
+                    'dedup_drop': True,                  # 丢弃重复评论（否则只标注 dup_of）
                 }
 
         Returns:
@@ -70,75 +99,95 @@ class DataProcessor:
         if not filters:
             return comments
 
+        dedup = filters.get('dedup')
+        if dedup:
+            rest = {key: value for key, value in filters.items() if key not in ('dedup', 'dedup_drop')}
+            return DataProcessor.deduplicate(
+                DataProcessor.filter_comments(comments, rest),
+                threshold=DEFAULT_THRESHOLD if dedup is True else float(dedup),
+                drop=bool(filters.get('dedup_drop')),
+            )
+
+        min_likes = filters.get('min_likes')
+        min_level = filters.get('min_level')
+        annotate = bool(filters.get('annotate'))
+        matcher = compile_keywords(filters.get('keyword') or filters.get('keywords'))
+        if min_likes is None and min_level is None:
+            if matcher is None:
+                return comments
+            return matcher.filter(comments, annotate=annotate)
+
         filtered = []
         for comment in comments:
-            if 'min_likes' in filters:
-                if comment.get('like_count', 0) < filters['min_likes']:
-                    continue
-
-            if 'min_level' in filters:
-                if comment.get('user_level', 0) < filters['min_level']:
-                    continue
-
-            if 'keyword' in filters:
-                keyword = filters['keyword'].lower()
-                if keyword not in comment.get('content', '').lower():
-                    continue
-
+            if min_likes is not None and comment.get('like_count', 0) < min_likes:
+                continue
+            if min_level is not None and comment.get('user_level', 0) < min_level:
+                continue
+            if matcher is not None and not matcher.match_row(comment, annotate=annotate):
+                continue
             filtered.append(comment)
 
         return filtered
 
     @staticmethod
-    def filter_dynamics(dynamics: List[Dict], keyword: str = "") -> List[Dict]:
+    def filter_dynamics(
+        dynamics: List[Dict],
+        keyword: Union[str, Sequence[str], KeywordMatcher, None] = "",
+        annotate: bool = False,
+    ) -> List[Dict]:
         """
         按关键词过滤动态数据
 
         Args:
             dynamics: 动态列表
-            keyword: 过滤关键词（不区分大小写），为空则返回全部
+            keyword: 关键词表达式、关键词列表或已编译的匹配器（不区分大小写），为空则返回全部
+            annotate: 是否写入 matched_keywords 字段
 
         Returns:
             过滤后的动态列表
         """
-        if not keyword:
+        matcher = compile_keywords(keyword)
+        if matcher is None:
             return dynamics
+        return matcher.filter(dynamics, annotate=annotate)
+
+    @staticmethod
+    def deduplicate(
+        rows: List[Dict],
+        threshold: float = DEFAULT_THRESHOLD,
+        drop: bool = False,
+        field: str = 'content',
+    ) -> List[Dict]:
+        """
+        近似去重（MinHash + LSH，评论和动态通用）
 
-        kw = keyword.lower()
-        return [d for d in dynamics if kw in d.get('content', '').lower()]
+        Args:
+            rows: 评论或动态列表
+            threshold: Jaccard 相似度阈值
+            drop: 是否丢弃重复行，否则在重复行上写入 dup_cluster / dup_of
+            field: 参与比较的文本字段
+
+        Returns:
+            保留的行
+        """
+        return deduplicate(rows, threshold=threshold, drop=drop, field=field)
 
     @staticmethod
-    def get_statistics(comments: List[Dict]) -> Dict:
+    def get_statistics(comments: List[Dict], detailed: bool = False) -> Dict:
         """
         获取评论统计信息
 
         Args:
             comments: 评论列表
+            detailed: 是否走列式统计，额外给出点赞/回复分布与分位数、
+                      用户等级分布、每个根评论的回复数和时间直方图
 
         Returns:
             统计信息字典
         """
-        if not comments:
-            return {
-                'total': 0,
-                'main_comments': 0,
-                'replies': 0,
-                'total_likes': 0,
-                'avg_likes': 0,
-                'total_replies': 0,
-            }
-
-        main_comments = [c for c in comments if not c.get('is_reply', False)]
-        replies = [c for c in comments if c.get('is_reply', False)]
-
-        total_likes = sum(c.get('like_count', 0) for c in comments)
-        total_replies = sum(c.get('reply_count', 0) for c in main_comments)
-
-        return {
-            'total': len(comments),
-            'main_comments': len(main_comments),
-            'replies': len(replies),
-            'total_likes': total_likes,
-            'avg_likes': round(total_likes / len(comments), 2) if comments else 0,
-            'total_replies': total_replies,
-        }
+        if detailed:
+            return CommentColumns.from_rows(comments).statistics()
+
+        accumulator = CommentStatsAccumulator()
+        accumulator.add_rows(comments)
+        return accumulator.snapshot()
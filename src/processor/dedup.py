@@ -0,0 +1,266 @@
+"""
+近似重复检测模块（刷屏 / 复制粘贴评论）
+- 文本归一化后取字符 shingle，计算 MinHash 签名
+- LSH 分段（banding）找候选，只和同桶的行比较，整体接近线性
+- 归一化后完全相同的文本走精确匹配快速路径，不计算签名
+- 并查集维护重复簇；可只标注（dup_cluster / dup_of），也可直接丢弃重复行
+- 实现 (row) -> bool，可直接作为 ProcessingPipeline 的阶段，评论与动态通用
+"""
+import logging
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 64
+
+# 每个 LSH 桶最多保留的行数（刷屏时同桶行很多，只和前几条比较即可归入同一簇）
+_BUCKET_CAPACITY = 4
+
+# 每行最多精确比较的候选数
+_MAX_VERIFY = 3
+
+# 单次排列 MinHash 空箱致密化时按距离叠加的偏移（大于哈希值范围，借来的值不会与原值相同）
+_DENSIFY_OFFSET = 1 << 65
+
+# 归一化：去掉空白和标点，只保留字母 / 数字 / 汉字
+_NOISE_PATTERN = re.compile(r'[\W_]+')
+
+CLUSTER_KEY = 'dup_cluster'
+DUPLICATE_KEY = 'dup_of'
+
+
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    根据相似度阈值选择 (段数 b, 每段行数 r)
+
+    LSH 的 S 曲线拐点约为 (1/b)^(1/r)，取最接近阈值的组合；
+    落在桶里的候选再用签名估计的相似度精确过滤。
+    """
+    best = (num_perm, 1)
+    best_gap = 1.0
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        gap = abs((1 / bands) ** (1 / rows) - threshold)
+        if gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while x != root:
+            parent[x], x = root, parent.get(x, x)
+        return root
+
+    def union(self, a: int, b: int) -> int:
+        """合并两个集合，以较早出现（下标较小）的根为代表"""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return ra
+        if rb < ra:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        return ra
+
+
+class NearDuplicateDetector:
+    """
+    近似重复检测器
+
+    用法:
+        detector = NearDuplicateDetector(threshold=0.8, drop=True)
+        unique = detector.process(comments)
+        clusters = detector.clusters()
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        shingle_size: int = 2,
+        min_length: int = 5,
+        field: str = 'content',
+        drop: bool = False,
+    ):
+        """
+        Args:
+            threshold: Jaccard 相似度阈值（0-1），不低于该值视为重复
+            num_perm: MinHash 签名长度，越长估计越准、越慢
+            shingle_size: 字符 shingle 长度（中文评论用 2 即可区分）
+            min_length: 归一化后短于该长度的文本不参与去重（如“打卡”“哈哈”）
+            field: 参与比较的文本字段
+            drop: True 时重复行返回 False（作为阶段时即被丢弃），否则只标注
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("相似度阈值需在 (0, 1] 之间")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.min_length = min_length
+        self.field = field
+        self.drop = drop
+        self.bands, self.band_rows = _optimal_bands(threshold, num_perm)
+        self._min_agree = threshold * num_perm
+
+        self._ids: List = []
+        self._signatures: Dict[int, List[int]] = {}
+        self._exact: Dict[str, int] = {}
+        self._buckets: List[Dict[tuple, List[int]]] = [{} for _ in range(self.bands)]
+        self._uf = _UnionFind()
+        self.duplicates = 0
+
+    # ============================================================
+    #  签名
+    # ============================================================
+    def _shingles(self, text: str) -> set:
+        k = self.shingle_size
+        if len(text) <= k:
+            return {text}
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+    def signature(self, text: str) -> List[int]:
+        """
+        归一化文本的 MinHash 签名（单次排列 MinHash，进程内稳定）
+
+        每个 shingle 只哈希一次：哈希值对签名长度取模决定分箱，箱内取最小值，
+        按降序写入字典后“后写覆盖”即得每箱最小值，整个过程在 C 层完成；
+        空箱按旋转致密化借用右侧（环绕）最近非空箱的值，并加上距离偏移。
+        """
+        size = self.num_perm
+        hashes = sorted(map(hash, self._shingles(text)), reverse=True)
+        bins = dict(zip(map(size.__rmod__, hashes), hashes))
+        if len(bins) == size:
+            return list(map(bins.__getitem__, range(size)))
+        sig: List[int] = []
+        prev = -1
+        for slot in sorted(bins):
+            value = bins[slot]
+            if slot - prev > 1:
+                sig.extend([value + d * _DENSIFY_OFFSET for d in range(slot - prev - 1, 0, -1)])
+            sig.append(value)
+            prev = slot
+        first = min(bins)
+        head = bins[first]
+        sig.extend([head + (first + size - i) * _DENSIFY_OFFSET for i in range(prev + 1, size)])
+        return sig
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return _NOISE_PATTERN.sub('', (text or '').lower())
+
+    # ============================================================
+    #  检测
+    # ============================================================
+    def check(self, row: Dict) -> Optional[int]:
+        """
+        登记一行并判断是否与之前的行重复
+
+        Returns:
+            重复时返回所在簇代表行的下标，否则返回None
+        """
+        doc = len(self._ids)
+        self._ids.append(row.get('comment_id') or row.get('dynamic_id') or doc)
+        text = self.normalize(row.get(self.field))
+        if len(text) < self.min_length:
+            return None
+
+        first = self._exact.get(text)
+        if first is not None:
+            return self._uf.union(first, doc)
+        self._exact[text] = doc
+
+        signature = self.signature(text)
+        self._signatures[doc] = signature
+        rows = self.band_rows
+        collisions: Counter = Counter()
+        for band, buckets in enumerate(self._buckets):
+            key = tuple(signature[band * rows:(band + 1) * rows])
+            members = buckets.get(key)
+            if members is None:
+                buckets[key] = [doc]
+                continue
+            collisions.update(members)
+            if len(members) < _BUCKET_CAPACITY:
+                members.append(doc)
+        if not collisions:
+            return None
+        # 同桶次数越多越可能相似，只精确比较前几个候选；
+        # 命中多个簇时一并合并，刷屏变体不会因为先后顺序被拆成多个簇
+        matched = None
+        for other, _ in collisions.most_common(_MAX_VERIFY):
+            if self._similar(signature, self._signatures[other]):
+                matched = self._uf.union(other, doc)
+        return matched
+
+    def _similar(self, a: List[int], b: List[int]) -> bool:
+        """签名相同位置的比例即 Jaccard 相似度的估计"""
+        return sum(map(int.__eq__, a, b)) >= self._min_agree
+
+    def __call__(self, row: Dict) -> bool:
+        """流水线阶段：标注重复信息，drop 模式下重复行返回 False"""
+        cluster = self.check(row)
+        if cluster is None:
+            return True
+        self.duplicates += 1
+        if self.drop:
+            return False
+        representative = self._ids[cluster]
+        row[CLUSTER_KEY] = representative
+        row[DUPLICATE_KEY] = representative
+        return True
+
+    def process(self, rows: Iterable[Dict]) -> List[Dict]:
+        """对一批行去重或标注，返回保留的行"""
+        return [row for row in rows if self(row)]
+
+    def clusters(self) -> Dict:
+        """
+        当前的重复簇
+
+        Returns:
+            {代表行ID: [簇内全部行ID]}，只包含两条及以上的簇
+        """
+        groups: Dict[int, List] = {}
+        find = self._uf.find
+        for doc in self._uf.parent:
+            groups.setdefault(find(doc), []).append(doc)
+        ids = self._ids
+        return {
+            ids[root]: [ids[doc] for doc in sorted({root, *members})]
+            for root, members in groups.items()
+        }
+
+
+def deduplicate(
+    rows: List[Dict],
+    threshold: float = DEFAULT_THRESHOLD,
+    drop: bool = False,
+    field: str = 'content',
+) -> List[Dict]:
+    """
+    对评论或动态列表做近似去重
+
+    Args:
+        rows: 评论或动态列表
+        threshold: Jaccard 相似度阈值
+        drop: True 时丢弃重复行，否则在重复行上写入 dup_cluster / dup_of
+        field: 参与比较的文本字段
+
+    Returns:
+        保留的行
+    """
+    detector = NearDuplicateDetector(threshold=threshold, drop=drop, field=field)
+    kept = detector.process(rows)
+    if detector.duplicates:
+        logger.info(f"近似去重: {len(rows)} 条中发现 {detector.duplicates} 条重复")
+    return kept
@@ -0,0 +1,359 @@
+"""
+多关键词匹配模块
+- 所有关键词的首字符编译为一个字符集正则，由 C 层快速定位候选位置，
+  再按前两个字符查表确认命中，单次扫描即可找出文本中出现的全部关键词
+- 支持 AND / OR / NOT 表达式：`|` 表示或，`&` 表示与，`!` 表示非，可用括号分组
+- 不含运算符的输入按单个关键词处理，与旧版子串过滤行为一致
+"""
+import logging
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Union
+
+logger = logging.getLogger(__name__)
+
+# 表达式中的运算符
+_OPERATORS = '|&!()'
+
+# 关键词不多于该数量时直接逐个做子串判断（C 层 `in` 比候选定位更快）
+_DIRECT_SCAN_LIMIT = 4
+
+# 求值函数：参数为命中的关键词下标集合
+_Evaluator = Callable[[Set[int]], bool]
+
+
+class _ExpressionParser:
+    """
+    关键词表达式解析器（递归下降）
+
+    优先级: ! > & > |，双引号内的内容按字面关键词处理。
+    解析结果为语法树: ('term', idx) / ('or', [...]) / ('and', [...]) / ('not', node)
+    """
+
+    def __init__(self, expression: str):
+        self.tokens = self._tokenize(expression)
+        self.pos = 0
+        self.keywords: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    @staticmethod
+    def _tokenize(expression: str) -> List[tuple]:
+        tokens = []
+        buf = []
+        i = 0
+        n = len(expression)
+
+        def flush():
+            term = ''.join(buf).strip()
+            buf.clear()
+            if term:
+                tokens.append(('term', term))
+
+        while i < n:
+            ch = expression[i]
+            if ch == '"':
+                flush()
+                end = expression.find('"', i + 1)
+                if end < 0:
+                    raise ValueError("关键词表达式中的引号未闭合")
+                term = expression[i + 1:end]
+                if term:
+                    tokens.append(('term', term))
+                i = end + 1
+                continue
+            if ch in _OPERATORS:
+                flush()
+                tokens.append(('op', ch))
+            else:
+                buf.append(ch)
+            i += 1
+        flush()
+        return tokens
+
+    def parse(self) -> tuple:
+        if not self.tokens:
+            raise ValueError("关键词表达式为空")
+        tree = self._parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"关键词表达式在第 {self.pos + 1} 个符号处无法解析")
+        return tree
+
+    def _peek(self) -> Optional[tuple]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _accept(self, op: str) -> bool:
+        if self._peek() == ('op', op):
+            self.pos += 1
+            return True
+        return False
+
+    def _parse_or(self) -> tuple:
+        parts = [self._parse_and()]
+        while self._accept('|'):
+            parts.append(self._parse_and())
+        return parts[0] if len(parts) == 1 else ('or', parts)
+
+    def _parse_and(self) -> tuple:
+        parts = [self._parse_not()]
+        while self._accept('&'):
+            parts.append(self._parse_not())
+        return parts[0] if len(parts) == 1 else ('and', parts)
+
+    def _parse_not(self) -> tuple:
+        if self._accept('!'):
+            return ('not', self._parse_not())
+        return self._parse_atom()
+
+    def _parse_atom(self) -> tuple:
+        if self._accept('('):
+            inner = self._parse_or()
+            if not self._accept(')'):
+                raise ValueError("关键词表达式缺少右括号")
+            return inner
+        token = self._peek()
+        if token is None or token[0] != 'term':
+            raise ValueError("关键词表达式缺少关键词")
+        self.pos += 1
+        key = token[1].lower()
+        if key not in self._index:
+            self._index[key] = len(self.keywords)
+            self.keywords.append(key)
+        return ('term', self._index[key])
+
+
+def _compile_tree(node: tuple) -> _Evaluator:
+    """
+    把语法树编译为求值函数
+
+    同一层的多个关键词合并为一个 frozenset，用集合运算代替逐个判断
+    """
+    kind = node[0]
+    if kind == 'term':
+        idx = node[1]
+        return lambda hits: idx in hits
+    if kind == 'not':
+        inner = _compile_tree(node[1])
+        return lambda hits: not inner(hits)
+
+    terms = frozenset(child[1] for child in node[1] if child[0] == 'term')
+    others = [_compile_tree(child) for child in node[1] if child[0] != 'term']
+    if kind == 'or':
+        if not others:
+            return lambda hits: not terms.isdisjoint(hits)
+        return lambda hits: (not terms.isdisjoint(hits)) or any(f(hits) for f in others)
+    if not others:
+        return lambda hits: terms <= hits
+    return lambda hits: terms <= hits and all(f(hits) for f in others)
+
+
+def _is_plain_or(node: tuple) -> bool:
+    """语法树是否只由关键词和 `|` 组成"""
+    if node[0] == 'term':
+        return True
+    return node[0] == 'or' and all(_is_plain_or(child) for child in node[1])
+
+
+class KeywordMatcher:
+    """
+    编译后的多关键词匹配器
+
+    用法:
+        matcher = KeywordMatcher.parse('原神 | 崩铁 & !广告')
+        rows = matcher.filter(comments, annotate=True)
+    """
+
+    ANNOTATION_KEY = 'matched_keywords'
+
+    def __init__(self, keywords: Sequence[str], evaluator: Optional[_Evaluator] = None,
+                 match_any: bool = False):
+        """
+        Args:
+            keywords: 关键词列表（内部统一转小写）
+            evaluator: 基于命中下标集合的求值函数，为空时表示命中任一关键词即可
+            match_any: 表达式是否等价于"命中任一关键词"，为真时过滤可在首个命中处提前返回
+        """
+        self.keywords = [kw.lower() for kw in keywords]
+        if not self.keywords or not all(self.keywords):
+            raise ValueError("关键词列表为空")
+        self._evaluator = evaluator or (lambda hits: bool(hits))
+        self._match_any = match_any or evaluator is None
+        # 完全没有命中时的结果（如 '!广告' 为真），未命中的行无需求值
+        self._empty_result = self._evaluator(frozenset())
+
+        # 一个关键词命中时，作为其子串的其他关键词也必然出现在文本中
+        self._covers: Dict[str, FrozenSet[int]] = {
+            kw: frozenset(j for j, other in enumerate(self.keywords) if other in kw)
+            for kw in self.keywords
+        }
+        self._direct = len(self.keywords) <= _DIRECT_SCAN_LIMIT
+        # 按前两个字符分桶，桶内长词优先；单字关键词单独记录
+        self._single = {kw for kw in self.keywords if len(kw) == 1}
+        buckets: Dict[str, List[str]] = {}
+        for kw in self.keywords:
+            if len(kw) > 1:
+                buckets.setdefault(kw[:2], []).append(kw)
+        self._buckets = {k: sorted(v, key=len, reverse=True) for k, v in buckets.items()}
+        first_chars = sorted({kw[0] for kw in self.keywords})
+        self._first = re.compile('[' + ''.join(re.escape(ch) for ch in first_chars) + ']')
+
+    # ============================================================
+    #  构造
+    # ============================================================
+    @classmethod
+    def parse(cls, expression: str) -> 'KeywordMatcher':
+        """
+        解析关键词表达式
+
+        Args:
+            expression: 例如 '原神 | 崩铁'、'抽卡 & !广告'、'(A | B) & C'
+
+        Returns:
+            KeywordMatcher 对象
+        """
+        parser = _ExpressionParser(expression)
+        tree = parser.parse()
+        return cls(parser.keywords, _compile_tree(tree), match_any=_is_plain_or(tree))
+
+    @classmethod
+    def from_keywords(cls, keywords: Iterable[str], require_all: bool = False) -> 'KeywordMatcher':
+        """
+        由关键词集合构造匹配器
+
+        Args:
+            keywords: 关键词集合（按字面匹配，不解析运算符）
+            require_all: True 表示必须全部命中，否则命中任一即可
+        """
+        unique = list(dict.fromkeys(kw.strip().lower() for kw in keywords if kw and kw.strip()))
+        if not require_all:
+            return cls(unique)
+        required = frozenset(range(len(unique)))
+        return cls(unique, lambda hits: required <= hits)
+
+    # ============================================================
+    #  匹配
+    # ============================================================
+    def _has_any(self, text: str) -> bool:
+        """文本（已转小写）中是否出现任一关键词"""
+        if self._direct:
+            for kw in self.keywords:
+                if kw in text:
+                    return True
+            return False
+        single = self._single
+        buckets = self._buckets
+        for match in self._first.finditer(text):
+            i = match.start()
+            if single and text[i] in single:
+                return True
+            candidates = buckets.get(text[i:i + 2])
+            if candidates:
+                for kw in candidates:
+                    if text.startswith(kw, i):
+                        return True
+        return False
+
+    def find_all(self, text: str) -> Set[int]:
+        """返回文本（需已转小写）中命中的关键词下标集合"""
+        if self._direct:
+            return {i for i, kw in enumerate(self.keywords) if kw in text}
+        hits: Set[int] = set()
+        single = self._single
+        buckets = self._buckets
+        covers = self._covers
+        for match in self._first.finditer(text):
+            i = match.start()
+            ch = text[i]
+            if single and ch in single:
+                hits |= covers[ch]
+            candidates = buckets.get(text[i:i + 2])
+            if candidates:
+                for kw in candidates:
+                    if text.startswith(kw, i):
+                        # 桶内按长度降序，最长命中已覆盖同起点的较短关键词
+                        hits |= covers[kw]
+                        break
+        return hits
+
+    def matched_keywords(self, text: str) -> List[str]:
+        """返回文本中命中的关键词列表（按表达式中出现的顺序）"""
+        hits = self.find_all((text or '').lower())
+        return [self.keywords[i] for i in sorted(hits)]
+
+    def matches(self, text: str) -> bool:
+        """判断文本是否满足表达式"""
+        text = (text or '').lower()
+        if self._match_any:
+            return self._has_any(text)
+        if not self._has_any(text):
+            return self._empty_result
+        return self._evaluator(self.find_all(text))
+
+    def match_row(self, row: Dict, field: str = 'content', annotate: bool = False) -> bool:
+        """
+        判断单行是否满足表达式
+
+        Args:
+            row: 评论或动态字典
+            field: 参与匹配的字段
+            annotate: 满足时是否写入 matched_keywords 字段
+        """
+        text = (row.get(field) or '').lower()
+        if not annotate:
+            if self._match_any:
+                return self._has_any(text)
+            if not self._has_any(text):
+                return self._empty_result
+        hits = self.find_all(text)
+        if not self._evaluator(hits):
+            return False
+        if annotate:
+            row[self.ANNOTATION_KEY] = [self.keywords[i] for i in sorted(hits)]
+        return True
+
+    def filter(self, rows: List[Dict], field: str = 'content', annotate: bool = False) -> List[Dict]:
+        """
+        单次遍历过滤数据
+
+        Args:
+            rows: 评论或动态列表
+            field: 参与匹配的字段
+            annotate: 是否在保留的行上写入命中的关键词列表（matched_keywords）
+
+        Returns:
+            满足表达式的行
+        """
+        if self._match_any and not annotate:
+            has_any = self._has_any
+            return [row for row in rows if has_any((row.get(field) or '').lower())]
+        match_row = self.match_row
+        return [row for row in rows if match_row(row, field, annotate)]
+
+    def annotate(self, rows: List[Dict], field: str = 'content') -> List[Dict]:
+        """为每一行写入命中的关键词列表，不做过滤"""
+        for row in rows:
+            row[self.ANNOTATION_KEY] = self.matched_keywords(row.get(field) or '')
+        return rows
+
+    def __repr__(self):
+        return f"KeywordMatcher(keywords={len(self.keywords)})"
+
+
+def compile_keywords(keyword: Union[str, Sequence[str], KeywordMatcher, None]) -> Optional[KeywordMatcher]:
+    """
+    将关键词输入统一编译为匹配器
+
+    Args:
+        keyword: 表达式字符串、关键词列表或已编译的匹配器；为空时返回None
+
+    Returns:
+        KeywordMatcher 对象或None
+    """
+    if keyword is None or isinstance(keyword, KeywordMatcher):
+        return keyword
+    if isinstance(keyword, str):
+        if not keyword.strip():
+            return None
+        return KeywordMatcher.parse(keyword)
+    keywords = [kw for kw in keyword if kw and kw.strip()]
+    if not keywords:
+        return None
+    return KeywordMatcher.from_keywords(keywords)
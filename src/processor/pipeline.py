@@ -0,0 +1,197 @@
+"""
+流式数据处理流水线
+- 清洗、过滤、聚合融合为对每行的一次遍历
+- 按批喂入，可直接挂在爬虫的批回调上，边爬边处理
+- 阶段与聚合器可自由组合：阶段返回 False 即丢弃该行，聚合器只看到保留下来的行
+"""
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from src.processor.aggregates import CommentStatsAccumulator, LiveCommentStats
+from src.processor.columnar_stats import CommentColumns
+from src.processor.data_processor import DataProcessor
+from src.processor.dedup import DEFAULT_THRESHOLD, NearDuplicateDetector
+from src.processor.keyword_matcher import compile_keywords
+from src.processor.sketches import CommentSketches
+
+logger = logging.getLogger(__name__)
+
+# 阶段：就地处理一行，返回是否保留
+Stage = Callable[[Dict], bool]
+
+
+class FilterStage:
+    """
+    过滤阶段，条件与 DataProcessor.filter_comments 相同
+
+    支持 min_likes / min_level / keyword / keywords / annotate
+    """
+
+    def __init__(self, filters: Dict):
+        self.min_likes = filters.get('min_likes')
+        self.min_level = filters.get('min_level')
+        self.annotate = bool(filters.get('annotate'))
+        self.matcher = compile_keywords(filters.get('keyword') or filters.get('keywords'))
+
+    def __call__(self, row: Dict) -> bool:
+        if self.min_likes is not None and row.get('like_count', 0) < self.min_likes:
+            return False
+        if self.min_level is not None and row.get('user_level', 0) < self.min_level:
+            return False
+        if self.matcher is not None and not self.matcher.match_row(row, annotate=self.annotate):
+            return False
+        return True
+
+
+class ProcessingPipeline:
+    """
+    流式处理流水线
+
+    用法:
+        pipeline = ProcessingPipeline.for_comments(filters={'min_likes': 10})
+        crawler = CommentCrawler(batch_callback=pipeline.feed)
+        crawler.crawl_comments(...)
+        rows, stats = pipeline.rows, pipeline.statistics()
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage] = (),
+        row_aggregators: Sequence = (),
+        batch_aggregators: Sequence = (),
+        keep_rows: bool = True,
+    ):
+        """
+        Args:
+            stages: 按顺序执行的阶段
+            row_aggregators: 逐行累加的聚合器（需实现 add(row)），在同一次遍历中调用
+            batch_aggregators: 按批累加的聚合器（需实现 append_rows(rows)），
+                               用于列式装载这类在 C 层批量完成的操作
+            keep_rows: 是否保留通过的行（只需要统计时可关闭以节省内存）
+        """
+        self.stages = list(stages)
+        self.row_aggregators = list(row_aggregators)
+        self.batch_aggregators = list(batch_aggregators)
+        self.keep_rows = keep_rows
+        self.rows: List[Dict] = []
+        self.seen = 0
+        self.dropped = 0
+        self._listeners: List[Callable[[List[Dict]], None]] = []
+
+    @classmethod
+    def for_comments(
+        cls,
+        filters: Optional[Dict] = None,
+        detailed: bool = True,
+        keep_rows: bool = True,
+        live: bool = False,
+        sketches: bool = False,
+    ) -> 'ProcessingPipeline':
+        """
+        构造评论处理流水线：清洗 -> 过滤 -> 统计
+
+        Args:
+            filters: 过滤条件，格式同 DataProcessor.filter_comments（含 dedup / dedup_drop）
+            detailed: 是否同时装载列存储以输出完整统计
+            keep_rows: 是否保留通过的行
+            live: 是否使用实时统计累加器（活跃用户、IP 属地、每小时评论数），
+                  可通过 find_aggregator(LiveCommentStats) 随时取快照
+            sketches: 是否同时累加近似统计草图（CommentSketches），可序列化后跨视频合并
+        """
+        stages: List[Stage] = [DataProcessor.clean_comment]
+        if filters:
+            stages.append(FilterStage(filters))
+            dedup = filters.get('dedup')
+            if dedup:
+                # 去重放在过滤之后，只对保留下来的行计算签名
+                stages.append(NearDuplicateDetector(
+                    threshold=DEFAULT_THRESHOLD if dedup is True else float(dedup),
+                    drop=bool(filters.get('dedup_drop')),
+                ))
+        row_aggregators = [LiveCommentStats() if live else CommentStatsAccumulator()]
+        if sketches:
+            row_aggregators.append(CommentSketches())
+        pipeline = cls(
+            stages=stages,
+            row_aggregators=row_aggregators,
+            batch_aggregators=[CommentColumns()] if detailed else [],
+            keep_rows=keep_rows,
+        )
+        return pipeline
+
+    def find_aggregator(self, kind: type):
+        """按类型查找已挂载的聚合器，找不到返回None"""
+        for aggregator in (*self.row_aggregators, *self.batch_aggregators):
+            if isinstance(aggregator, kind):
+                return aggregator
+        return None
+
+    def add_listener(self, listener: Callable[[List[Dict]], None]):
+        """注册批监听器，每批处理完成后收到通过的行"""
+        self._listeners.append(listener)
+
+    def feed(self, batch: Iterable[Dict]) -> List[Dict]:
+        """
+        处理一批数据
+
+        Args:
+            batch: 一批原始行（通常是爬虫一页的结果）
+
+        Returns:
+            本批通过全部阶段的行
+        """
+        stages = self.stages
+        adders = [aggregator.add for aggregator in self.row_aggregators]
+        kept = []
+        seen = 0
+        for row in batch:
+            seen += 1
+            for stage in stages:
+                if not stage(row):
+                    break
+            else:
+                for add in adders:
+                    add(row)
+                kept.append(row)
+
+        self.seen += seen
+        self.dropped += seen - len(kept)
+        if kept:
+            for aggregator in self.batch_aggregators:
+                aggregator.append_rows(kept)
+            if self.keep_rows:
+                self.rows.extend(kept)
+            for listener in self._listeners:
+                listener(kept)
+        return kept
+
+    def run(self, rows: Iterable[Dict], batch_size: int = 10000) -> List[Dict]:
+        """把现成的数据按批喂入流水线，返回全部保留的行"""
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self.feed(batch)
+                batch = []
+        if batch:
+            self.feed(batch)
+        return self.rows
+
+    def statistics(self) -> Dict:
+        """
+        汇总统计
+
+        有列存储时包含完整统计（与 DataProcessor.get_statistics(detailed=True) 一致），
+        使用实时累加器时再附带活跃用户、IP 属地等实时统计项，挂载草图时附带 approximate 近似统计
+        """
+        stats: Dict = {}
+        accumulator = self.find_aggregator(CommentStatsAccumulator)
+        if accumulator is not None:
+            stats.update(accumulator.snapshot())
+        columns = self.find_aggregator(CommentColumns)
+        if columns is not None:
+            stats.update(columns.statistics())
+        sketches = self.find_aggregator(CommentSketches)
+        if sketches is not None:
+            stats['approximate'] = sketches.snapshot()
+        return stats
@@ -0,0 +1,274 @@
+"""
+结果分页浏览模块
+- 直接在检索索引保存的行上工作（与流水线保留的行同序），爬取中也能浏览已到达的部分
+- 数值字段按需装入 array 列，之后只追加新到的行；安装了 NumPy 时过滤和排序在列上向量化完成
+- 一次查询的排序结果缓存为文档ID序列，翻页只按游标切片，不重新过滤排序
+- 每页条数有上限，且去掉内部字段（如原始 API 对象），单页响应大小与结果总量无关
+"""
+import itertools
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+from src.index.search_index import SearchIndex
+from src.processor.keyword_matcher import compile_keywords
+
+logger = logging.getLogger(__name__)
+
+COMMENT_NUMERIC_FIELDS = ('like_count', 'reply_count', 'ctime', 'user_level')
+DYNAMIC_NUMERIC_FIELDS = ('like_count', 'comment_count', 'forward_count', 'timestamp')
+
+# 范围过滤条件 -> (字段, 是否为下界)；'time' 指该类数据的时间字段
+RANGE_FILTERS = {
+    'min_likes': ('like_count', True),
+    'max_likes': ('like_count', False),
+    'start_time': ('time', True),
+    'end_time': ('time', False),
+    'min_level': ('user_level', True),
+    'max_level': ('user_level', False),
+}
+
+# 出现这些字符的关键词按表达式处理，不能用倒排索引预筛
+_EXPRESSION_CHARS = '|&!()"'
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# 缓存的查询结果个数（每个是一列文档ID，百万行约 4MB）
+MAX_CACHED_QUERIES = 8
+
+
+class ResultView:
+    """
+    爬取结果的过滤、排序与游标分页
+
+    用法:
+        view = ResultView.for_comments(search_index)
+        page = view.query({'min_likes': 10, 'keyword': '原神'}, sort='like_count')
+        more = view.page(page['next_cursor'])
+    """
+
+    def __init__(self, index: SearchIndex, numeric_fields: Sequence[str]):
+        """
+        Args:
+            index: 检索索引，行和关键词倒排表都取自它
+            numeric_fields: 可用于排序和范围过滤的整数字段
+        """
+        self.index = index
+        self.numeric_fields = tuple(numeric_fields)
+        self._columns: Dict[str, array] = {}
+        self._queries: 'OrderedDict[int, Tuple[Sequence[int], int]]' = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_comments(cls, index: SearchIndex) -> 'ResultView':
+        return cls(index, COMMENT_NUMERIC_FIELDS)
+
+    @classmethod
+    def for_dynamics(cls, index: SearchIndex) -> 'ResultView':
+        return cls(index, DYNAMIC_NUMERIC_FIELDS)
+
+    def __len__(self):
+        return len(self.index)
+
+    # ============================================================
+    #  查询
+    # ============================================================
+    def query(
+        self,
+        filters: Optional[Dict] = None,
+        sort: Optional[str] = None,
+        descending: bool = True,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict:
+        """
+        过滤并排序，返回第一页和后续翻页用的游标
+
+        Args:
+            filters: 过滤条件，例如：
+                {
+                    'min_likes': 10, 'max_likes': 1000,
+                    'start_time': 1700000000, 'end_time': 1710000000,   # Unix 秒，闭区间
+                    'min_level': 3, 'max_level': 6,                      # 仅评论
+                    'keyword': '原神 | 崩铁 & !广告',                      # 与流水线过滤相同的表达式
+                }
+            sort: 排序字段（numeric_fields 之一，或 'time'），None 表示按爬取顺序
+            descending: 是否降序
+            limit: 每页条数（不超过 MAX_PAGE_SIZE）
+            fields: 只返回这些字段，None 表示全部公开字段
+
+        Returns:
+            与 page() 相同
+        """
+        started = time.perf_counter()
+        sort_field = self._resolve_field(sort) if sort else None
+        ranges = self._parse_ranges(filters or {})
+        keyword = (filters or {}).get('keyword') or (filters or {}).get('keywords')
+
+        with self._lock:
+            size = len(self.index.rows)
+            self._sync_columns(size)
+            docs = self._match_keyword(keyword, size) if keyword else None
+            docs = self._filter_ranges(docs, ranges, size)
+            if sort_field is not None:
+                docs = self._sort(docs, sort_field, descending, size)
+            elif docs is None:
+                docs = range(size)
+            query_id = next(self._ids)
+            self._queries[query_id] = (docs, size)
+            while len(self._queries) > MAX_CACHED_QUERIES:
+                self._queries.popitem(last=False)
+        return self._slice(query_id, docs, 0, limit, fields, started)
+
+    def page(
+        self,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict:
+        """
+        翻页
+
+        Args:
+            cursor: query() / page() 返回的 next_cursor；为空时按爬取顺序从 offset 开始浏览
+            offset: 无游标时的起始位置
+            limit: 每页条数（不超过 MAX_PAGE_SIZE）
+            fields: 只返回这些字段
+
+        Returns:
+            {'total': 结果总数, 'offset': 本页起点, 'items': 当前页的行,
+             'next_cursor': 下一页游标（已到末尾时为 None）, 'took_ms': 耗时}
+        """
+        started = time.perf_counter()
+        if not cursor:
+            return self._slice(0, range(len(self.index.rows)), max(int(offset), 0), limit, fields, started)
+        query_id, offset = self._parse_cursor(cursor)
+        if query_id == 0:
+            docs = range(len(self.index.rows))
+        else:
+            with self._lock:
+                cached = self._queries.get(query_id)
+                if cached is None:
+                    raise ValueError("游标已失效，请重新查询")
+                self._queries.move_to_end(query_id)
+            docs = cached[0]
+        return self._slice(query_id, docs, offset, limit, fields, started)
+
+    def clear(self):
+        """丢弃列缓存和查询缓存（索引被清空或替换时调用）"""
+        with self._lock:
+            self._columns = {}
+            self._queries.clear()
+
+    # ============================================================
+    #  内部实现
+    # ============================================================
+    def _resolve_field(self, name: str) -> str:
+        field = self.index.time_field if name == 'time' else name
+        if field not in self.numeric_fields:
+            raise ValueError(f"不支持的字段: {name}")
+        return field
+
+    def _parse_ranges(self, filters: Dict) -> List[Tuple[str, bool, int]]:
+        ranges = []
+        for key, (field, lower) in RANGE_FILTERS.items():
+            value = filters.get(key)
+            if value is None or value == '':
+                continue
+            ranges.append((self._resolve_field(field), lower, int(value)))
+        return ranges
+
+    def _sync_columns(self, size: int):
+        """把已装列的字段补齐到 size 行"""
+        rows = self.index.rows
+        for field, column in self._columns.items():
+            if len(column) < size:
+                column.extend(int(row.get(field) or 0) for row in rows[len(column):size])
+
+    def _column(self, field: str, size: int) -> array:
+        column = self._columns.get(field)
+        if column is None:
+            column = self._columns[field] = array('q')
+            column.extend(int(row.get(field) or 0) for row in self.index.rows[:size])
+        return column
+
+    def _match_keyword(self, keyword, size: int) -> List[int]:
+        """关键词命中的文档ID（升序）"""
+        matcher = compile_keywords(keyword)
+        if matcher is None:
+            return list(range(size))
+        rows = self.index.rows
+        field = self.index.field
+        if isinstance(keyword, str) and not any(char in keyword for char in _EXPRESSION_CHARS):
+            # 单个关键词：先用倒排索引缩小候选（索引不区分大小写，是精确结果的超集）
+            candidates = [doc for doc in self.index.match(keyword) if doc < size]
+        else:
+            candidates = range(size)
+        return [doc for doc in candidates if matcher.matches(rows[doc].get(field) or '')]
+
+    def _filter_ranges(self, docs, ranges, size: int):
+        if not ranges:
+            return docs
+        if np is not None:
+            mask = np.ones(size, dtype=bool)
+            for field, lower, value in ranges:
+                column = np.frombuffer(self._column(field, size), dtype=np.int64)[:size]
+                mask &= column >= value if lower else column <= value
+            if docs is None:
+                return np.flatnonzero(mask)
+            docs = np.asarray(docs, dtype=np.int64)
+            return docs[mask[docs]]
+        checks = [(self._column(field, size), lower, value) for field, lower, value in ranges]
+        return [
+            doc for doc in (range(size) if docs is None else docs)
+            if all(column[doc] >= value if lower else column[doc] <= value for column, lower, value in checks)
+        ]
+
+    def _sort(self, docs, field: str, descending: bool, size: int):
+        """稳定排序，同值时保持爬取顺序，翻页结果不会重复或遗漏"""
+        column = self._column(field, size)
+        if np is not None:
+            values = np.frombuffer(column, dtype=np.int64)[:size]
+            if docs is None:
+                docs = np.arange(size)
+            else:
+                docs = np.asarray(docs, dtype=np.int64)
+            keys = values[docs]
+            return docs[np.argsort(-keys if descending else keys, kind='stable')]
+        return sorted(range(size) if docs is None else docs, key=column.__getitem__, reverse=descending)
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> Tuple[int, int]:
+        try:
+            query_id, offset = str(cursor).split('.', 1)
+            return int(query_id), max(int(offset), 0)
+        except ValueError:
+            raise ValueError(f"无效的游标: {cursor}") from None
+
+    def _slice(self, query_id: int, docs, offset: int, limit: int, fields, started: float) -> Dict:
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        total = len(docs)
+        end = min(offset + limit, total)
+        rows = self.index.rows
+        page = [rows[doc] for doc in map(int, docs[offset:end])]
+        if fields:
+            items = [{key: row.get(key) for key in fields} for row in page]
+        else:
+            items = [{key: value for key, value in row.items() if not key.startswith('_')} for row in page]
+        return {
+            'total': total,
+            'offset': offset,
+            'items': items,
+            'next_cursor': f"{query_id}.{end}" if end < total else None,
+            'took_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
@@ -0,0 +1,588 @@
+"""
+近似统计模块（概率数据结构）
+- HyperLogLog：去重用户数
+- Count-Min Sketch / Space-Saving：高频评论用户、高频字符 n-gram
+- t-digest：点赞数分位数
+- 内存占用固定，与数据量无关；同参数的草图可跨视频、跨运行合并，
+  并可序列化为 JSON，无需保留原始数据即可汇总
+"""
+import base64
+import heapq
+import logging
+import math
+import re
+import sys
+from array import array
+from collections import Counter
+from hashlib import blake2b
+from itertools import count as _counter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def stable_hash64(item: Any) -> int:
+    """
+    稳定的 64 位哈希
+
+    内置 hash() 对字符串按进程随机化，不能用于需要跨运行合并的草图
+    """
+    data = item if isinstance(item, bytes) else str(item).encode('utf-8')
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), 'little')
+
+
+def _encode_array(values: array) -> str:
+    """array -> base64 字符串（统一按小端序存储）"""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+
+def _decode_array(typecode: str, data: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _check_type(data: Dict, expected: str):
+    if data.get('type') != expected:
+        raise ValueError(f"草图类型不匹配: 期望 {expected}，实际 {data.get('type')}")
+
+
+# ============================================================
+#  HyperLogLog
+# ============================================================
+class HyperLogLog:
+    """
+    HyperLogLog 基数估计
+
+    precision=14 时占用 16KB，标准误差约 0.8%
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog 精度需在 4-18 之间")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item: Any):
+        self.add_hash(stable_hash64(item))
+
+    def add_hash(self, hashed: int):
+        """以预先计算好的 64 位哈希累加（同一元素喂给多个草图时只哈希一次）"""
+        p = self.precision
+        index = hashed >> (64 - p)
+        rest = hashed & ((1 << (64 - p)) - 1)
+        rank = (64 - p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        """估计去重后的元素数"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # 小基数时线性计数更准确
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """合并另一个草图（就地），返回自身"""
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog 精度不同，无法合并")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            'type': 'hll',
+            'precision': self.precision,
+            'registers': base64.b64encode(bytes(self.registers)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HyperLogLog':
+        _check_type(data, 'hll')
+        sketch = cls(data['precision'])
+        registers = base64.b64decode(data['registers'])
+        if len(registers) != len(sketch.registers):
+            raise ValueError("HyperLogLog 寄存器长度与精度不符")
+        sketch.registers = bytearray(registers)
+        return sketch
+
+
+# ============================================================
+#  Count-Min Sketch
+# ============================================================
+class CountMinSketch:
+    """
+    Count-Min 频次估计
+
+    估计值只会偏大不会偏小；误差上界约为 总数 * e / width，置信度 1 - e^-depth
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        if width <= 0 or depth <= 0:
+            raise ValueError("Count-Min 宽度和深度需为正数")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = array('q', bytes(8 * width * depth))
+
+    def _indexes(self, hashed: int) -> List[int]:
+        # 双哈希派生各行下标（Kirsch-Mitzenmacher）
+        h1 = hashed & 0xFFFFFFFF
+        h2 = (hashed >> 32) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, item: Any, count: int = 1):
+        self.add_hash(stable_hash64(item), count)
+
+    def add_hash(self, hashed: int, count: int = 1):
+        table = self.table
+        for index in self._indexes(hashed):
+            table[index] += count
+        self.total += count
+
+    def estimate(self, item: Any) -> int:
+        return self.estimate_hash(stable_hash64(item))
+
+    def estimate_hash(self, hashed: int) -> int:
+        table = self.table
+        return min(table[index] for index in self._indexes(hashed))
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        """合并另一个草图（就地），返回自身"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Count-Min 尺寸不同，无法合并")
+        self.table = array('q', map(int.__add__, self.table, other.table))
+        self.total += other.total
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            'type': 'cms',
+            'width': self.width,
+            'depth': self.depth,
+            'total': self.total,
+            'table': _encode_array(self.table),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CountMinSketch':
+        _check_type(data, 'cms')
+        sketch = cls(data['width'], data['depth'])
+        table = _decode_array('q', data['table'])
+        if len(table) != len(sketch.table):
+            raise ValueError("Count-Min 计数表长度与尺寸不符")
+        sketch.table = table
+        sketch.total = data.get('total', 0)
+        return sketch
+
+
+# ============================================================
+#  Space-Saving
+# ============================================================
+class SpaceSaving:
+    """
+    Space-Saving 高频元素（heavy hitters）
+
+    最多跟踪 capacity 个元素；满了以后新元素顶替计数最小者并继承其计数作为误差。
+    频次超过 总数 / capacity 的元素一定在结果中，计数偏大但不超过 error。
+    """
+
+    def __init__(self, capacity: int = 100):
+        if capacity <= 0:
+            raise ValueError("Space-Saving 容量需为正数")
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[Any, int] = {}
+        self.errors: Dict[Any, int] = {}
+        # 惰性最小堆：(入堆时计数, 序号, 元素)；计数只增不减，过期项出堆时再修正
+        self._heap: List[tuple] = []
+        self._seq = _counter()
+
+    def add(self, item: Any, count: int = 1):
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (count, next(self._seq), item))
+            return
+        min_item, min_count = self._pop_min()
+        del counts[min_item]
+        del self.errors[min_item]
+        counts[item] = min_count + count
+        self.errors[item] = min_count
+        heapq.heappush(self._heap, (min_count + count, next(self._seq), item))
+
+    def _pop_min(self) -> tuple:
+        heap = self._heap
+        counts = self.counts
+        while True:
+            stale_count, _, item = heapq.heappop(heap)
+            current = counts[item]
+            if current == stale_count:
+                return item, current
+            heapq.heappush(heap, (current, next(self._seq), item))
+
+    def _rebuild_heap(self):
+        self._heap = [(n, next(self._seq), item) for item, n in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n: Optional[int] = None) -> List[tuple]:
+        """返回计数最高的 n 个 (元素, 计数, 误差上界)"""
+        ordered = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        return [(item, c, self.errors[item]) for item, c in ordered[:n or self.capacity]]
+
+    def _floor(self) -> int:
+        """未被跟踪元素的计数上界"""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """
+        合并另一个草图（就地），返回自身
+
+        未被某一方跟踪的元素按该方的最小计数补齐，保证合并后仍是上界
+        """
+        floor_self, floor_other = self._floor(), other._floor()
+        merged = {}
+        for item in self.counts.keys() | other.counts.keys():
+            merged[item] = (
+                self.counts.get(item, floor_self) + other.counts.get(item, floor_other),
+                self.errors.get(item, floor_self) + other.errors.get(item, floor_other),
+            )
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda kv: kv[1][0])
+        self.counts = {item: c for item, (c, _) in kept}
+        self.errors = {item: e for item, (_, e) in kept}
+        self.total += other.total
+        self._rebuild_heap()
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            'type': 'space_saving',
+            'capacity': self.capacity,
+            'total': self.total,
+            'items': [[item, c, self.errors[item]] for item, c in self.counts.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SpaceSaving':
+        _check_type(data, 'space_saving')
+        sketch = cls(data['capacity'])
+        for item, c, error in data['items']:
+            sketch.counts[item] = c
+            sketch.errors[item] = error
+        sketch.total = data.get('total', 0)
+        sketch._rebuild_heap()
+        return sketch
+
+
+# ============================================================
+#  t-digest
+# ============================================================
+class TDigest:
+    """
+    t-digest 分位数估计（merging 变体）
+
+    质心数量约为 compression，两端分位数（p1 / p99）精度最高
+    """
+
+    def __init__(self, compression: int = 100):
+        if compression < 10:
+            raise ValueError("t-digest 压缩参数需不小于 10")
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[tuple] = []
+        self._buffer_limit = compression * 10
+
+    def add(self, value: float, weight: int = 1):
+        self._buffer.append((value, weight))
+        self.count += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q_limit(self, k: float) -> float:
+        angle = min(k * 2 * math.pi / self.compression, math.pi / 2)
+        return (math.sin(angle) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = self.count
+        means: List[float] = []
+        weights: List[float] = []
+        cur_mean, cur_weight = points[0]
+        weight_before = 0
+        limit = self._q_limit(self._k(0) + 1)
+        for mean, weight in points[1:]:
+            if (weight_before + cur_weight + weight) / total <= limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                weight_before += cur_weight
+                limit = self._q_limit(self._k(weight_before / total) + 1)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> float:
+        """
+        估计分位数
+
+        Args:
+            q: 0-1 之间的分位点
+        """
+        self._compress()
+        if not self.means:
+            return 0
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        if len(self.means) == 1:
+            return self.means[0]
+        means, weights = self.means, self.weights
+        target = q * self.count
+        cumulative = 0
+        for i, weight in enumerate(weights):
+            center = cumulative + weight / 2
+            if target < center:
+                if i == 0:
+                    return self.min + (means[0] - self.min) * target / center
+                prev_center = cumulative - weights[i - 1] / 2
+                return means[i - 1] + (means[i] - means[i - 1]) * (target - prev_center) / (center - prev_center)
+            cumulative += weight
+        last_center = self.count - weights[-1] / 2
+        span = self.count - last_center
+        return means[-1] + (self.max - means[-1]) * (target - last_center) / span
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """合并另一个草图（就地），返回自身"""
+        other._compress()
+        if not other.count:
+            return self
+        self._buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def to_dict(self) -> Dict:
+        self._compress()
+        return {
+            'type': 'tdigest',
+            'compression': self.compression,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'means': self.means,
+            'weights': self.weights,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TDigest':
+        _check_type(data, 'tdigest')
+        sketch = cls(data['compression'])
+        sketch.means = list(data['means'])
+        sketch.weights = list(data['weights'])
+        sketch.count = data['count']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+# ============================================================
+#  评论草图集合
+# ============================================================
+_NGRAM_FLUSH_ROWS = 2048
+
+
+def _ngram_pattern(n: int):
+    """匹配长度不小于 n 的连续字母 / 数字 / 汉字片段"""
+    return re.compile(r'[^\W_]{%d,}' % n)
+
+
+class CommentSketches:
+    """
+    评论近似统计集合
+
+    实现 add(row)，可作为 ProcessingPipeline 的逐行聚合器；
+    to_dict() 的结果可直接写入 JSON，之后用 from_dict + merge 跨视频汇总。
+
+    用法:
+        sketches = CommentSketches()
+        sketches.add_rows(comments)
+        sketches.merge(CommentSketches.from_dict(json.load(f)))
+        stats = sketches.snapshot()
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        hll_precision: int = 14,
+        cms_width: int = 8192,
+        cms_depth: int = 4,
+        top_capacity: int = 200,
+        ngram: int = 2,
+        compression: int = 100,
+    ):
+        """
+        Args:
+            hll_precision: HyperLogLog 精度（寄存器数为 2^precision）
+            cms_width / cms_depth: Count-Min 计数表尺寸
+            top_capacity: 高频用户 / n-gram 跟踪的候选数
+            ngram: 字符 n-gram 长度
+            compression: t-digest 压缩参数
+        """
+        self.ngram = ngram
+        self.total = 0
+        self.users = HyperLogLog(hll_precision)
+        self.user_counts = CountMinSketch(cms_width, cms_depth)
+        self.top_users = SpaceSaving(top_capacity)
+        self.ngrams = SpaceSaving(top_capacity)
+        self.likes = TDigest(compression)
+        # n-gram 先在小计数器里按批预聚合，再整体喂给 Space-Saving，减少逐个更新
+        self._pattern = _ngram_pattern(ngram)
+        self._pending: Counter = Counter()
+        self._pending_rows = 0
+
+    def add(self, comment: Dict):
+        """累加一条评论"""
+        self.total += 1
+        user_id = comment.get('user_id')
+        if user_id:
+            hashed = stable_hash64(user_id)
+            self.users.add_hash(hashed)
+            self.user_counts.add_hash(hashed)
+            self.top_users.add(user_id)
+        self.likes.add(comment.get('like_count') or 0)
+        content = comment.get('content')
+        if content:
+            n = self.ngram
+            self._pending.update([
+                run[i:i + n]
+                for run in self._pattern.findall(content.lower())
+                for i in range(len(run) - n + 1)
+            ])
+            self._pending_rows += 1
+            if self._pending_rows >= _NGRAM_FLUSH_ROWS:
+                self._flush_ngrams()
+
+    def _flush_ngrams(self):
+        add_gram = self.ngrams.add
+        for gram, count in self._pending.items():
+            add_gram(gram, count)
+        self._pending = Counter()
+        self._pending_rows = 0
+
+    def add_rows(self, comments):
+        """累加一批评论"""
+        add = self.add
+        for comment in comments:
+            add(comment)
+
+    def merge(self, other: 'CommentSketches') -> 'CommentSketches':
+        """合并另一组草图（就地），返回自身"""
+        if other.ngram != self.ngram:
+            raise ValueError("n-gram 长度不同，无法合并")
+        self._flush_ngrams()
+        other._flush_ngrams()
+        self.total += other.total
+        self.users.merge(other.users)
+        self.user_counts.merge(other.user_counts)
+        self.top_users.merge(other.top_users)
+        self.ngrams.merge(other.ngrams)
+        self.likes.merge(other.likes)
+        return self
+
+    def snapshot(self, top_n: int = 10) -> Dict:
+        """
+        近似统计结果
+
+        Args:
+            top_n: 高频用户 / n-gram 返回条数
+
+        Returns:
+            统计信息字典，计数类结果均为估计值
+        """
+        self._flush_ngrams()
+        estimate = self.user_counts.estimate
+        top_users = [
+            # 两种草图都只会高估，取较小者
+            {'user_id': user_id, 'count': min(count, estimate(user_id)), 'error': error}
+            for user_id, count, error in self.top_users.top()
+        ]
+        top_users.sort(key=lambda item: item['count'], reverse=True)
+        likes = self.likes
+        return {
+            'total': self.total,
+            'unique_users': self.users.count(),
+            'top_users': top_users[:top_n],
+            'top_ngrams': [
+                {'ngram': gram, 'count': count, 'error': error}
+                for gram, count, error in self.ngrams.top(top_n)
+            ],
+            'likes': {
+                'min': likes.min if likes.count else 0,
+                'max': likes.max if likes.count else 0,
+                **{f'p{q}': round(likes.quantile(q / 100), 2) for q in (50, 90, 99)},
+            },
+        }
+
+    def to_dict(self) -> Dict:
+        self._flush_ngrams()
+        return {
+            'version': self.VERSION,
+            'ngram': self.ngram,
+            'total': self.total,
+            'users': self.users.to_dict(),
+            'user_counts': self.user_counts.to_dict(),
+            'top_users': self.top_users.to_dict(),
+            'ngrams': self.ngrams.to_dict(),
+            'likes': self.likes.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CommentSketches':
+        if data.get('version') != cls.VERSION:
+            raise ValueError(f"不支持的草图版本: {data.get('version')}")
+        sketches = cls(ngram=data['ngram'])
+        sketches.total = data['total']
+        sketches.users = HyperLogLog.from_dict(data['users'])
+        sketches.user_counts = CountMinSketch.from_dict(data['user_counts'])
+        sketches.top_users = SpaceSaving.from_dict(data['top_users'])
+        sketches.ngrams = SpaceSaving.from_dict(data['ngrams'])
+        sketches.likes = TDigest.from_dict(data['likes'])
+        return sketches